@@ -0,0 +1,455 @@
+"""変換パイプラインのベンチマーク。
+
+合成したカタログ（skills.json）と README を使い、段ごとのスループット・
+1 件あたりのレイテンシのパーセンタイル・ピークメモリ（tracemalloc）を計測する。
+ネットワークには接続しない。
+
+計測する段:
+- catalog_parse: ローカルファイルからの fetch_skills_json
+- filter: filter_pipeline
+- extract_sections / extract_bins: README サイズ別
+- generate: generate_skill_md（README サイズ別）
+- write: SKILL.md の書き出しと索引の更新
+
+結果は JSON で出力し、--baseline に以前の結果を渡すと比較する。
+時間の計測と tracemalloc によるメモリの計測は別々の実行で行う。
+
+使い方:
+    python bench.py --output bench.json
+    python bench.py --catalog-sizes 1000,1000000 --baseline bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+from fetch_catalog import fetch_skills_json
+from filter import filter_pipeline
+from generator import GENERATOR_VERSION, extract_bins, extract_sections, generate_skill_md
+from json_stream import CompactArrayWriter
+from skill_index import SkillIndex
+from skill_writer import SkillWriter
+
+logger = logging.getLogger(__name__)
+
+RESULT_VERSION = 1
+
+_CATEGORIES = ["claude-code", "mcp-servers", "agent", "tools", "devops", "data", "web"]
+_RISKS = ["unknown", "unknown", "unknown", "low", "suspicious", "dangerous"]
+_WORDS = (
+    "skill agent server tool install usage config command model prompt file repo cli api "
+    "token cache build test deploy stream parse render template index fetch queue worker"
+).split()
+_INSTALL_LINES = [
+    "npm install -g {name}",
+    "pip install {name}",
+    "brew install {name}",
+    "cargo install {name}",
+    "go install github.com/{name}/{name}@latest",
+    "uv tool install {name}",
+]
+_USAGE_LINES = ["{name} --help", "{name} run config.yaml", "docker run --rm {name}", "git clone {name} && make"]
+
+
+# ----------------------------------------------------------------------
+# 合成データ
+# ----------------------------------------------------------------------
+
+
+def synth_entry(rng: random.Random, i: int) -> dict:
+    """合成したカタログエントリを返す。約 2% は既出の source_url を持つ。"""
+    j = rng.randrange(i + 1) if rng.random() < 0.02 else i
+    return {
+        "slug": f"bench-skill-{i}",
+        "description": " ".join(rng.choices(_WORDS, k=rng.randint(5, 30))),
+        "source_url": f"https://github.com/owner{j % 997}/repo{j}",
+        "category": rng.choice(_CATEGORIES),
+        "quality_score": round(rng.uniform(1.0, 5.0), 1),
+        "source_type": "github" if rng.random() < 0.9 else "gitlab",
+        "security_risk": rng.choice(_RISKS),
+    }
+
+
+def write_synthetic_catalog(path: Path, count: int, seed: int = 0) -> None:
+    """count 件の合成エントリを skills.json キャッシュと同じ形式で書き出す。"""
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        writer = CompactArrayWriter(f)
+        for i in range(count):
+            writer.write(synth_entry(rng, i))
+        writer.close()
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(rng.choices(_WORDS, k=rng.randint(20, 80))).capitalize() + "."
+
+
+def synth_readme(rng: random.Random, size: int) -> str:
+    """おおよそ size 文字の合成 README を返す。
+
+    概要・インストール・使い方の見出しに加え、コードフェンス（中に # 行を含む）と
+    本文のセクションを size に達するまで並べる。
+    """
+    name = f"{rng.choice(_WORDS)}-{rng.choice(_WORDS)}"
+    parts = [f"# {name}\n\n{_paragraph(rng)}\n"]
+    if rng.random() < 0.5:
+        parts.append(f"## Overview\n\n{_paragraph(rng)}\n")
+    installs = rng.sample(_INSTALL_LINES, k=2)
+    parts.append("## Installation\n\n```bash\n" + "\n".join(line.format(name=name) for line in installs) + "\n```\n")
+    parts.append(f"## Usage\n\n```bash\n{rng.choice(_USAGE_LINES).format(name=name)}\n```\n\n{_paragraph(rng)}\n")
+
+    length = sum(len(p) for p in parts)
+    section = 0
+    while length < size:
+        section += 1
+        if rng.random() < 0.3:
+            block = f"```sh\n# {rng.choice(_WORDS)} example\n{rng.choice(_USAGE_LINES).format(name=name)}\n```\n"
+        else:
+            block = f"## {rng.choice(_WORDS).title()} {section}\n\n{_paragraph(rng)}\n\n{_paragraph(rng)}\n"
+        parts.append(block)
+        length += len(block)
+    return "\n".join(parts)
+
+
+# ----------------------------------------------------------------------
+# 計測
+# ----------------------------------------------------------------------
+
+
+def _percentiles(latencies: Sequence[float]) -> dict[str, float] | None:
+    """レイテンシ（秒）の p50 / p90 / p99 / 最大をミリ秒で返す。"""
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "p50": round(rank(0.50), 4),
+        "p90": round(rank(0.90), 4),
+        "p99": round(rank(0.99), 4),
+        "max": round(ordered[-1] * 1000, 4),
+    }
+
+
+def _peak_memory(fn: Callable[[], object]) -> int:
+    """fn の実行中に tracemalloc で観測したピークメモリ（バイト）。"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _result(
+    stage: str,
+    case: str,
+    items: int,
+    seconds: float,
+    latencies: Sequence[float] | None,
+    peak_memory: int,
+) -> dict:
+    result = {
+        "stage": stage,
+        "case": case,
+        "items": items,
+        "seconds": round(seconds, 6),
+        "throughput": round(items / seconds, 2) if seconds > 0 else None,
+        "latency_ms": _percentiles(latencies) if latencies else None,
+        "peak_memory_bytes": peak_memory,
+    }
+    logger.info(
+        "%-16s %-10s %8d 件 %9.3f 秒 %12s 件/秒 ピーク %6.1f MB",
+        stage, case, items, seconds, result["throughput"], peak_memory / 1024 / 1024,
+    )
+    return result
+
+
+def measure_batch(stage: str, case: str, items: int, fn: Callable[[], object], repeat: int) -> dict:
+    """fn 全体を 1 回の処理として計測する（repeat 回のうち最速を採る）。"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return _result(stage, case, items, best, None, _peak_memory(fn))
+
+
+def measure_each(
+    stage: str,
+    case: str,
+    inputs: Sequence[object],
+    fn: Callable[[object], object],
+    repeat: int,
+    setup: Callable[[], None] | None = None,
+    teardown: Callable[[], None] | None = None,
+) -> dict:
+    """inputs の 1 件ごとに fn を計測する。
+
+    レイテンシは repeat 回分をまとめて集計し、所要時間は 1 回あたりの平均とする。
+    setup は各回の前に呼ばれる（書き出し先の入れ替えなど）。teardown は各回の後に
+    呼ばれ、その時間は所要時間に含める（まとめて行う fsync など）。
+    """
+    latencies: list[float] = []
+    total = 0.0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            total += elapsed
+        if teardown is not None:
+            start = time.perf_counter()
+            teardown()
+            total += time.perf_counter() - start
+
+    def run_all() -> None:
+        for item in inputs:
+            fn(item)
+        if teardown is not None:
+            teardown()
+
+    if setup is not None:
+        setup()
+    return _result(stage, case, len(inputs), total / repeat, latencies, _peak_memory(run_all))
+
+
+# ----------------------------------------------------------------------
+# 段ごとのベンチマーク
+# ----------------------------------------------------------------------
+
+
+def bench_catalog(work_dir: Path, sizes: Sequence[int], filter_cfg: dict, repeat: int, seed: int) -> list[dict]:
+    """カタログの読み込み（fetch_skills_json）とフィルタを件数別に計測する。"""
+    results: list[dict] = []
+    for size in sizes:
+        cache_dir = work_dir / f"catalog-{size}"
+        write_synthetic_catalog(cache_dir / "skills.json", size, seed)
+        case = f"n={size}"
+
+        def parse() -> list[dict]:
+            return fetch_skills_json("bench/catalog", "skills.json", cache_dir, cache_ttl_hours=1_000_000)
+
+        results.append(measure_batch("catalog_parse", case, size, parse, repeat))
+        entries = parse()
+        output_dir = work_dir / "no-output"
+        results.append(measure_batch(
+            "filter", case, size, lambda: filter_pipeline(entries, filter_cfg, output_dir), repeat,
+        ))
+    return results
+
+
+def bench_readmes(
+    readme_sizes_kb: Sequence[int],
+    count: int,
+    template_path: Path,
+    repeat: int,
+    seed: int,
+) -> list[dict]:
+    """セクション抽出・バイナリ抽出・SKILL.md 生成を README サイズ別に計測する。"""
+    results: list[dict] = []
+    rng = random.Random(seed)
+    for size_kb in readme_sizes_kb:
+        readmes = [synth_readme(rng, size_kb * 1024) for _ in range(count)]
+        pairs = [(synth_entry(rng, i), readme) for i, readme in enumerate(readmes)]
+        case = f"{size_kb}KB"
+        results.append(measure_each("extract_sections", case, readmes, extract_sections, repeat))
+        results.append(measure_each("extract_bins", case, readmes, extract_bins, repeat))
+        results.append(measure_each(
+            "generate", case, pairs, lambda pair: generate_skill_md(pair[0], pair[1], template_path), repeat,
+        ))
+    return results
+
+
+def bench_write(work_dir: Path, count: int, template_path: Path, repeat: int, seed: int) -> list[dict]:
+    """SKILL.md の書き出しと索引の更新（convert の書き出し段）を計測する。
+
+    新規に書き出す場合と、同じ内容を書き出し済みの出力先へ再度流す
+    （すべて変更なしになる）場合を計測する。
+    """
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        entry = synth_entry(rng, i)
+        items.append((entry, generate_skill_md(entry, synth_readme(rng, 2048), template_path)))
+
+    state: dict[str, object] = {"round": 0}
+
+    def open_output(out: Path) -> None:
+        state["writer"] = SkillWriter(out)
+        state["index"] = SkillIndex(out / "skill_index.json", out)
+
+    def setup_new() -> None:
+        state["round"] += 1
+        open_output(work_dir / f"write-{state['round']}")
+
+    def setup_unchanged() -> None:
+        open_output(work_dir / "write-1")
+
+    def write(item: tuple[dict, str]) -> None:
+        entry, content = item
+        state["writer"].write(entry["slug"], content, state["index"].output_hash(entry["slug"]))
+        state["index"].record(entry["slug"], entry, content, GENERATOR_VERSION)
+
+    def sync() -> None:
+        state["writer"].sync()
+
+    return [
+        measure_each("write", f"n={count}", items, write, repeat, setup=setup_new, teardown=sync),
+        measure_each("write", f"n={count},unchanged", items, write, repeat, setup=setup_unchanged, teardown=sync),
+    ]
+
+
+# ----------------------------------------------------------------------
+# 比較
+# ----------------------------------------------------------------------
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+    """ベースラインと (stage, case) ごとに比べる。
+
+    スループットが (1 - tolerance) 倍を下回るか、ピークメモリが (1 + tolerance) 倍を
+    超えたものを regression とする。
+    """
+    base = {(r["stage"], r["case"]): r for r in baseline}
+    rows: list[dict] = []
+    for r in results:
+        b = base.get((r["stage"], r["case"]))
+        if b is None:
+            continue
+        throughput_ratio = (
+            r["throughput"] / b["throughput"] if r["throughput"] and b.get("throughput") else None
+        )
+        memory_ratio = (
+            r["peak_memory_bytes"] / b["peak_memory_bytes"] if b.get("peak_memory_bytes") else None
+        )
+        regression = (
+            (throughput_ratio is not None and throughput_ratio < 1 - tolerance)
+            or (memory_ratio is not None and memory_ratio > 1 + tolerance)
+        )
+        rows.append({
+            "stage": r["stage"],
+            "case": r["case"],
+            "throughput_ratio": round(throughput_ratio, 3) if throughput_ratio is not None else None,
+            "memory_ratio": round(memory_ratio, 3) if memory_ratio is not None else None,
+            "regression": regression,
+        })
+    return rows
+
+
+def _print_comparison(rows: list[dict]) -> None:
+    print(f"{'stage':<16} {'case':<10} {'throughput':>10} {'memory':>8}", file=sys.stderr)
+    for row in rows:
+        mark = "  ← 悪化" if row["regression"] else ""
+        print(
+            f"{row['stage']:<16} {row['case']:<10} {row['throughput_ratio'] or '-':>9}x "
+            f"{row['memory_ratio'] or '-':>7}x{mark}",
+            file=sys.stderr,
+        )
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    """ベンチマークを実行して結果を JSON で出力する。"""
+    here = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="skill-converter のベンチマーク")
+    parser.add_argument("--config", default=str(here / "config.yaml"), help="filter 条件を読む config.yaml")
+    parser.add_argument("--template", default=str(here / "templates" / "skill.md.j2"), help="Jinja テンプレート")
+    parser.add_argument("--catalog-sizes", type=_int_list, default=[1000, 10_000, 100_000],
+                        metavar="N,N,...", help="合成カタログの件数 (デフォルト: 1000,10000,100000)")
+    parser.add_argument("--readme-sizes", type=_int_list, default=[1, 16, 256],
+                        metavar="KB,KB,...", help="合成 README のサイズ (KB、デフォルト: 1,16,256)")
+    parser.add_argument("--readme-count", type=int, default=20, help="README サイズごとの件数 (デフォルト: 20)")
+    parser.add_argument("--write-count", type=int, default=500, help="書き出す SKILL.md の件数 (デフォルト: 500)")
+    parser.add_argument("--repeat", type=int, default=3, help="各段の繰り返し回数 (デフォルト: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="合成データの乱数シード")
+    parser.add_argument("--stages", default="catalog,readme,write",
+                        help="実行する段 (catalog,readme,write のカンマ区切り)")
+    parser.add_argument("--output", help="結果の JSON の出力先 (省略時は標準出力)")
+    parser.add_argument("--baseline", help="比較するベースラインの JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="ベースラインに対して許容する悪化の割合 (デフォルト: 0.2)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger.setLevel(logging.INFO)
+
+    with open(args.config, encoding="utf-8") as f:
+        filter_cfg = yaml.safe_load(f).get("filter", {})
+    template_path = Path(args.template)
+    stages = set(args.stages.split(","))
+    repeat = max(1, args.repeat)
+
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory(prefix="skill-converter-bench-") as tmp:
+        work_dir = Path(tmp)
+        if "catalog" in stages:
+            results += bench_catalog(work_dir, args.catalog_sizes, filter_cfg, repeat, args.seed)
+        if "readme" in stages:
+            results += bench_readmes(args.readme_sizes, args.readme_count, template_path, repeat, args.seed)
+        if "write" in stages:
+            results += bench_write(work_dir, args.write_count, template_path, repeat, args.seed)
+
+    report: dict = {
+        "version": RESULT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "catalog_sizes": args.catalog_sizes,
+            "readme_sizes_kb": args.readme_sizes,
+            "readme_count": args.readme_count,
+            "write_count": args.write_count,
+            "repeat": repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            logger.warning("ベースラインとパラメータが異なります: %s", baseline.get("params"))
+        rows = compare(results, baseline.get("results", []), args.tolerance)
+        report["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "rows": rows}
+        _print_comparison(rows)
+        regressions = sum(row["regression"] for row in rows)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if regressions:
+        logger.warning("ベースラインより悪化: %d 件", regressions)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
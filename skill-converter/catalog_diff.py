@@ -0,0 +1,144 @@
+"""前回変換したカタログとの差分を求めるモジュール。
+
+変換に成功したエントリの内容ハッシュを slug ごとにマニフェストとして保存し、
+次回はカタログを added / changed / unchanged / removed に分類して、
+added と changed だけを取得・生成の対象にする。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def entry_hash(entry: dict) -> str:
+    """カタログエントリの内容ハッシュ（キー順に依存しない）を返す。"""
+    canonical = json.dumps(entry, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CatalogDiff:
+    """カタログとマニフェストの差分。
+
+    Attributes:
+        added: マニフェストにない slug のエントリ
+        changed: マニフェストと内容ハッシュが異なるエントリ
+        unchanged: 内容が変わっていないエントリ数
+        removed: マニフェストにあるがカタログから消えた slug
+        pending: added と changed を合わせたエントリ（カタログ順）
+        hashes: pending エントリの slug → 内容ハッシュ
+        existing: added のうち出力先に既にあるため変換しなかった slug
+            （変換したものと同様にマニフェストに記録する）
+    """
+
+    def __init__(self) -> None:
+        self.added: list[dict] = []
+        self.changed: list[dict] = []
+        self.unchanged = 0
+        self.removed: list[str] = []
+        self.pending: list[dict] = []
+        self.hashes: dict[str, str] = {}
+        self.existing: list[str] = []
+
+    @property
+    def changed_slugs(self) -> set[str]:
+        return {e.get("slug", "") for e in self.changed}
+
+
+def iter_diff(entries: Iterable[dict], manifest: dict[str, str], diff: CatalogDiff) -> Iterator[dict]:
+    """カタログをマニフェストと比較して diff に分類しながら、エントリをそのまま返す。
+
+    カタログを 1 回だけ読んで、差分とフィルタを同時に求めるために使う。
+    同じ slug が複数回現れる場合、分類には最初のエントリだけを使う（返すのは全件）。
+    diff.removed は最後まで読んだ時点で確定する。
+
+    Args:
+        entries: カタログエントリ（イテレータ可）
+        manifest: slug → 前回変換時の内容ハッシュ
+        diff: 分類結果を書き込む CatalogDiff
+
+    Yields:
+        entries の各エントリ
+    """
+    seen: set[str] = set()
+
+    for entry in entries:
+        yield entry
+        slug = entry.get("slug", "")
+        if slug in seen:
+            continue
+        seen.add(slug)
+
+        digest = entry_hash(entry)
+        previous = manifest.get(slug)
+        if previous == digest:
+            diff.unchanged += 1
+            continue
+
+        diff.pending.append(entry)
+        diff.hashes[slug] = digest
+        if previous is None:
+            diff.added.append(entry)
+        else:
+            diff.changed.append(entry)
+
+    diff.removed = [slug for slug in manifest if slug not in seen]
+    logger.info(
+        "カタログ差分: 追加 %d / 変更 %d / 変更なし %d / 削除 %d",
+        len(diff.added), len(diff.changed), diff.unchanged, len(diff.removed),
+    )
+
+
+def diff_catalog(entries: Iterable[dict], manifest: dict[str, str]) -> CatalogDiff:
+    """カタログをマニフェストと比較して分類する。
+
+    同じ slug が複数回現れる場合は最初のエントリだけを見る。
+
+    Args:
+        entries: カタログエントリ（イテレータ可）
+        manifest: slug → 前回変換時の内容ハッシュ
+
+    Returns:
+        CatalogDiff
+    """
+    diff = CatalogDiff()
+    for _ in iter_diff(entries, manifest, diff):
+        pass
+    return diff
+
+
+def load_manifest(path: str | Path) -> dict[str, str]:
+    """マニフェストを読み込む。存在しない・壊れている場合は空とみなす。"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("マニフェストを読み込めないため全件を新規扱い: %s", e)
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        logger.info("マニフェストのバージョンが異なるため全件を新規扱い")
+        return {}
+    return data.get("entries", {})
+
+
+def save_manifest(path: str | Path, manifest: dict[str, str]) -> None:
+    """マニフェストを一時ファイル経由で原子的に書き出す。"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(
+        json.dumps({"version": MANIFEST_VERSION, "entries": manifest}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+    logger.info("マニフェスト保存: %d 件", len(manifest))
@@ -0,0 +1,224 @@
+"""skills.json をインデックス付きの SQLite に保持するモジュール。
+
+カタログキャッシュから一度だけ構築し、以降は config.yaml の filter 条件を
+インデックスを使ったクエリとして実行する。キャッシュファイルが更新された
+場合のみ再構築する。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+
+import yaml
+
+from json_stream import iter_json_file
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS skills (
+    pos INTEGER PRIMARY KEY,
+    slug TEXT,
+    category TEXT,
+    quality_score REAL,
+    source_type TEXT,
+    security_risk TEXT,
+    source_url TEXT,
+    data TEXT NOT NULL
+);
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_skills_category ON skills (category);
+CREATE INDEX IF NOT EXISTS idx_skills_source_type ON skills (source_type);
+CREATE INDEX IF NOT EXISTS idx_skills_security_risk ON skills (security_risk);
+CREATE INDEX IF NOT EXISTS idx_skills_quality ON skills (quality_score DESC, pos);
+CREATE INDEX IF NOT EXISTS idx_skills_source_url ON skills (source_url, pos);
+"""
+
+_BATCH_SIZE = 5000
+
+
+def _row(pos: int, entry: dict) -> tuple:
+    """エントリを skills テーブルの行に変換する。欠損値は filter_candidates と同じ既定値にする。"""
+    return (
+        pos,
+        entry.get("slug"),
+        entry.get("category"),
+        entry.get("quality_score", 0.0),
+        entry.get("source_type"),
+        entry.get("security_risk", "unknown"),
+        entry.get("source_url", ""),
+        json.dumps(entry, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+class CatalogStore:
+    """カタログのインデックス付きローカルストア。"""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _get_meta(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM skills").fetchone()[0]
+
+    def iter_entries(self) -> Iterator[dict]:
+        """全エントリをカタログ順に返す。"""
+        for (data,) in self._conn.execute("SELECT data FROM skills ORDER BY pos"):
+            yield json.loads(data)
+
+    def sync(self, catalog_path: str | Path) -> bool:
+        """カタログキャッシュが前回構築時から変わっていればストアを再構築する。
+
+        Args:
+            catalog_path: skills.json キャッシュのパス
+
+        Returns:
+            再構築した場合 True
+        """
+        catalog_path = Path(catalog_path)
+        stat = catalog_path.stat()
+        signature = f"{stat.st_mtime_ns}:{stat.st_size}"
+        if self._get_meta("source_signature") == signature:
+            logger.info("カタログストアは最新: %d 件", self.count())
+            return False
+
+        logger.info("カタログストアを再構築: %s", catalog_path)
+        with self._conn:
+            self._conn.execute("DELETE FROM skills")
+            # 一括投入中はインデックスを外して最後に作り直す
+            for name in ("category", "source_type", "security_risk", "quality", "source_url"):
+                self._conn.execute(f"DROP INDEX IF EXISTS idx_skills_{name}")
+            batch: list[tuple] = []
+            for pos, entry in enumerate(iter_json_file(catalog_path)):
+                if not isinstance(entry, dict):
+                    continue
+                batch.append(_row(pos, entry))
+                if len(batch) >= _BATCH_SIZE:
+                    self._conn.executemany("INSERT INTO skills VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    batch.clear()
+            if batch:
+                self._conn.executemany("INSERT INTO skills VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            for statement in _INDEXES.strip().split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('source_signature', ?)",
+                (signature,),
+            )
+        self._conn.execute("ANALYZE")
+        logger.info("カタログストア構築完了: %d 件", self.count())
+        return True
+
+    def query_candidates(self, config: dict) -> list[dict]:
+        """filter_candidates と同じ条件・順序で候補を返す。
+
+        条件に合うエントリのうち source_url ごとにカタログ上で最初のものだけを残し、
+        quality_score 降順（同点はカタログ順）で max_skills_per_run 件を返す。
+
+        Args:
+            config: config.yaml の filter セクションの辞書
+
+        Returns:
+            フィルタ済みのスキルリスト（quality_score 降順、上限適用済み）
+        """
+        categories = list(dict.fromkeys(config.get("categories", [])))
+        source_types = list(dict.fromkeys(config.get("source_types", [])))
+        risk_exclude = list(dict.fromkeys(config.get("security_risk_exclude", [])))
+        min_quality = config.get("min_quality_score", 0.0)
+        max_per_run = config.get("max_skills_per_run", 50)
+
+        if not categories or not source_types:
+            logger.info("インデックス検索: カテゴリまたはソース種別が未指定のため 0 件")
+            return []
+
+        def placeholders(values: list) -> str:
+            return ", ".join("?" * len(values))
+
+        where = [
+            f"category IN ({placeholders(categories)})",
+            "quality_score >= ?",
+            f"source_type IN ({placeholders(source_types)})",
+        ]
+        params: list = [*categories, min_quality, *source_types]
+        if risk_exclude:
+            # "security_risk": null のエントリは NULL で入る。filter_candidates と同じく除外しない
+            where.append(f"(security_risk IS NULL OR security_risk NOT IN ({placeholders(risk_exclude)}))")
+            params.extend(risk_exclude)
+
+        sql = f"""
+            WITH filtered AS (
+                SELECT pos, source_url, quality_score, data FROM skills
+                WHERE {" AND ".join(where)}
+            ),
+            firsts AS (
+                SELECT MIN(pos) AS pos FROM filtered GROUP BY source_url
+            )
+            SELECT data FROM filtered JOIN firsts USING (pos)
+            ORDER BY quality_score DESC, pos ASC
+            LIMIT ?
+        """
+        params.append(max_per_run)
+        result = [json.loads(row[0]) for row in self._conn.execute(sql, params)]
+        logger.info("インデックス検索: %d 件 (max=%d)", len(result), max_per_run)
+        return result
+
+
+def main() -> None:
+    """フィルタ条件を一時的に変えて候補を確認する（what-if 用）。"""
+    parser = argparse.ArgumentParser(description="カタログストアに対してフィルタを試す")
+    parser.add_argument(
+        "--config",
+        default=str(Path(__file__).parent / "config.yaml"),
+        help="config.yaml のパス",
+    )
+    parser.add_argument("--category", action="append", help="カテゴリ（複数指定可、config を上書き）")
+    parser.add_argument("--min-quality", type=float, help="最低 quality_score（config を上書き）")
+    parser.add_argument("--limit", type=int, help="最大件数（config を上書き）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with open(args.config, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    filter_cfg = dict(config["filter"])
+    if args.category:
+        filter_cfg["categories"] = args.category
+    if args.min_quality is not None:
+        filter_cfg["min_quality_score"] = args.min_quality
+    if args.limit is not None:
+        filter_cfg["max_skills_per_run"] = args.limit
+
+    cache_dir = Path(config["catalog"]["cache_dir"])
+    store = CatalogStore(cache_dir / "catalog.sqlite3")
+    try:
+        store.sync(cache_dir / "skills.json")
+        for entry in store.query_candidates(filter_cfg):
+            print(f"{entry.get('quality_score', 0.0):>5} {entry.get('category', '')}\t{entry.get('slug', '')}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""リポジトリ内ファイルの取得結果をディスクに保持するキャッシュ。
+
+owner/repo/path をキーに本文・ETag・最終確認時刻を SQLite に保存する。
+本文がある（正の）エントリは ETag による条件付きリクエストで再検証し、
+404 だった（負の）エントリは確認のたびに TTL を伸ばしながら再問い合わせを
+抑制する。合計サイズが上限を超えたら最終利用時刻の古い順に削除する。
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    body TEXT,
+    etag TEXT,
+    checked_at REAL NOT NULL,
+    miss_count INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+"""
+
+
+class CacheEntry:
+    """キャッシュの 1 エントリ。body が None なら「存在しない」ことを表す負のエントリ。"""
+
+    def __init__(
+        self,
+        key: str,
+        body: str | None,
+        etag: str | None,
+        checked_at: float,
+        miss_count: int,
+    ) -> None:
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.checked_at = checked_at
+        self.miss_count = miss_count
+
+    @property
+    def is_negative(self) -> bool:
+        return self.body is None
+
+
+class ContentCache:
+    """ETag 再検証と負のキャッシュを備えた SQLite ベースのコンテンツキャッシュ。
+
+    GitHubClient のスレッドプールから共有されるため、接続はロックで保護する。
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = 256 * 1024 * 1024,
+        negative_ttl_hours: float = 6.0,
+        max_negative_ttl_hours: float = 24.0 * 14,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl_hours * 3600
+        self.max_negative_ttl = max_negative_ttl_hours * 3600
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        self._total_bytes = row[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def reset_stats(self) -> None:
+        """ヒット・ミス・再検証の回数を 0 に戻す（実行ごとに数え直すため）。"""
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def negative_ttl_for(self, miss_count: int) -> float:
+        """連続 404 回数に応じた負のエントリの TTL（秒）。回数ごとに倍になる。"""
+        return min(self.negative_ttl * (2 ** max(miss_count - 1, 0)), self.max_negative_ttl)
+
+    def get(self, key: str) -> CacheEntry | None:
+        """キーに対応するエントリを返し、最終利用時刻を更新する。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, checked_at, miss_count FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key),
+            )
+            self._conn.commit()
+        return CacheEntry(key, row[0], row[1], row[2], row[3])
+
+    def is_fresh_negative(self, entry: CacheEntry) -> bool:
+        """負のエントリが TTL 内（再問い合わせ不要）かどうか。"""
+        if not entry.is_negative:
+            return False
+        return time.time() - entry.checked_at < self.negative_ttl_for(entry.miss_count)
+
+    def put(self, key: str, body: str, etag: str | None) -> None:
+        """取得した本文と ETag を保存する。"""
+        size = len(key) + len(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._replace(key, body, etag, now, 0, size)
+            self._evict()
+
+    def put_missing(self, key: str, previous: CacheEntry | None = None) -> None:
+        """存在しない（404）ことを記録する。連続回数が増えるほど TTL が伸びる。"""
+        miss_count = previous.miss_count + 1 if previous and previous.is_negative else 1
+        with self._lock:
+            self._replace(key, None, None, time.time(), miss_count, len(key))
+            self._evict()
+
+    def touch(self, key: str) -> None:
+        """304 で再検証できたエントリの確認時刻を更新する。"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET checked_at = ? WHERE key = ?", (time.time(), key),
+            )
+            self._conn.commit()
+
+    def _replace(
+        self,
+        key: str,
+        body: str | None,
+        etag: str | None,
+        now: float,
+        miss_count: int,
+        size: int,
+    ) -> None:
+        old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if old is not None:
+            self._total_bytes -= old[0]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries"
+            " (key, body, etag, checked_at, miss_count, size, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, body, etag, now, miss_count, size, now),
+        )
+        self._conn.commit()
+        self._total_bytes += size
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えていれば最終利用時刻の古い順に削除する（ロック保持中に呼ぶ）。"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        victims: list[str] = []
+        cursor = self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_used ASC",
+        )
+        for key, size in cursor:
+            if self._total_bytes <= self.max_bytes:
+                break
+            victims.append(key)
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in victims])
+        self._conn.commit()
+        logger.debug("コンテンツキャッシュ退避: %d 件", len(victims))
@@ -8,48 +8,31 @@ from __future__ import annotations
 import argparse
 import logging
 import sys
-from datetime import datetime
+import time
 from pathlib import Path
 
 import yaml
 
-from fetch_catalog import check_skill_md_exists, fetch_readme, fetch_skills_json
-from filter import filter_pipeline
-from generator import adapt_existing_skill_md, generate_skill_md, validate_name
+import fetch_catalog
+import generator
+import metrics
+from catalog_diff import CatalogDiff, entry_hash, load_manifest, save_manifest
+from catalog_store import CatalogStore
+from fetch_catalog import ensure_skills_cache, fetch_batch_size, fetch_sources_many, iter_skills_json, plan_fetches
+from filter import filter_pipeline, filter_pipeline_incremental, filter_pipeline_indexed
+from generator import GENERATOR_VERSION, validate_name
+from log_setup import setup_logging
+from metrics import recorder
+from pipeline import Pipeline
+from rate_limit import DeferredEntry
+from render_pool import RenderOutcome, RenderPool
+from run_journal import JOURNAL_FILENAME, ResumeState, RunJournal, config_fingerprint
+from skill_index import INDEX_FILENAME, SkillIndex
+from skill_writer import SkillWriter
 
 logger = logging.getLogger("convert")
 
 
-def setup_logging(log_dir: str | Path, verbose: bool = False) -> None:
-    """ロガーを設定する。"""
-    log_path = Path(log_dir)
-    log_path.mkdir(parents=True, exist_ok=True)
-
-    today = datetime.now().strftime("%Y%m%d")
-    log_file = log_path / f"convert-{today}.log"
-
-    fmt = "%(asctime)s %(levelname)s %(name)s: %(message)s"
-    level = logging.DEBUG if verbose else logging.INFO
-
-    # ルートロガーを設定
-    root = logging.getLogger()
-    root.setLevel(level)
-
-    # FileHandler
-    fh = logging.FileHandler(log_file, encoding="utf-8")
-    fh.setLevel(level)
-    fh.setFormatter(logging.Formatter(fmt))
-    root.addHandler(fh)
-
-    # StreamHandler (stderr)
-    sh = logging.StreamHandler(sys.stderr)
-    sh.setLevel(level)
-    sh.setFormatter(logging.Formatter(fmt))
-    root.addHandler(sh)
-
-    logger.info("ログ出力先: %s", log_file)
-
-
 def load_config(config_path: str | Path) -> dict:
     """config.yaml を読み込む。"""
     path = Path(config_path)
@@ -67,45 +50,278 @@ def load_config(config_path: str | Path) -> dict:
         sys.exit(1)
 
 
-def run(config: dict, dry_run: bool = False) -> None:
-    """変換パイプラインを実行する。"""
+def run(
+    config: dict,
+    dry_run: bool = False,
+    jobs: int = 1,
+    resume: bool = False,
+    session: ConvertSession | None = None,
+    entries: list[dict] | None = None,
+) -> dict[str, int]:
+    """変換パイプラインを実行する。
+
+    metrics.enabled なら実行中の計測値を集め、終了時（失敗時も）に書き出す。
+
+    Args:
+        config: config.yaml の内容
+        dry_run: True ならファイルを書き出さない
+        jobs: SKILL.md の生成に使うプロセス数（1 なら逐次）
+        resume: True ならジャーナルから中断した実行を再開する
+        session: 使い回す ConvertSession（daemon モード）。None ならこの実行の間だけ作る
+        entries: メモリ上のカタログ。指定するとカタログを取得・パースせずにこれを使う
+
+    Returns:
+        件数のサマリー（candidates / success / skipped / errors / deferred）
+    """
+    metrics_cfg = config.get("metrics", {})
+    if not metrics_cfg.get("enabled", False):
+        return _run(config, dry_run, jobs, resume, session, entries)
+
+    metrics_recorder = metrics.enable(slowest=metrics_cfg.get("slowest", 10))
+    try:
+        return _run(config, dry_run, jobs, resume, session, entries)
+    finally:
+        metrics.disable()
+        log_dir = config.get("output", {}).get("log_dir", str(Path(__file__).parent / "logs"))
+        metrics_recorder.write(
+            metrics_cfg.get("json_path") or Path(log_dir) / "metrics.json",
+            metrics_cfg.get("prometheus_path"),
+        )
+
+
+class ConvertSession:
+    """複数回の実行で使い回す状態。
+
+    取得バックエンド（HTTP 接続・コンテンツキャッシュ・レート制限の追跡）、
+    コンパイル済みテンプレート、スキル索引、マニフェスト、生成段のワーカー
+    プロセスを持つ。1 回だけ実行する CLI では run() が作って閉じ、daemon
+    モードでは常駐している間使い回す。出力ディレクトリの走査（索引と出力
+    ファイルの照合）は作成時の 1 回だけ行う。
+
+    Attributes:
+        stale: 再生成が必要なスキル名（ジェネレータのバージョンが古い・出力が消えた）。
+            手で書き換えられた出力は含めない。既存でも変換候補に残し、書き出したものから取り除く
+
+    Args:
+        config: config.yaml の内容
+        jobs: SKILL.md の生成に使うプロセス数
+    """
+
+    def __init__(self, config: dict, jobs: int = 1) -> None:
+        catalog_cfg = config["catalog"]
+        output_cfg = config["output"]
+        self.jobs = jobs
+        self.template_path = output_cfg["template"]
+        fetch_catalog.configure(config.get("fetch", {}), cache_dir=catalog_cfg["cache_dir"])
+        self.bytecode_cache_dir = Path(catalog_cfg["cache_dir"]) / "jinja"
+        generator.set_bytecode_cache_dir(self.bytecode_cache_dir)
+        self.index = SkillIndex(Path(catalog_cfg["cache_dir"]) / INDEX_FILENAME, Path(output_cfg["dir"]))
+        # 手で書き換えられた出力は上書きしないよう、再生成の対象に含めない
+        self.stale: set[str] = set(self.index.find_stale(GENERATOR_VERSION, include_modified=False))
+        if self.stale:
+            logger.info("再生成が必要な既存スキル: %d 件", len(self.stale))
+        self._manifests: dict[Path, dict[str, str]] = {}
+        self._render_pool: RenderPool | None = None
+
+    def manifest(self, path: Path) -> dict[str, str]:
+        """マニフェストを返す。初回だけファイルから読み、以降は同じ辞書を返す。"""
+        if path not in self._manifests:
+            self._manifests[path] = load_manifest(path)
+        return self._manifests[path]
+
+    def render_pool(self) -> RenderPool:
+        """生成段の実行器。ワーカープロセスは初めて使うときに起動する。"""
+        if self._render_pool is None:
+            self._render_pool = RenderPool(
+                self.template_path, jobs=self.jobs, bytecode_cache_dir=self.bytecode_cache_dir,
+            ).__enter__()
+        return self._render_pool
+
+    def close(self) -> None:
+        """ワーカープロセスと取得バックエンドを閉じる。"""
+        if self._render_pool is not None:
+            self._render_pool.__exit__(None, None, None)
+            self._render_pool = None
+        fetch_catalog.close()
+
+
+def _open_journal(
+    config: dict, fingerprint: str, dry_run: bool, resume: bool,
+) -> tuple[RunJournal | None, ResumeState | None]:
+    """実行ジャーナルを用意し、resume なら中断した実行の状態を読み込む。
+
+    dry-run では何も書き出さないのでジャーナルも使わない。
+
+    Returns:
+        (ジャーナル（使わないなら None）, 再開する実行の状態（再開しないなら None）)
+    """
+    journal_cfg = config.get("journal", {})
+    if dry_run or not journal_cfg.get("enabled", True):
+        if resume:
+            logger.warning("ジャーナルを使わない設定のため --resume は無視します")
+        return None, None
+
+    path = journal_cfg.get("path") or Path(config["catalog"]["cache_dir"]) / JOURNAL_FILENAME
+    journal = RunJournal(path)
+    state = journal.load(fingerprint) if resume else None
+    return journal, state
+
+
+def _run(
+    config: dict,
+    dry_run: bool,
+    jobs: int,
+    resume: bool = False,
+    session: ConvertSession | None = None,
+    entries: list[dict] | None = None,
+) -> dict[str, int]:
+    """run の本体。"""
+    owns_session = session is None
+    if session is None:
+        session = ConvertSession(config, jobs)
+    try:
+        return _run_session(config, dry_run, resume, session, entries, owns_session)
+    finally:
+        # セッションを使い回す場合も、キャッシュのヒット数や API の使用回数はこの実行の分を出す
+        fetch_catalog.finish_run()
+        if owns_session:
+            session.close()
+
+
+def _run_session(
+    config: dict,
+    dry_run: bool,
+    resume: bool,
+    session: ConvertSession,
+    entries: list[dict] | None,
+    owns_session: bool,
+) -> dict[str, int]:
+    """セッションを使って 1 回分の変換を行う。"""
+    metrics_recorder = recorder()
     catalog_cfg = config["catalog"]
     filter_cfg = config["filter"]
     output_cfg = config["output"]
 
+    fetch_cfg = config.get("fetch", {})
+
     output_dir = Path(output_cfg["dir"])
-    template_path = output_cfg["template"]
 
-    # カタログ取得
+    # カタログ取得 → フィルタリング
+    # incremental なら前回変換時からの差分だけを対象にする
+    use_index = catalog_cfg.get("use_index", False) and entries is None
+    incremental = catalog_cfg.get("incremental", False)
+    manifest_path = Path(catalog_cfg["cache_dir"]) / "catalog_manifest.json"
+    manifest: dict[str, str] = session.manifest(manifest_path) if incremental else {}
+    diff = None
+    index = session.index
+    # 再生成が必要な既存スキルは、出力先にあっても除外しない
+    regenerate = session.stale
+    if incremental and regenerate:
+        # カタログ側が変わっていなくても差分に現れるよう、マニフェストから外しておく
+        for slug in [slug for slug in manifest if validate_name(slug) in regenerate]:
+            del manifest[slug]
+    fingerprint = config_fingerprint(config, GENERATOR_VERSION)
+    journal, resume_state = _open_journal(config, fingerprint, dry_run, resume)
+    catalog_started = time.perf_counter()
     try:
-        skills = fetch_skills_json(
-            repo=catalog_cfg["repo"],
-            path=catalog_cfg["path"],
-            cache_dir=catalog_cfg["cache_dir"],
-            cache_ttl_hours=catalog_cfg.get("cache_ttl_hours", 24),
-        )
+        if resume_state is not None:
+            # 中断した実行の候補をそのまま使い、カタログの取得とフィルタは行わない
+            candidates = resume_state.pending
+            if resume_state.incremental:
+                diff = CatalogDiff()
+                diff.removed = resume_state.removed
+                diff.hashes = {e.get("slug", ""): entry_hash(e) for e in resume_state.candidates}
+                # 中断前に完了したエントリのマニフェスト更新は保存されていない
+                for slug in resume_state.done:
+                    manifest[slug] = diff.hashes[slug]
+            journal.resume(fingerprint, resume_state)
+        elif use_index:
+            # キャッシュからインデックス付きストアを同期（カタログ全体はメモリに載せない）
+            catalog_path = ensure_skills_cache(
+                repo=catalog_cfg["repo"],
+                path=catalog_cfg["path"],
+                cache_dir=catalog_cfg["cache_dir"],
+                cache_ttl_hours=catalog_cfg.get("cache_ttl_hours", 24),
+            )
+            store = CatalogStore(Path(catalog_cfg["cache_dir"]) / "catalog.sqlite3")
+            try:
+                store.sync(catalog_path)
+                logger.info("カタログ取得: %d 件", store.count())
+                if incremental:
+                    diff, candidates = filter_pipeline_incremental(
+                        store.iter_entries(), manifest, filter_cfg, output_dir, index=index, keep=regenerate,
+                    )
+                else:
+                    candidates = filter_pipeline_indexed(store, filter_cfg, output_dir, index=index, keep=regenerate)
+            finally:
+                store.close()
+        else:
+            # ダウンロード・パースしながらエントリを 1 件ずつフィルタに流す
+            # （メモリ上のカタログを渡されたらそれを使う）
+            skills = entries if entries is not None else iter_skills_json(
+                repo=catalog_cfg["repo"],
+                path=catalog_cfg["path"],
+                cache_dir=catalog_cfg["cache_dir"],
+                cache_ttl_hours=catalog_cfg.get("cache_ttl_hours", 24),
+            )
+            if incremental:
+                diff, candidates = filter_pipeline_incremental(
+                    skills, manifest, filter_cfg, output_dir, index=index, keep=regenerate,
+                )
+            else:
+                candidates = filter_pipeline(skills, filter_cfg, output_dir, index=index, keep=regenerate)
     except Exception as e:
         logger.error("カタログ取得に失敗: %s", e)
+        if not owns_session:
+            raise
         sys.exit(1)
+    if diff is not None and diff.existing and not dry_run:
+        # 出力先に既にあって変換しなかったエントリも記録し、次回から変更なしとして扱う
+        for slug in diff.existing:
+            manifest[slug] = diff.hashes[slug]
+    # 優先度（quality_score）順に並べ、API の残り回数で取得できない分は次回に回す
+    candidates, planned_deferred = plan_fetches(candidates)
+    if journal is not None and resume_state is None:
+        journal.begin(
+            fingerprint, candidates,
+            removed=diff.removed if diff is not None else None,
+            incremental=diff is not None,
+        )
+    metrics_recorder.set("phase_seconds", time.perf_counter() - catalog_started, phase="catalog")
+    metrics_recorder.set("candidates", len(candidates))
 
-    logger.info("カタログ取得: %d 件", len(skills))
-
-    # フィルタリング
-    candidates = filter_pipeline(skills, filter_cfg, output_dir)
+    if diff is not None and diff.removed:
+        logger.info("カタログから削除されたスキル: %s", ", ".join(diff.removed))
     logger.info("変換候補: %d 件", len(candidates))
 
     if not candidates:
         logger.info("変換対象なし。終了します。")
-        return
-
-    # 各候補を変換
+        if diff is not None and (diff.removed or diff.existing or resume_state is not None) and not dry_run:
+            for slug in diff.removed:
+                manifest.pop(slug, None)
+            save_manifest(manifest_path, manifest)
+        if journal is not None:
+            journal.complete({"success": 0, "skipped": 0, "errors": 0})
+        return {"candidates": 0, "success": 0, "skipped": 0, "errors": 0, "deferred": len(planned_deferred)}
+
+    # 取得 → 生成 → 書き出しをキューでつないだ段として並行に流す
+    # （取得は fetch.workers 本、生成は jobs プロセス、書き出しはこのスレッドで 1 件ずつ）
+    # 内容が変わらないファイルは書き込まず skipped として数える
     success = 0
     skipped = 0
     errors = 0
+    deferred = 0
+    writer = SkillWriter(output_dir, fsync=output_cfg.get("fsync", "batch"))
 
-    for entry in candidates:
+    def write(entry: dict, sources: tuple[str | None, str | None] | Exception, outcome: RenderOutcome) -> None:
+        nonlocal success, skipped, errors, deferred
         slug = entry.get("slug", "")
-        source_url = entry.get("source_url", "")
+        if isinstance(sources, DeferredEntry):
+            # 取得していないので、索引・マニフェストに載らず次回の候補に残る
+            logger.info("[%s] 取得を次回に延期: %s", slug, sources, extra={"slug": slug, "stage": "fetch"})
+            deferred += 1
+            metrics_recorder.count("entries", result="deferred")
+            return
 
         try:
             # スラッグ検証
@@ -113,32 +329,79 @@ def run(config: dict, dry_run: bool = False) -> None:
             if name != slug:
                 logger.info("スラッグ修正: %s → %s", slug, name)
 
-            # 既存 SKILL.md の確認
-            existing_skill_md = check_skill_md_exists(source_url)
+            if isinstance(sources, Exception):
+                raise sources
+            existing_skill_md, _readme = sources
 
+            render_fields = {"slug": name, "stage": "render", "duration": outcome.seconds}
             if existing_skill_md:
-                logger.info("[%s] 既存 SKILL.md を検出、アダプト", name)
-                content = adapt_existing_skill_md(existing_skill_md, entry)
+                logger.debug("[%s] 既存 SKILL.md を検出、アダプト", name, extra=render_fields)
             else:
-                logger.info("[%s] README から SKILL.md を生成", name)
-                readme = fetch_readme(source_url)
-                content = generate_skill_md(entry, readme, template_path)
+                logger.debug("[%s] README から SKILL.md を生成", name, extra=render_fields)
+            content = outcome.result()
 
             # 書き出し
+            changed = True
             if dry_run:
-                logger.info("[DRY-RUN] %s/SKILL.md:\n%s", name, content[:200])
+                write_fields = {"slug": name, "stage": "write"}
+                logger.info("[DRY-RUN] %s/SKILL.md: %d 文字", name, len(content), extra=write_fields)
+                # 内容のプレビューは --verbose のときだけ
+                logger.debug("[DRY-RUN] %s/SKILL.md:\n%s", name, content[:200], extra=write_fields)
             else:
-                skill_dir = output_dir / name
-                skill_dir.mkdir(parents=True, exist_ok=True)
-                skill_file = skill_dir / "SKILL.md"
-                skill_file.write_text(content, encoding="utf-8")
-                logger.info("[%s] 書き出し完了: %s", name, skill_file)
-
-            success += 1
+                write_started = time.perf_counter()
+                skill_file, changed = writer.write(name, content, index.output_hash(name))
+                write_fields = {"slug": name, "stage": "write", "duration": time.perf_counter() - write_started}
+                if changed:
+                    logger.info("[%s] 書き出し完了: %s", name, skill_file, extra=write_fields)
+                else:
+                    logger.info("[%s] 変更なし: %s", name, skill_file, extra=write_fields)
+                index.record(name, entry, content, GENERATOR_VERSION)
+                regenerate.discard(name)
+                if diff is not None:
+                    manifest[slug] = diff.hashes[slug]
+                if journal is not None:
+                    journal.record_done(slug)
+
+            if changed:
+                success += 1
+                metrics_recorder.count("entries", result="success")
+            else:
+                skipped += 1
+                metrics_recorder.count("entries", result="skipped")
 
         except Exception as e:
-            logger.error("[%s] 変換エラー: %s", slug, e, exc_info=True)
+            logger.error("[%s] 変換エラー: %s", slug, e, exc_info=True, extra={"slug": slug})
             errors += 1
+            metrics_recorder.count("entries", result="error")
+
+    pipeline_cfg = config.get("pipeline", {})
+    try:
+        with metrics_recorder.timed("pipeline"):
+            Pipeline(
+                fetch=journal.wrap_fetch(fetch_sources_many) if journal is not None else fetch_sources_many,
+                write=write,
+                render_pool=session.render_pool(),
+                fetch_workers=fetch_cfg.get("workers", 1),
+                fetch_batch=fetch_batch_size(),
+                queue_size=pipeline_cfg.get("queue_size", 32),
+                monitor_interval=pipeline_cfg.get("monitor_interval_seconds", 5),
+            ).run(candidates)
+    finally:
+        writer.sync()
+        # 索引は書き出しごとではなく、実行の終わりにまとめて保存する
+        index.flush()
+        if journal is not None:
+            # 途中で終わった場合はジャーナルが残り、--resume で続きから実行できる
+            journal.close()
+
+    # マニフェスト更新（成功したエントリのハッシュを記録し、削除分を落とす）
+    if diff is not None and not dry_run:
+        for slug in diff.removed:
+            manifest.pop(slug, None)
+        save_manifest(manifest_path, manifest)
+
+    if journal is not None:
+        journal.complete({"success": success, "skipped": skipped, "errors": errors, "deferred": deferred})
 
     # サマリー
     total = success + skipped + errors
@@ -146,6 +409,18 @@ def run(config: dict, dry_run: bool = False) -> None:
         "変換完了: 合計 %d 件 (成功: %d, スキップ: %d, エラー: %d)",
         total, success, skipped, errors,
     )
+    if planned_deferred or deferred:
+        logger.info(
+            "次回に延期: %d 件 (取得計画で %d 件、レート制限の残り不足で実行中に %d 件)",
+            len(planned_deferred) + deferred, len(planned_deferred), deferred,
+        )
+    return {
+        "candidates": len(candidates),
+        "success": success,
+        "skipped": skipped,
+        "errors": errors,
+        "deferred": len(planned_deferred) + deferred,
+    }
 
 
 def main() -> None:
@@ -163,6 +438,29 @@ def main() -> None:
         action="store_true",
         help="ファイル書き出しを行わず、変換結果をログに出力",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="SKILL.md の生成を N プロセスで並列に行う (デフォルト: 1)",
+    )
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument(
+        "--record",
+        metavar="PATH",
+        help="GitHub からの応答を PATH のアーカイブに記録する",
+    )
+    archive.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="PATH のアーカイブだけを使って実行する（ネットワークに接続しない）",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="中断した実行をジャーナルから再開する（完了済みのエントリと取得済みの内容を再利用）",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -172,15 +470,26 @@ def main() -> None:
     args = parser.parse_args()
 
     config = load_config(args.config)
+    if args.record or args.replay:
+        config.setdefault("fetch", {})["archive"] = {
+            "mode": "record" if args.record else "replay",
+            "path": args.record or args.replay,
+        }
 
     # ロギング設定（config 読み込み後）
     log_dir = config.get("output", {}).get(
         "log_dir",
         str(Path(__file__).parent / "logs"),
     )
-    setup_logging(log_dir, verbose=args.verbose)
+    log_cfg = config.get("logging", {})
+    setup_logging(
+        log_dir,
+        verbose=args.verbose,
+        log_format=log_cfg.get("format", "text"),
+        entry_debug_per_second=log_cfg.get("entry_debug_per_second", 0),
+    )
 
-    run(config, dry_run=args.dry_run)
+    run(config, dry_run=args.dry_run, jobs=args.jobs, resume=args.resume)
 
 
 if __name__ == "__main__":
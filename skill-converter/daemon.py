@@ -0,0 +1,397 @@
+"""変換を常駐して行う daemon モード。
+
+python daemon.py で起動する。取得バックエンド（HTTP の接続・コンテンツ
+キャッシュ・レート制限の追跡）、コンパイル済みテンプレート、スキル索引、
+パース済みのカタログをメモリに持ったまま、一定間隔でカタログ（skills.json）の
+更新を条件付きリクエストで確かめ、変わっていれば前回の変換からの差分だけを
+変換する。カタログが変わっていなければ API は 1 回（304）しか呼ばない。
+
+ローカルの制御ソケット（Unix ドメインソケット）で 1 行 1 JSON のコマンドを受け付ける。
+python daemon.py --control <コマンド> で送れる。
+
+    {"command": "run"}     次の確認を待たずに、すぐ確認して変換する
+    {"command": "status"}  実行中か、前回の結果、次の確認時刻などを返す
+    {"command": "stop"}    実行中の変換が終わったら終了する
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from convert import ConvertSession, load_config, run
+from fetch_catalog import iter_skills_json, poll_catalog
+from log_setup import setup_logging
+
+logger = logging.getLogger("daemon")
+
+SOCKET_FILENAME = "convert.sock"
+_VERSION_FILENAME = "skills.json.version"
+_MAX_COMMAND_BYTES = 4096
+
+
+def socket_path(config: dict) -> Path:
+    """制御ソケットのパス（daemon.socket、未指定なら catalog.cache_dir/convert.sock）。"""
+    path = config.get("daemon", {}).get("socket")
+    return Path(path) if path else Path(config["catalog"]["cache_dir"]) / SOCKET_FILENAME
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _timestamp(seconds: float | None) -> str | None:
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat(timespec="seconds")
+
+
+class ConvertDaemon:
+    """カタログの更新を定期的に確かめ、差分だけを変換する常駐プロセス。
+
+    変換は serve_forever() を呼んだスレッドで 1 回ずつ行い、制御ソケットの
+    スレッドはフラグを立てて起こすだけにする（変換が重ならない）。
+
+    Args:
+        config: config.yaml の内容
+        jobs: SKILL.md の生成に使うプロセス数
+        resume: True なら最初の変換でジャーナルから中断した実行を再開する
+    """
+
+    def __init__(self, config: dict, jobs: int = 1, resume: bool = False) -> None:
+        # 差分だけを変換するため、常に incremental で実行する
+        self.config = copy.deepcopy(config)
+        self.config["catalog"]["incremental"] = True
+        daemon_cfg = self.config.get("daemon", {})
+        self.poll_interval = max(1.0, float(daemon_cfg.get("poll_interval_minutes", 15)) * 60)
+        self.socket_path = socket_path(self.config)
+        self.jobs = jobs
+        self._resume = resume
+
+        self._wakeup = threading.Event()
+        self._run_requested = False
+        self._stopping = False
+        self._lock = threading.Lock()
+
+        self._entries: list[dict] | None = None
+        self._catalog_version: str | None = None
+        self._version_path = Path(self.config["catalog"]["cache_dir"]) / _VERSION_FILENAME
+        self._status: dict = {
+            "pid": os.getpid(),
+            "started_at": _now(),
+            "state": "starting",
+            "poll_interval_seconds": self.poll_interval,
+            "next_poll_at": None,
+            "runs": 0,
+            "catalog": {"version": None, "entries": 0, "checked_at": None, "changed_at": None},
+            "last_run": None,
+            "last_error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # 制御（制御ソケットのスレッドから呼ばれる）
+    # ------------------------------------------------------------------
+
+    def request_run(self) -> dict:
+        """次の確認を待たずに実行させる。実行中なら終わり次第もう 1 回実行する。"""
+        with self._lock:
+            self._run_requested = True
+            queued = self._status["state"] in ("checking", "running")
+        self._wakeup.set()
+        return {"ok": True, "queued": queued}
+
+    def stop(self) -> dict:
+        """実行中の変換が終わったら serve_forever() を終わらせる。"""
+        with self._lock:
+            self._stopping = True
+        self._wakeup.set()
+        return {"ok": True}
+
+    def status(self) -> dict:
+        """現在の状態を返す。"""
+        with self._lock:
+            return {"ok": True, **copy.deepcopy(self._status)}
+
+    def handle(self, request: dict) -> dict:
+        """制御コマンドを 1 件処理して応答を返す。"""
+        command = request.get("command")
+        if command == "run":
+            return self.request_run()
+        if command == "status":
+            return self.status()
+        if command == "stop":
+            return self.stop()
+        return {"ok": False, "error": f"未知のコマンド: {command}"}
+
+    def _update(self, **values: object) -> None:
+        with self._lock:
+            self._status.update(values)
+
+    # ------------------------------------------------------------------
+    # 本体
+    # ------------------------------------------------------------------
+
+    def serve_forever(self) -> None:
+        """制御ソケットを開き、stop() されるまで確認と変換を繰り返す。"""
+        server = _ControlServer(self.socket_path, self)
+        control = threading.Thread(target=server.serve_forever, name="daemon-control", daemon=True)
+        session: ConvertSession | None = None
+        try:
+            session = ConvertSession(self.config, self.jobs)
+            control.start()
+            logger.info(
+                "daemon を開始: 確認間隔 %.0f 秒、制御ソケット %s", self.poll_interval, self.socket_path,
+            )
+            trigger = "start"
+            while True:
+                with self._lock:
+                    if self._stopping:
+                        break
+                    force = self._run_requested
+                    self._run_requested = False
+                self._wakeup.clear()
+                self._cycle(session, "request" if force else trigger, force)
+
+                next_poll = time.time() + self.poll_interval
+                self._update(state="idle", next_poll_at=_timestamp(next_poll))
+                self._wakeup.wait(self.poll_interval)
+                trigger = "poll"
+        finally:
+            self._update(state="stopping", next_poll_at=None)
+            if control.is_alive():
+                server.shutdown()
+            server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+            if session is not None:
+                session.close()
+            logger.info("daemon を終了")
+
+    def _cycle(self, session: ConvertSession, trigger: str, force: bool) -> None:
+        """カタログの更新を確かめ、必要なら差分を変換する。失敗しても daemon は続ける。"""
+        self._update(state="checking")
+        try:
+            changed = self._refresh_catalog()
+        except Exception as e:
+            logger.warning("カタログの更新を確認できません: %s", e)
+            self._update(last_error=f"カタログの確認: {e}")
+            return
+
+        last_run = self._status["last_run"]
+        retry = bool(last_run and last_run.get("result", {}).get("deferred"))
+        if not (changed or force or retry):
+            logger.info("カタログに変更なし。次の確認まで待機します。")
+            return
+
+        started = time.time()
+        self._update(state="running")
+        logger.info("変換を開始 (契機: %s)", trigger)
+        record: dict = {"trigger": trigger, "started_at": _timestamp(started)}
+        try:
+            record["result"] = run(
+                self.config, jobs=self.jobs, resume=self._resume, session=session, entries=self._entries,
+            )
+        except Exception as e:
+            logger.error("変換に失敗: %s", e, exc_info=True)
+            record["error"] = str(e)
+            self._update(last_error=f"変換: {e}")
+        finally:
+            self._resume = False
+            record["finished_at"] = _now()
+            record["seconds"] = round(time.time() - started, 3)
+            with self._lock:
+                self._status["runs"] += 1
+                self._status["last_run"] = record
+
+    def _refresh_catalog(self) -> bool:
+        """カタログが変わっていればパースし直してメモリに載せる。
+
+        前回ダウンロードしたときの版を skills.json.version に残しておき、起動直後でも
+        リモートと同じ版ならキャッシュの有効期間にかかわらずキャッシュから読む。
+
+        Returns:
+            メモリ上のカタログを読み直したか
+        """
+        catalog_cfg = self.config["catalog"]
+        changed, version = poll_catalog(catalog_cfg["repo"], catalog_cfg["path"], self._catalog_version)
+        checked_at = _now()
+        if not changed and self._entries is not None:
+            self._update(catalog={**self._status["catalog"], "checked_at": checked_at})
+            return False
+
+        stored = self._version_path.read_text(encoding="utf-8").strip() if self._version_path.exists() else None
+        if self._entries is None and version is not None and version == stored:
+            ttl = float("inf")
+        elif self._entries is None:
+            ttl = catalog_cfg.get("cache_ttl_hours", 24)
+        else:
+            ttl = 0
+        self._entries = list(iter_skills_json(
+            repo=catalog_cfg["repo"],
+            path=catalog_cfg["path"],
+            cache_dir=catalog_cfg["cache_dir"],
+            cache_ttl_hours=ttl,
+        ))
+        self._catalog_version = version
+        if version is not None:
+            self._version_path.write_text(version, encoding="utf-8")
+        else:
+            self._version_path.unlink(missing_ok=True)
+        logger.info("カタログを読み込み: %d 件 (版: %s)", len(self._entries), version)
+        self._update(catalog={
+            "version": version,
+            "entries": len(self._entries),
+            "checked_at": checked_at,
+            "changed_at": checked_at,
+        })
+        return True
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """1 行の JSON コマンドを読み、1 行の JSON で応答する。"""
+
+    server: _ControlServer
+
+    def handle(self) -> None:
+        line = self.rfile.readline(_MAX_COMMAND_BYTES)
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("コマンドは JSON オブジェクトで送ってください")
+            response = self.server.daemon_.handle(request)
+        except ValueError as e:
+            response = {"ok": False, "error": str(e)}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class _ControlServer(socketserver.ThreadingUnixStreamServer):
+    """制御ソケット。所有者だけが読み書きできるように作る。"""
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, daemon_: ConvertDaemon) -> None:
+        self.daemon_ = daemon_
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            if _is_listening(path):
+                raise RuntimeError(f"別の daemon が制御ソケットを使用中です: {path}")
+            # 前回異常終了したときのソケットファイルが残っている
+            path.unlink()
+        super().__init__(str(path), _ControlHandler)
+
+    def server_bind(self) -> None:
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+def _is_listening(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def send_command(path: str | Path, command: str, timeout: float = 10.0) -> dict:
+    """制御ソケットにコマンドを送り、応答を返す。
+
+    Args:
+        path: 制御ソケットのパス
+        command: run / status / stop
+        timeout: 応答を待つ秒数
+
+    Returns:
+        daemon の応答
+
+    Raises:
+        OSError: daemon に接続できない場合
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall(json.dumps({"command": command}).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise OSError(f"daemon から応答がありません: {path}")
+    return json.loads(line)
+
+
+def main() -> None:
+    """エントリポイント。--control がなければ daemon として常駐する。"""
+    parser = argparse.ArgumentParser(
+        description="カタログの更新を監視し、差分を OpenClaw SKILL.md に変換し続ける",
+    )
+    parser.add_argument(
+        "--config",
+        default=str(Path(__file__).parent / "config.yaml"),
+        help="config.yaml のパス (デフォルト: スクリプトと同じディレクトリの config.yaml)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="SKILL.md の生成を N プロセスで並列に行う (デフォルト: 1)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="最初の変換で中断した実行をジャーナルから再開する",
+    )
+    parser.add_argument(
+        "--control",
+        choices=["run", "status", "stop"],
+        help="起動中の daemon にコマンドを送って応答を表示する",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="DEBUG レベルのログ出力",
+    )
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.control:
+        path = socket_path(config)
+        try:
+            response = send_command(path, args.control)
+        except OSError as e:
+            print(f"daemon に接続できません ({path}): {e}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+        sys.exit(0 if response.get("ok") else 1)
+
+    log_dir = config.get("output", {}).get(
+        "log_dir",
+        str(Path(__file__).parent / "logs"),
+    )
+    log_cfg = config.get("logging", {})
+    setup_logging(
+        log_dir,
+        verbose=args.verbose,
+        log_format=log_cfg.get("format", "text"),
+        entry_debug_per_second=log_cfg.get("entry_debug_per_second", 0),
+    )
+
+    daemon = ConvertDaemon(config, jobs=args.jobs, resume=args.resume)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("中断されました")
+
+
+if __name__ == "__main__":
+    main()
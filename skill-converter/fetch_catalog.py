@@ -5,19 +5,294 @@ from __future__ import annotations
 import base64
 import json
 import logging
+import math
+import os
 import subprocess
+import tarfile
 import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from content_cache import ContentCache
+from generator import sections_settled
+from github_client import DEFAULT_API_URL, GitHubAPIError, GitHubClient, token_from_env
+from json_stream import CompactArrayWriter, iter_file_chunks, iter_json_array, iter_json_file
+from metrics import recorder
+from rate_limit import DeferredEntry, RateBudget, TokenBucket
+from repo_archive import GitHubTarballSource, LocalTarballSource, TarballSource
+from response_archive import ARCHIVE_CATALOG, ARCHIVE_README, ARCHIVE_SKILL_MD, ResponseArchive
+
 logger = logging.getLogger(__name__)
 
+# API 呼び出し全体で共有するレートリミッタ（デフォルトは従来の2秒間隔相当）
+_limiter = TokenBucket(rate=0.5, capacity=1)
+
+# backend が "http" のときに使うプロセス内クライアント。None なら gh コマンドを使う
+_client: GitHubClient | None = None
+
+# 取得失敗として扱う例外（gh バックエンド / http バックエンド）
+_FETCH_ERRORS = (subprocess.CalledProcessError, GitHubAPIError)
+
+# SKILL.md / README の取得方式（"rest": リポジトリごと / "graphql": 複数リポジトリを1クエリで /
+# "tarball": リポジトリの tarball を 1 回ダウンロードして必要なファイルを取り出す）
+_mode = "rest"
+_graphql_batch_size = 25
+
+# tarball モードの取得元と、取り出すファイルの最大サイズ
+_tarball_source: TarballSource | None = None
+_tarball_max_bytes = 1024 * 1024
+
+# README を先頭から Range で取得する場合の初回・最大バイト数（None なら全体を取得）
+_readme_prefix: tuple[int, int] | None = None
+
+# 取得結果を記録・再生するアーカイブ（None なら使わない）
+_archive: ResponseArchive | None = None
+
+# GitHub の残り呼び出し回数の追跡（None なら追跡せず、取得を次回に回すこともしない）
+_budget: RateBudget | None = None
+
+# GraphQL モードでルートから内容を取得しておく README のファイル名（同じディレクトリに複数あれば先頭ほど優先）
+_README_NAMES = ["README.md", "readme.md", "Readme.md", "README", "README.rst", "README.markdown", "README.txt"]
+# README を探すディレクトリ（GitHub が README として表示するものの優先順。"" はルート）
+_README_DIRS = (".github", "", "docs")
+
+
+def configure(fetch_cfg: dict, cache_dir: str | Path | None = None) -> None:
+    """config.yaml の fetch セクションに従ってバックエンドとレートリミッタを設定する。
+
+    Args:
+        fetch_cfg: config.yaml の fetch セクションの辞書
+        cache_dir: コンテンツキャッシュの保存先（None ならキャッシュしない）
+    """
+    global _limiter, _client, _mode, _graphql_batch_size, _readme_prefix, _archive, _budget
+    global _tarball_source, _tarball_max_bytes
+    rate = fetch_cfg.get("requests_per_second", 0.5)
+    burst = fetch_cfg.get("burst", 1)
+    _limiter = TokenBucket(rate=rate, capacity=burst)
+    logger.info("レート制限: %.2f req/s (burst=%d)", rate, burst)
+
+    close()
+    backend = fetch_cfg.get("backend", "gh")
+    if backend == "http":
+        cache_cfg = fetch_cfg.get("content_cache", {})
+        cache = None
+        if cache_dir is not None and cache_cfg.get("enabled", True):
+            cache = ContentCache(
+                Path(cache_dir) / "content.sqlite3",
+                max_bytes=int(cache_cfg.get("max_mb", 256) * 1024 * 1024),
+                negative_ttl_hours=cache_cfg.get("negative_ttl_hours", 6),
+                max_negative_ttl_hours=cache_cfg.get("max_negative_ttl_hours", 24 * 14),
+            )
+        _client = GitHubClient(
+            base_url=fetch_cfg.get("api_url", DEFAULT_API_URL),
+            token=token_from_env(),
+            timeout=fetch_cfg.get("timeout_seconds", 30),
+            graphql_url=fetch_cfg.get("graphql_url"),
+            cache=cache,
+        )
+        logger.info("取得バックエンド: http (%s)", _client.base_url)
+    elif backend == "gh":
+        _client = None
+        logger.info("取得バックエンド: gh")
+    else:
+        raise ValueError(f"未知の fetch.backend: {backend}")
+
+    _mode = fetch_cfg.get("mode", "rest")
+    if _mode not in ("rest", "graphql", "tarball"):
+        raise ValueError(f"未知の fetch.mode: {_mode}")
+    _graphql_batch_size = max(1, fetch_cfg.get("graphql_batch_size", 25))
+    logger.info("取得方式: %s", _mode)
+    if _client is not None and _client.cache is not None and _mode != "rest":
+        logger.info("content_cache は REST の取得にだけ使う（%s モードでは README を REST で補う場合だけ）", _mode)
+
+    _tarball_source = None
+    if _mode == "tarball":
+        tarball_cfg = fetch_cfg.get("tarball", {})
+        source = tarball_cfg.get("source", "github")
+        if source == "github":
+            _tarball_source = GitHubTarballSource(_client)
+        elif source == "local":
+            if not tarball_cfg.get("dir"):
+                raise ValueError("fetch.tarball.dir が未指定です")
+            _tarball_source = LocalTarballSource(tarball_cfg["dir"])
+        else:
+            raise ValueError(f"未知の fetch.tarball.source: {source}")
+        _tarball_max_bytes = int(tarball_cfg.get("max_file_kb", 1024) * 1024)
+        logger.info("tarball の取得元: %s", source)
+
+    prefix_cfg = fetch_cfg.get("readme_prefix", {})
+    _readme_prefix = None
+    if prefix_cfg.get("enabled", False):
+        if _client is None:
+            logger.info("readme_prefix は http バックエンドでのみ有効です（README は全体を取得）")
+        else:
+            initial = max(1, int(prefix_cfg.get("initial_kb", 32) * 1024))
+            maximum = max(initial, int(prefix_cfg.get("max_kb", 1024) * 1024))
+            _readme_prefix = (initial, maximum)
+            logger.info("README 先頭取得: %d KB から最大 %d KB", initial // 1024, maximum // 1024)
+            logger.warning("README 先頭取得が有効: bins は取得した範囲だけから検出されます（全体取得時より減ることがあります）")
+
+    archive_cfg = fetch_cfg.get("archive", {})
+    archive_mode = archive_cfg.get("mode") or "off"
+    if archive_mode != "off":
+        archive_path = archive_cfg.get("path")
+        if not archive_path:
+            if cache_dir is None:
+                raise ValueError("fetch.archive.path が未指定です")
+            archive_path = Path(cache_dir) / "responses.sqlite3"
+        _archive = ResponseArchive(archive_path, archive_mode)
+        if _archive.replaying:
+            logger.info("応答アーカイブを再生: %s（ネットワークには接続しない）", archive_path)
+        else:
+            logger.info("応答アーカイブに記録: %s", archive_path)
+
+    budget_cfg = fetch_cfg.get("rate_budget", {})
+    _budget = None
+    if budget_cfg.get("enabled", False) and not _replaying():
+        _budget = RateBudget(
+            reserve=budget_cfg.get("reserve", 100),
+            max_wait_seconds=budget_cfg.get("max_wait_seconds", 0),
+        )
+        if _client is not None:
+            _client.budget = _budget
+        _refresh_budget()
+
+
+def _refresh_budget() -> None:
+    """/rate_limit（呼び出し回数に数えられない）で各リソースの残り回数を取得する。
+
+    取得できなければ、以降の応答ヘッダ（http バックエンド）から追跡する。
+    """
+    try:
+        if _client is not None:
+            data = _client.get_json("rate_limit")
+        else:
+            data = json.loads(_run_gh(["api", "rate_limit"]))
+    except (*_FETCH_ERRORS, json.JSONDecodeError, OSError) as e:
+        logger.info("レート制限の残り回数を取得できません: %s", e)
+        return
+    for resource, values in (data.get("resources") or {}).items():
+        try:
+            _budget.set(resource, int(values["limit"]), int(values["remaining"]), float(values["reset"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    for resource in ("core", "graphql"):
+        usage = _budget.usage().get(resource)
+        if usage:
+            logger.info("API 残り回数 (%s): %d / %d", resource, usage["remaining"], usage["limit"])
+
+
+def _replaying() -> bool:
+    return _archive is not None and _archive.replaying
+
+
+def close() -> None:
+    """クライアントの接続・コンテンツキャッシュ・応答アーカイブを閉じる。
+
+    ヒット・ミス数やレート制限の使用回数は finish_run() で実行ごとに出す。
+    """
+    global _client, _archive, _budget
+    if _client is not None:
+        _client.close()
+        if _client.cache is not None:
+            _client.cache.close()
+        _client = None
+    if _archive is not None:
+        _archive.close()
+        _archive = None
+    _budget = None
+
+
+def finish_run() -> None:
+    """この実行でのキャッシュ・アーカイブのヒット・ミス数と API の使用回数を出す。
+
+    ログと計測値に出したあと、次の実行のためにカウンタと使用回数の起点を戻す。
+    クライアントを閉じずに次の実行でも使い回す場合（daemon）も、実行ごとに呼ぶ。
+    """
+    metrics = recorder()
+    if _client is not None and _client.cache is not None:
+        cache = _client.cache
+        logger.info(
+            "コンテンツキャッシュ: ヒット %d / ミス %d / 304 再検証 %d",
+            cache.hits, cache.misses, cache.revalidated,
+        )
+        metrics.count("cache_requests", cache.hits, cache="content", result="hit")
+        metrics.count("cache_requests", cache.misses, cache="content", result="miss")
+        metrics.count("cache_requests", cache.revalidated, cache="content", result="revalidated")
+        cache.reset_stats()
+    if _archive is not None and _archive.replaying:
+        logger.info("応答アーカイブ再生: %d 件 (未記録 %d 件)", _archive.replayed, _archive.missed)
+        metrics.count("cache_requests", _archive.replayed, cache="archive", result="hit")
+        metrics.count("cache_requests", _archive.missed, cache="archive", result="miss")
+        _archive.reset_stats()
+    if _budget is not None:
+        _report_budget(_budget)
+        _budget.restart_usage()
+
+
+def _report_budget(budget: RateBudget) -> None:
+    """実行中に使った呼び出し回数をログと計測値に出す。"""
+    metrics = recorder()
+    for resource, usage in budget.usage().items():
+        reset = time.strftime("%H:%M:%S", time.localtime(usage["reset"]))
+        if usage["used"] is None:
+            logger.info(
+                "API 残り回数 (%s): 開始 %d → 終了 %d / %d（途中で reset、次の reset %s）",
+                resource, usage["start_remaining"], usage["remaining"], usage["limit"], reset,
+            )
+        else:
+            logger.info(
+                "API 残り回数 (%s): 開始 %d → 終了 %d / %d（使用 %d、reset %s）",
+                resource, usage["start_remaining"], usage["remaining"], usage["limit"], usage["used"], reset,
+            )
+            metrics.set("rate_limit_used", usage["used"], resource=resource)
+        metrics.set("rate_limit_remaining", usage["remaining"], resource=resource)
+
+
+def _acquire(resource: str = "core") -> None:
+    """共有トークンバケットからトークンを取得し、待った時間を計測値に加える。
+
+    gh バックエンドでは応答ヘッダが得られないので、ここで残り回数を 1 減らす。
+    """
+    if _budget is not None and _client is None:
+        _budget.spend(resource)
+    waited = _limiter.acquire()
+    metrics = recorder()
+    metrics.count("rate_limit_acquires")
+    if waited:
+        metrics.count("rate_limit_wait_seconds", waited)
+
+
+def _raise_if_rate_limited(error: Exception, resource: str, owner: str, repo: str) -> None:
+    """失敗がレート制限によるものなら、残りを 0 とみなして DeferredEntry を送出する。
+
+    レート制限による失敗を「SKILL.md / README なし」として生成に進めないため。
+    """
+    if isinstance(error, GitHubAPIError):
+        limited = error.status in (403, 429) and (
+            "rate limit" in str(error).lower() or (_budget is not None and _budget.exhausted(resource))
+        )
+    else:
+        limited = "rate limit" in (getattr(error, "stderr", "") or "").lower()
+    if not limited:
+        return
+    if _budget is not None:
+        _budget.deplete(resource)
+    raise DeferredEntry(f"{owner}/{repo}", "レート制限に到達") from error
+
 
 def _run_gh(args: list[str], check: bool = True) -> str:
     """gh コマンドを実行して stdout を返す。"""
     cmd = ["gh"] + args
     logger.debug("実行: %s", " ".join(cmd))
-    result = subprocess.run(cmd, capture_output=True, text=True, check=check)
-    if result.returncode != 0 and not check:
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    metrics = recorder()
+    metrics.count("api_requests", backend="gh", status=str(result.returncode))
+    metrics.count("api_bytes", len(result.stdout), backend="gh")
+    if result.returncode != 0 and check:
+        raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+    if result.returncode != 0:
         logger.warning("gh コマンド失敗 (rc=%d): %s", result.returncode, result.stderr.strip())
     return result.stdout.strip()
 
@@ -30,13 +305,139 @@ def _parse_owner_repo(repo_url: str) -> tuple[str, str]:
     return parts[-2], parts[-1]
 
 
-def fetch_skills_json(
+def _resolve_download_url(repo: str, path: str) -> str:
+    """contents API から skills.json の download_url を取得する。"""
+    if _client is not None:
+        info = _client.get_json(f"repos/{repo}/contents/{path}")
+        download_url = info.get("download_url") if isinstance(info, dict) else None
+    else:
+        download_url = _run_gh([
+            "api", f"repos/{repo}/contents/{path}",
+            "--jq", ".download_url",
+        ])
+    if not download_url:
+        raise ValueError("download_url が空です")
+    return download_url
+
+
+def poll_catalog(repo: str, path: str, version: str | None = None) -> tuple[bool, str | None]:
+    """skills.json が前回確かめたときから変わったかを確かめる。
+
+    http バックエンドでは contents API に前回の ETag を If-None-Match で付けて送り、
+    304 なら変化なしとする（304 はレート制限の回数に数えられない）。gh バックエンドは
+    条件付きリクエストを送れないので、blob の sha を前回と比べる。
+
+    Args:
+        repo: "owner/repo" 形式のリポジトリ指定
+        path: リポジトリ内のファイルパス
+        version: 前回この関数が返した版（ETag または sha）。None なら常に変化ありとする
+
+    Returns:
+        (変わったか, 今回の版)
+
+    Raises:
+        GitHubAPIError: http バックエンドでエラー応答が返った場合
+        subprocess.CalledProcessError: gh コマンドが失敗した場合
+    """
+    if _replaying():
+        # アーカイブの内容は変わらない
+        return version is None, "replay"
+    _acquire()
+    if _client is not None:
+        headers = {"If-None-Match": version} if version else None
+        resp = _client.request("GET", f"repos/{repo}/contents/{path}", headers=headers)
+        if resp.status == 304:
+            return False, version
+        if resp.status >= 400:
+            raise GitHubAPIError(resp.status, resp.url)
+        info = resp.json()
+        current = resp.headers.get("etag") or (info.get("sha") if isinstance(info, dict) else None)
+    else:
+        current = _run_gh(["api", f"repos/{repo}/contents/{path}", "--jq", ".sha"]) or None
+    return current is None or current != version, current
+
+
+def _iter_download_chunks(download_url: str, part_path: Path) -> Iterator[bytes]:
+    """download_url の内容をチャンク単位で返しつつ part_path に追記する。
+
+    http バックエンドでは、前回中断した part_path が残っていれば Range で続きから
+    取得する。If-Range に前回の ETag を付けるため、途中で内容が更新されていた場合は
+    サーバが全体を返し、最初から取り直す。
+    """
+    etag_path = part_path.with_name(part_path.name + ".etag")
+
+    if _client is None:
+        # gh バックエンドは curl の出力をそのまま流す（再開はしない）
+        proc = subprocess.Popen(["curl", "-sSfL", download_url], stdout=subprocess.PIPE)
+        metrics = recorder()
+        try:
+            with open(part_path, "wb") as part:
+                for chunk in iter_file_chunks(proc.stdout):
+                    metrics.count("api_bytes", len(chunk), backend="curl")
+                    part.write(chunk)
+                    yield chunk
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+            metrics.count("api_requests", backend="curl", status=str(returncode))
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, ["curl", download_url])
+        return
+
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    etag = etag_path.read_text(encoding="utf-8").strip() if etag_path.exists() else ""
+    headers: dict[str, str] = {}
+    if offset and etag:
+        headers = {"Range": f"bytes={offset}-", "If-Range": etag}
+
+    resp = _client.open_stream(download_url, headers=headers)
+    if resp.status == 206 and resp.headers.get("etag", etag) != etag:
+        # If-Range を無視するサーバ対策: 内容が変わっていたら最初から取り直す
+        logger.warning("中断時から内容が更新されているため最初から取得し直します")
+        resp.close()
+        offset = 0
+        resp = _client.open_stream(download_url)
+
+    with resp:
+        if resp.status == 416 and offset:
+            # part_path が既に全体を含んでいる
+            logger.info("中断ファイルは取得済み: %d バイト", offset)
+            with open(part_path, "rb") as part:
+                yield from iter_file_chunks(part)
+            return
+        if resp.status >= 400:
+            raise GitHubAPIError(resp.status, resp.url)
+
+        if resp.status == 206:
+            logger.info("ダウンロード再開: %d バイト目から", offset)
+            with open(part_path, "rb") as part:
+                yield from iter_file_chunks(part)
+            mode = "ab"
+        else:
+            mode = "wb"
+        if resp.headers.get("etag"):
+            etag_path.write_text(resp.headers["etag"], encoding="utf-8")
+
+        with open(part_path, mode) as part:
+            for chunk in resp.iter_chunks():
+                part.write(chunk)
+                part.flush()
+                yield chunk
+
+
+def iter_skills_json(
     repo: str,
     path: str,
     cache_dir: str | Path,
     cache_ttl_hours: int = 24,
-) -> list[dict]:
-    """skills.json をGitHub APIから取得する。キャッシュがあればそちらを返す。
+) -> Iterator[dict]:
+    """skills.json のエントリを逐次返す。キャッシュが有効ならそちらから読む。
+
+    ダウンロード中はバイト列を受け取るたびに要素をパースして返し、同時に
+    1 行 1 エントリのコンパクトな形式でキャッシュを書き出す。カタログ全体を
+    メモリに載せないため、件数が増えてもピークメモリはほぼ一定になる。
+    中断したダウンロードは catalog.cache_dir の skills.json.part から再開する。
+    応答アーカイブの再生中はキャッシュの有効期間にかかわらずアーカイブから読む。
 
     Args:
         repo: "owner/repo" 形式のリポジトリ指定
@@ -44,78 +445,167 @@ def fetch_skills_json(
         cache_dir: キャッシュ保存先ディレクトリ
         cache_ttl_hours: キャッシュの有効期間（時間）
 
-    Returns:
-        skills.json の内容（リスト）
+    Yields:
+        skills.json の各エントリ
     """
     cache_path = Path(cache_dir) / "skills.json"
     cache_path.parent.mkdir(parents=True, exist_ok=True)
+    archive_key = f"{repo}/{path}"
 
     # キャッシュが有効期間内なら返す
-    if cache_path.exists():
+    if cache_path.exists() and not _replaying():
         age_hours = (time.time() - cache_path.stat().st_mtime) / 3600
         if age_hours < cache_ttl_hours:
             logger.info("キャッシュを使用 (経過: %.1f時間)", age_hours)
-            return json.loads(cache_path.read_text(encoding="utf-8"))
+            if _archive is not None:
+                _archive.put_file(ARCHIVE_CATALOG, archive_key, cache_path)
+            yield from iter_json_file(cache_path)
+            return
         logger.info("キャッシュ期限切れ (経過: %.1f時間)", age_hours)
 
-    # download_url を取得してダウンロード
+    part_path = cache_path.with_name("skills.json.part")
+    tmp_path = cache_path.with_name("skills.json.tmp")
+    yielded = 0
+    completed = False
     try:
-        download_url = _run_gh([
-            "api", f"repos/{repo}/contents/{path}",
-            "--jq", ".download_url",
-        ])
-        if not download_url:
-            raise ValueError("download_url が空です")
-
-        logger.info("ダウンロード: %s", download_url)
-        raw = subprocess.run(
-            ["curl", "-sL", download_url],
-            capture_output=True, text=True, check=True,
-        ).stdout
-
-        skills = json.loads(raw)
-        # キャッシュに保存
-        cache_path.write_text(json.dumps(skills, ensure_ascii=False, indent=2), encoding="utf-8")
-        logger.info("取得完了: %d 件のスキル", len(skills))
-        return skills
-
-    except (subprocess.CalledProcessError, json.JSONDecodeError, ValueError) as e:
+        if _replaying():
+            logger.info("アーカイブからカタログを読み込み: %s", archive_key)
+            chunks = _archive.iter_bytes(ARCHIVE_CATALOG, archive_key)
+        else:
+            download_url = _resolve_download_url(repo, path)
+            logger.info("ダウンロード: %s", download_url)
+            chunks = _iter_download_chunks(download_url, part_path)
+            if _archive is not None:
+                chunks = _archive.record_stream(ARCHIVE_CATALOG, archive_key, chunks)
+
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            writer = CompactArrayWriter(tmp)
+            for entry in iter_json_array(chunks):
+                writer.write(entry)
+                yielded += 1
+                yield entry
+            writer.close()
+
+        # 完了したらキャッシュを差し替え、中断用ファイルを消す
+        os.replace(tmp_path, cache_path)
+        completed = True
+        part_path.unlink(missing_ok=True)
+        part_path.with_name(part_path.name + ".etag").unlink(missing_ok=True)
+        logger.info("取得完了: %d 件のスキル", yielded)
+
+    except (*_FETCH_ERRORS, json.JSONDecodeError, ValueError) as e:
+        if isinstance(e, json.JSONDecodeError):
+            # 壊れたデータから再開しないよう中断用ファイルも捨てる
+            part_path.unlink(missing_ok=True)
         logger.error("skills.json の取得に失敗: %s", e)
-        # キャッシュが古くても存在すればフォールバック
-        if cache_path.exists():
+        # 既に返したエントリがあるとキャッシュと混ざるためフォールバックしない
+        if yielded == 0 and cache_path.exists():
             logger.warning("古いキャッシュにフォールバック")
-            return json.loads(cache_path.read_text(encoding="utf-8"))
+            yield from iter_json_file(cache_path)
+            return
         raise
 
+    finally:
+        if not completed:
+            tmp_path.unlink(missing_ok=True)
+
+
+def ensure_skills_cache(
+    repo: str,
+    path: str,
+    cache_dir: str | Path,
+    cache_ttl_hours: int = 24,
+) -> Path:
+    """skills.json キャッシュが有効期間内であることを保証し、そのパスを返す。
+
+    期限切れなら iter_skills_json でダウンロードしてキャッシュを更新する。
+    エントリ自体はメモリに保持しない。
+
+    Returns:
+        skills.json キャッシュのパス
+    """
+    cache_path = Path(cache_dir) / "skills.json"
+    if cache_path.exists() and not _replaying():
+        age_hours = (time.time() - cache_path.stat().st_mtime) / 3600
+        if age_hours < cache_ttl_hours:
+            if _archive is not None:
+                _archive.put_file(ARCHIVE_CATALOG, f"{repo}/{path}", cache_path)
+            return cache_path
+    for _ in iter_skills_json(repo, path, cache_dir, cache_ttl_hours):
+        pass
+    return cache_path
+
+
+def fetch_skills_json(
+    repo: str,
+    path: str,
+    cache_dir: str | Path,
+    cache_ttl_hours: int = 24,
+) -> list[dict]:
+    """skills.json をGitHub APIから取得する。キャッシュがあればそちらを返す。
+
+    Args:
+        repo: "owner/repo" 形式のリポジトリ指定
+        path: リポジトリ内のファイルパス
+        cache_dir: キャッシュ保存先ディレクトリ
+        cache_ttl_hours: キャッシュの有効期間（時間）
+
+    Returns:
+        skills.json の内容（リスト）
+    """
+    return list(iter_skills_json(repo, path, cache_dir, cache_ttl_hours))
+
 
 def fetch_readme(repo_url: str) -> str | None:
     """GitHub リポジトリの README.md を取得する。
 
-    Rate limit 対策として呼び出し前に2秒待機する。
+    Rate limit 対策として共有トークンバケットからトークンを取得してから呼び出す。
+    応答アーカイブの再生中はアーカイブの内容を返す。
 
     Args:
         repo_url: "https://github.com/owner/repo" 形式のURL
 
     Returns:
-        README の内容。エラー時は None。
-    """
-    time.sleep(2)
+        README の内容。見つからない・レート制限以外のエラー時は None。
 
+    Raises:
+        DeferredEntry: レート制限で取得できなかった場合（次回の実行に回す）
+        ArchiveMiss: 再生中にアーカイブに記録がない場合
+    """
     owner, repo = _parse_owner_repo(repo_url)
+    if _replaying():
+        return _archive.get(ARCHIVE_README, f"{owner}/{repo}")
+    readme = _fetch_readme_live(owner, repo)
+    if _archive is not None:
+        _archive.put(ARCHIVE_README, f"{owner}/{repo}", readme)
+    return readme
+
+
+def _fetch_readme_live(owner: str, repo: str) -> str | None:
+    """README を GitHub から取得する。エラー時は None（レート制限なら DeferredEntry を送出）。"""
+    _acquire()
+
     try:
-        content_b64 = _run_gh([
-            "api", f"repos/{owner}/{repo}/readme",
-            "--jq", ".content",
-        ])
-        if not content_b64:
+        if _client is not None and _readme_prefix is not None:
+            # 生成に使うセクションが揃うところまでだけ読む
+            decoded = _client.get_readme_prefix(owner, repo, *_readme_prefix, sections_settled)
+        elif _client is not None:
+            decoded = _client.get_readme(owner, repo)
+        else:
+            content_b64 = _run_gh([
+                "api", f"repos/{owner}/{repo}/readme",
+                "--jq", ".content",
+            ])
+            decoded = base64.b64decode(content_b64).decode("utf-8") if content_b64 else None
+        if not decoded:
             logger.warning("README が空: %s/%s", owner, repo)
             return None
 
-        decoded = base64.b64decode(content_b64).decode("utf-8")
         logger.info("README 取得: %s/%s (%d 文字)", owner, repo, len(decoded))
         return decoded
 
-    except subprocess.CalledProcessError as e:
+    except _FETCH_ERRORS as e:
+        _raise_if_rate_limited(e, "core", owner, repo)
         logger.warning("README 取得失敗 (%s/%s): %s", owner, repo, e)
         return None
 
@@ -123,25 +613,411 @@ def fetch_readme(repo_url: str) -> str | None:
 def check_skill_md_exists(repo_url: str) -> str | None:
     """リポジトリに SKILL.md が存在するか確認し、あれば内容を返す。
 
+    応答アーカイブの再生中はアーカイブの内容を返す。
+
     Args:
         repo_url: "https://github.com/owner/repo" 形式のURL
 
     Returns:
-        SKILL.md の内容。存在しなければ None。
+        SKILL.md の内容。存在しない・レート制限以外のエラー時は None。
+
+    Raises:
+        DeferredEntry: レート制限で取得できなかった場合（次回の実行に回す）
+        ArchiveMiss: 再生中にアーカイブに記録がない場合
     """
     owner, repo = _parse_owner_repo(repo_url)
+    if _replaying():
+        return _archive.get(ARCHIVE_SKILL_MD, f"{owner}/{repo}")
+    skill_md = _check_skill_md_live(owner, repo)
+    if _archive is not None:
+        _archive.put(ARCHIVE_SKILL_MD, f"{owner}/{repo}", skill_md)
+    return skill_md
+
+
+def _check_skill_md_live(owner: str, repo: str) -> str | None:
+    """SKILL.md を GitHub から取得する。存在しなければ None（レート制限なら DeferredEntry を送出）。"""
+    _acquire()
+
     try:
-        content_b64 = _run_gh([
-            "api", f"repos/{owner}/{repo}/contents/SKILL.md",
-            "--jq", ".content",
-        ])
-        if not content_b64:
+        if _client is not None:
+            decoded = _client.get_contents(owner, repo, "SKILL.md")
+        else:
+            content_b64 = _run_gh([
+                "api", f"repos/{owner}/{repo}/contents/SKILL.md",
+                "--jq", ".content",
+            ])
+            decoded = base64.b64decode(content_b64).decode("utf-8") if content_b64 else None
+        if not decoded:
+            logger.debug("SKILL.md なし: %s/%s", owner, repo)
             return None
 
-        decoded = base64.b64decode(content_b64).decode("utf-8")
         logger.info("SKILL.md 検出: %s/%s", owner, repo)
         return decoded
 
-    except subprocess.CalledProcessError:
+    except _FETCH_ERRORS as e:
+        _raise_if_rate_limited(e, "core", owner, repo)
         logger.debug("SKILL.md なし: %s/%s", owner, repo)
         return None
+
+
+def fetch_sources(repo_url: str) -> tuple[str | None, str | None]:
+    """1 リポジトリ分の SKILL.md と README を取得する。
+
+    SKILL.md が存在する場合 README は取得しない。fetch.mode が tarball なら
+    tarball を 1 回読んで両方を取り出す。
+
+    Args:
+        repo_url: "https://github.com/owner/repo" 形式のURL
+
+    Returns:
+        (SKILL.md の内容, README の内容) のタプル。取得しなかった側は None。
+
+    Raises:
+        DeferredEntry: レート制限で取得できなかった場合（次回の実行に回す）
+    """
+    if _tarball_source is not None and not _replaying():
+        return _fetch_sources_tarball(repo_url)
+    skill_md = check_skill_md_exists(repo_url)
+    if skill_md:
+        return skill_md, None
+    return None, fetch_readme(repo_url)
+
+
+def _decode_file(data: bytes | None) -> str | None:
+    """tarball から取り出したファイルをテキストにする。空・バイナリなら None。"""
+    if not data:
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _is_readme(name: str) -> bool:
+    """GitHub が README とみなすファイル名か（大文字小文字を区別せず、拡張子は問わない）。"""
+    lower = name.lower()
+    return lower == "readme" or lower.startswith("readme.")
+
+
+def _is_readme_path(path: str) -> bool:
+    directory, _, name = path.rpartition("/")
+    return directory in _README_DIRS and _is_readme(name)
+
+
+def _preferred_readme(paths: Iterable[str]) -> str | None:
+    """ファイルのパスから、REST の /readme が返すのと同じ README を選ぶ。
+
+    _README_DIRS の順にディレクトリを見て、最初に README のあったディレクトリから
+    選ぶ。同じディレクトリに複数あれば _README_NAMES の順、それ以外は名前順。
+
+    Returns:
+        README のパス。なければ None。
+    """
+    by_dir: dict[str, list[str]] = {}
+    for path in paths:
+        if _is_readme_path(path):
+            directory, _, name = path.rpartition("/")
+            by_dir.setdefault(directory, []).append(name)
+    for directory in _README_DIRS:
+        names = by_dir.get(directory)
+        if names:
+            name = min(names, key=lambda n: (_README_NAMES.index(n) if n in _README_NAMES else len(_README_NAMES), n))
+            return f"{directory}/{name}" if directory else name
+    return None
+
+
+def _fetch_sources_tarball(repo_url: str) -> tuple[str | None, str | None]:
+    """リポジトリの tarball を 1 回だけ読み、SKILL.md と README を取り出す。
+
+    SKILL.md が見つかった時点で残りは読まない。README は REST の /readme と
+    同じく .github・ルート・docs の README（大文字小文字を区別しない）から選ぶ。
+    """
+    owner, repo = _parse_owner_repo(repo_url)
+    _acquire()
+    try:
+        files = _tarball_source.read_files(
+            owner, repo, ["SKILL.md"], stop_at=["SKILL.md"], max_bytes=_tarball_max_bytes,
+            match=_is_readme_path,
+        )
+    except _FETCH_ERRORS as e:
+        _raise_if_rate_limited(e, "core", owner, repo)
+        logger.warning("tarball 取得失敗 (%s/%s): %s", owner, repo, e)
+        return _record_sources(owner, repo, None, None)
+    except (tarfile.TarError, EOFError, OSError) as e:
+        logger.warning("tarball を読めません (%s/%s): %s", owner, repo, e)
+        return _record_sources(owner, repo, None, None)
+    if files is None:
+        logger.warning("リポジトリ取得失敗: %s/%s", owner, repo)
+        return _record_sources(owner, repo, None, None)
+
+    skill_md = _decode_file(files.get("SKILL.md"))
+    if skill_md:
+        logger.info("SKILL.md 検出: %s/%s", owner, repo)
+        return _record_sources(owner, repo, skill_md, None)
+    readme_path = _preferred_readme(files)
+    readme = _decode_file(files[readme_path]) if readme_path is not None else None
+    if readme:
+        logger.info("README 取得: %s/%s (%d 文字)", owner, repo, len(readme))
+    else:
+        logger.warning("README が空: %s/%s", owner, repo)
+    return _record_sources(owner, repo, None, readme)
+
+
+def _fetch_sources_safe(repo_url: str) -> tuple[str | None, str | None] | Exception:
+    """fetch_sources の例外を戻り値として返すラッパー。"""
+    try:
+        return fetch_sources(repo_url)
+    except Exception as e:
+        return e
+
+
+def _run_graphql(query: str) -> dict:
+    """GraphQL クエリを現在のバックエンドで実行する。"""
+    _acquire("graphql")
+    if _client is not None:
+        return _client.graphql(query)
+    return json.loads(_run_gh(["api", "graphql", "-f", f"query={query}"]))
+
+
+def _build_sources_query(owner_repos: list[tuple[str, str]]) -> str:
+    """複数リポジトリの SKILL.md と README 候補を取得する GraphQL クエリを組み立てる。
+
+    リポジトリは r0, r1, ...、ファイルは skill / readme0, readme1, ... のエイリアスで区別する。
+    README を探すディレクトリのファイル名一覧も tree0, tree1, ...（_README_DIRS の順）で取得する。
+    """
+    blob = "{ ... on Blob { text isBinary isTruncated } }"
+    tree = "{ ... on Tree { entries { name type } } }"
+    lines = ["query {"]
+    for i, (owner, repo) in enumerate(owner_repos):
+        lines.append(f"  r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{")
+        lines.append(f'    skill: object(expression: "HEAD:SKILL.md") {blob}')
+        for j, readme_name in enumerate(_README_NAMES):
+            lines.append(f"    readme{j}: object(expression: {json.dumps('HEAD:' + readme_name)}) {blob}")
+        for j, directory in enumerate(_README_DIRS):
+            lines.append(f"    tree{j}: object(expression: {json.dumps('HEAD:' + directory)}) {tree}")
+        lines.append("  }")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def _tree_paths(node: dict) -> list[str] | None:
+    """GraphQL の tree0, tree1, ... から README を探すディレクトリのファイルのパスを返す。
+
+    ルートの一覧が取れていなければ None（どのファイルがあるか分からない）。
+    """
+    if not isinstance(node.get("tree1"), dict) or "entries" not in node["tree1"]:
+        return None
+    paths = []
+    for j, directory in enumerate(_README_DIRS):
+        for item in (node.get(f"tree{j}") or {}).get("entries") or []:
+            if item.get("type") == "blob":
+                paths.append(f"{directory}/{item['name']}" if directory else item["name"])
+    return paths
+
+
+def _blob_text(node: dict | None) -> str | None:
+    """GraphQL の Blob ノードからテキストを取り出す。使えない場合は None。"""
+    if not node or node.get("isBinary") or node.get("isTruncated"):
+        return None
+    return node.get("text") or None
+
+
+def fetch_sources_graphql(repo_urls: list[str]) -> dict[str, tuple[str | None, str | None] | Exception]:
+    """GraphQL で複数リポジトリの SKILL.md / README を1リクエストで取得する。
+
+    README はファイル名一覧から REST の /readme と同じものを選び、それがルートの
+    _README_NAMES のどれかならクエリで取得した内容を使う。それ以外の README
+    （README.MD・docs/README.md・.github/README.md など）や、一覧が取れずに
+    _README_NAMES のどれも見つからなかった場合は REST の /readme で取得する。
+    Blob が切り詰められている場合やクエリ自体が失敗した場合は、該当リポジトリを
+    REST（fetch_sources）で取得し直す。
+
+    Args:
+        repo_urls: "https://github.com/owner/repo" 形式のURLのリスト（1バッチ分）
+
+    Returns:
+        repo_url → (SKILL.md の内容, README の内容) または例外 の辞書
+    """
+    owner_repos = [_parse_owner_repo(url) for url in repo_urls]
+    try:
+        response = _run_graphql(_build_sources_query(owner_repos))
+    except (*_FETCH_ERRORS, json.JSONDecodeError) as e:
+        logger.warning("GraphQL バッチ取得失敗、REST にフォールバック (%d 件): %s", len(repo_urls), e)
+        return {url: _fetch_sources_safe(url) for url in repo_urls}
+
+    data = response.get("data") or {}
+    results: dict[str, tuple[str | None, str | None] | Exception] = {}
+    for i, (url, (owner, repo)) in enumerate(zip(repo_urls, owner_repos)):
+        node = data.get(f"r{i}")
+        if node is None:
+            logger.warning("リポジトリ取得失敗: %s/%s", owner, repo)
+            results[url] = _record_sources(owner, repo, None, None)
+            continue
+
+        skill_node = node.get("skill")
+        if skill_node and skill_node.get("isTruncated"):
+            results[url] = _fetch_sources_safe(url)
+            continue
+        skill_md = _blob_text(skill_node)
+        if skill_md:
+            logger.info("SKILL.md 検出: %s/%s", owner, repo)
+            results[url] = _record_sources(owner, repo, skill_md, None)
+            continue
+
+        readme_nodes = {name: node.get(f"readme{j}") for j, name in enumerate(_README_NAMES)}
+        paths = _tree_paths(node)
+        if paths is None:
+            readme_node = next((n for n in readme_nodes.values() if n), None)
+            use_rest = readme_node is None
+        else:
+            preferred = _preferred_readme(paths)
+            readme_node = readme_nodes.get(preferred) if preferred is not None else None
+            use_rest = preferred is not None and readme_node is None
+        if use_rest or (readme_node and readme_node.get("isTruncated")):
+            if _archive is not None:
+                _archive.put(ARCHIVE_SKILL_MD, f"{owner}/{repo}", None)
+            results[url] = (None, fetch_readme(url))
+            continue
+        readme = _blob_text(readme_node)
+        if readme:
+            logger.info("README 取得: %s/%s (%d 文字)", owner, repo, len(readme))
+        else:
+            logger.warning("README が空: %s/%s", owner, repo)
+        results[url] = _record_sources(owner, repo, None, readme)
+
+    return results
+
+
+def _record_sources(
+    owner: str, repo: str, skill_md: str | None, readme: str | None,
+) -> tuple[str | None, str | None]:
+    """GraphQL / tarball で得た結果を REST で取得した場合と同じ形で記録し、そのまま返す。
+
+    SKILL.md があれば README は取得しない扱いなので記録しない。
+    """
+    if _archive is not None:
+        _archive.put(ARCHIVE_SKILL_MD, f"{owner}/{repo}", skill_md)
+        if not skill_md:
+            _archive.put(ARCHIVE_README, f"{owner}/{repo}", readme)
+    return skill_md, readme
+
+
+def fetch_batch_size() -> int:
+    """fetch_sources_many に一度に渡すと効率のよい件数（graphql ならバッチサイズ、rest なら 1）。"""
+    return _graphql_batch_size if _mode == "graphql" else 1
+
+
+def _estimated_calls(count: int) -> tuple[str, int]:
+    """count 件の取得に使う (リソース, 呼び出し回数) の見積もり。"""
+    if _mode == "graphql":
+        return "graphql", math.ceil(count / _graphql_batch_size)
+    if _mode == "tarball":
+        # codeload へのリダイレクト先は数えられない
+        return "core", count
+    # SKILL.md の確認と README の取得
+    return "core", 2 * count
+
+
+def plan_fetches(candidates: list[dict]) -> tuple[list[dict], list[dict]]:
+    """候補を quality_score の高い順に並べ、残り呼び出し回数で取得できる分だけを今回に回す。
+
+    残り回数が分からない場合や追跡しない場合は、並べ替えだけを行う。reset が
+    max_wait_seconds 以内なら待てばよいので、次回には回さない。
+
+    Args:
+        candidates: 変換候補
+
+    Returns:
+        (今回取得する候補（優先度順）, 次回に回す候補)
+    """
+    ordered = sorted(candidates, key=lambda e: e.get("quality_score", 0.0), reverse=True)
+    if _budget is None or not ordered:
+        return ordered, []
+    resource, _ = _estimated_calls(1)
+    available = _budget.available(resource)
+    until_reset = _budget.seconds_until_reset(resource)
+    if available is None or (until_reset is not None and until_reset <= _budget.max_wait_seconds):
+        return ordered, []
+
+    available = max(0, available)
+    reserve = _budget.reserve_for(resource)
+    affordable = available * _graphql_batch_size if _mode == "graphql" else available // _estimated_calls(1)[1]
+    scheduled, deferred = ordered[:affordable], ordered[affordable:]
+    if deferred:
+        logger.warning(
+            "取得計画: 候補 %d 件のうち優先度上位 %d 件を取得、%d 件を次回に延期 (%s 残り %d 回、予備 %d 回)",
+            len(ordered), len(scheduled), len(deferred), resource, available + reserve, reserve,
+        )
+    else:
+        logger.info(
+            "取得計画: 候補 %d 件をすべて取得 (%s 残り %d 回、見積もり %d 回)",
+            len(ordered), resource, available + reserve, _estimated_calls(len(ordered))[1],
+        )
+    recorder().set("entries_deferred_planned", len(deferred))
+    return scheduled, deferred
+
+
+def fetch_sources_many(
+    repo_urls: list[str],
+    workers: int = 1,
+) -> list[tuple[str | None, str | None] | Exception]:
+    """複数リポジトリの SKILL.md / README を並列に取得する。
+
+    呼び出し間隔は共有トークンバケットで制御されるため、workers は
+    同時に待機できるリクエスト数の上限として働く。1 件の失敗で全体が
+    止まらないよう、例外は該当位置に値として格納する。fetch.mode が
+    "graphql" の場合は graphql_batch_size 件ずつまとめて問い合わせる。
+    応答アーカイブの再生中は取得方式によらずアーカイブから返す。
+    残り呼び出し回数が足りなければ取得せず、全件を DeferredEntry として返す。
+
+    Args:
+        repo_urls: "https://github.com/owner/repo" 形式のURLのリスト
+        workers: 同時実行数（1 なら逐次実行）
+
+    Returns:
+        repo_urls と同じ順序の fetch_sources の結果（または例外）のリスト
+    """
+    if _budget is None:
+        return _fetch_sources_many(repo_urls, workers)
+    resource, calls = _estimated_calls(len(repo_urls))
+    if not _budget.admit(resource, calls):
+        logger.info("レート制限の残りが不足、%d 件の取得を次回に延期", len(repo_urls))
+        return [DeferredEntry(url) for url in repo_urls]
+    try:
+        return _fetch_sources_many(repo_urls, workers)
+    finally:
+        _budget.release(resource, calls)
+
+
+def _fetch_sources_many(
+    repo_urls: list[str],
+    workers: int,
+) -> list[tuple[str | None, str | None] | Exception]:
+    """fetch_sources_many の本体。"""
+    if _replaying():
+        # アーカイブは取得方式によらずリポジトリ単位なので、1 件ずつ引く
+        return [_fetch_sources_safe(url) for url in repo_urls]
+
+    if _mode == "graphql":
+        unique_urls = list(dict.fromkeys(repo_urls))
+        batches = [
+            unique_urls[i:i + _graphql_batch_size]
+            for i in range(0, len(unique_urls), _graphql_batch_size)
+        ]
+        logger.info("GraphQL バッチ取得: %d 件 / %d リクエスト", len(unique_urls), len(batches))
+        result_map: dict[str, tuple[str | None, str | None] | Exception] = {}
+        if workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                result_map.update(fetch_sources_graphql(batch))
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+                for batch_result in pool.map(fetch_sources_graphql, batches):
+                    result_map.update(batch_result)
+        return [result_map[url] for url in repo_urls]
+
+    if workers <= 1 or len(repo_urls) <= 1:
+        return [_fetch_sources_safe(url) for url in repo_urls]
+
+    logger.info("並列取得開始: %d 件 (workers=%d)", len(repo_urls), workers)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+        return list(pool.map(_fetch_sources_safe, repo_urls))
@@ -2,17 +2,31 @@
 
 from __future__ import annotations
 
+import heapq
 import logging
+from collections.abc import Iterable
 from pathlib import Path
 
+from catalog_diff import CatalogDiff, iter_diff
+from catalog_store import CatalogStore
+from generator import validate_name
+from skill_index import SkillIndex
+from skill_writer import SKILL_FILENAME
+
 logger = logging.getLogger(__name__)
 
 
-def filter_candidates(skills: list[dict], config: dict) -> list[dict]:
+def filter_candidates(skills: Iterable[dict], config: dict) -> list[dict]:
     """フィルタ条件に基づいてスキル候補を絞り込む。
 
+    エントリを 1 件ずつ処理し、source_url の重複を出現順に除きながら
+    quality_score 上位 max_skills_per_run 件だけをヒープに保持する。
+    全件のソートを行わないため計算量は O(N log K)、候補の保持は O(K)
+    （重複判定用の source_url 集合を除く）。結果は全件を安定ソートして
+    先頭を切り出した場合と同じ（同点はカタログ順）。
+
     Args:
-        skills: skills.json のエントリリスト
+        skills: skills.json のエントリ（イテレータ可）
         config: config.yaml の filter セクションの辞書
 
     Returns:
@@ -22,59 +36,98 @@ def filter_candidates(skills: list[dict], config: dict) -> list[dict]:
     min_quality = config.get("min_quality_score", 0.0)
     source_types = set(config.get("source_types", []))
     risk_exclude = set(config.get("security_risk_exclude", []))
-    max_per_run = config.get("max_skills_per_run", 50)
-
-    logger.info("フィルタ開始: 入力 %d 件", len(skills))
+    max_per_run = max(config.get("max_skills_per_run", 50), 0)
 
-    # 各条件でフィルタ
-    filtered = [
-        s for s in skills
-        if s.get("category") in categories
-        and s.get("quality_score", 0.0) >= min_quality
-        and s.get("source_type") in source_types
-        and s.get("security_risk", "unknown") not in risk_exclude
-    ]
-    logger.info("条件フィルタ後: %d 件", len(filtered))
-
-    # source_url で重複除去（先に出現したものを優先）
+    total = 0
+    matched = 0
     seen_urls: set[str] = set()
-    deduped: list[dict] = []
-    for s in filtered:
+    # (quality_score, -出現順, エントリ) の最小ヒープ。先頭が次に追い出す候補
+    heap: list[tuple[float, int, dict]] = []
+
+    for s in skills:
+        total += 1
+        # 各条件でフィルタ
+        if not (
+            s.get("category") in categories
+            and s.get("quality_score", 0.0) >= min_quality
+            and s.get("source_type") in source_types
+            and s.get("security_risk", "unknown") not in risk_exclude
+        ):
+            continue
+        matched += 1
+
+        # source_url で重複除去（先に出現したものを優先）
         url = s.get("source_url", "")
-        if url not in seen_urls:
-            seen_urls.add(url)
-            deduped.append(s)
-    logger.info("重複除去後: %d 件", len(deduped))
-
-    # quality_score 降順ソート
-    deduped.sort(key=lambda s: s.get("quality_score", 0.0), reverse=True)
-
-    # 上限適用
-    result = deduped[:max_per_run]
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+
+        # 上位 max_per_run 件を保持
+        item = (s.get("quality_score", 0.0), -len(seen_urls), s)
+        if len(heap) < max_per_run:
+            heapq.heappush(heap, item)
+        elif max_per_run and item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    logger.info("フィルタ: 入力 %d 件", total)
+    logger.info("条件フィルタ後: %d 件", matched)
+    logger.info("重複除去後: %d 件", len(seen_urls))
+
+    # quality_score 降順（同点は出現順）
+    heap.sort(key=lambda item: item[:2], reverse=True)
+    result = [s for _, _, s in heap]
     logger.info("上限適用後: %d 件 (max=%d)", len(result), max_per_run)
 
     return result
 
 
-def exclude_existing(candidates: list[dict], output_dir: str | Path) -> list[dict]:
+def exclude_existing(
+    candidates: list[dict],
+    output_dir: str | Path,
+    keep: set[str] | None = None,
+    index: SkillIndex | None = None,
+) -> list[dict]:
     """出力先に既に存在するスキルを候補から除外する。
 
+    index があれば候補ごとに索引を引き、索引にある slug は SKILL.md が
+    出力先に残っているかだけを確認する（消えていれば再生成する）。索引にない
+    slug は出力先のディレクトリの有無を確認する（手書きのスキルとの衝突を避けるため）。
+    index がなければ出力先ディレクトリを走査する。
+
     Args:
         candidates: フィルタ済みスキルリスト
         output_dir: 既存スキルが格納されているディレクトリ
+        keep: 既存でも除外しない slug またはスキル名（カタログ側が更新されたエントリ、
+            再生成が必要なもの）
+        index: 生成済みスキルの索引
 
     Returns:
         既存スキルを除外したリスト
     """
     out = Path(output_dir)
-    if not out.exists():
-        logger.info("出力先が存在しないため除外なし: %s", out)
-        return candidates
+    keep = keep or set()
+
+    def kept(slug: str) -> bool:
+        return bool(keep) and (slug in keep or validate_name(slug) in keep)
+
+    if index is not None:
+        def exists(slug: str) -> bool:
+            for name in (slug, validate_name(slug)):
+                if name in index:
+                    return (out / name / SKILL_FILENAME).is_file()
+            return bool(slug) and (out / slug).is_dir()
+
+        result = [s for s in candidates if kept(s.get("slug", "")) or not exists(s.get("slug", ""))]
+    else:
+        if not out.exists():
+            logger.info("出力先が存在しないため除外なし: %s", out)
+            return candidates
 
-    existing_slugs = {d.name for d in out.iterdir() if d.is_dir()}
-    logger.info("既存スキル: %d 件", len(existing_slugs))
+        existing_slugs = {d.name for d in out.iterdir() if d.is_dir()}
+        logger.info("既存スキル: %d 件", len(existing_slugs))
+
+        result = [s for s in candidates if kept(s.get("slug", "")) or s.get("slug") not in existing_slugs]
 
-    result = [s for s in candidates if s.get("slug") not in existing_slugs]
     excluded = len(candidates) - len(result)
     if excluded:
         logger.info("既存スキル除外: %d 件除外 → 残り %d 件", excluded, len(result))
@@ -82,22 +135,108 @@ def exclude_existing(candidates: list[dict], output_dir: str | Path) -> list[dic
     return result
 
 
+class _CountingIterator:
+    """通過した要素数を数えるイテレータ。"""
+
+    def __init__(self, items: Iterable[dict]) -> None:
+        self._items = iter(items)
+        self.count = 0
+
+    def __iter__(self) -> _CountingIterator:
+        return self
+
+    def __next__(self) -> dict:
+        item = next(self._items)
+        self.count += 1
+        return item
+
+
 def filter_pipeline(
-    skills: list[dict],
+    skills: Iterable[dict],
     config: dict,
     output_dir: str | Path,
+    index: SkillIndex | None = None,
+    keep: set[str] | None = None,
 ) -> list[dict]:
     """filter_candidates → exclude_existing を順に適用するパイプライン。
 
+    skills はイテレータでもよく、カタログ全体をメモリに載せずに処理できる。
+
     Args:
-        skills: skills.json のエントリリスト
+        skills: skills.json のエントリ（イテレータ可）
         config: config.yaml の filter セクションの辞書
         output_dir: 既存スキルが格納されているディレクトリ
+        index: 生成済みスキルの索引（exclude_existing に渡す）
+        keep: 既存でも除外しないスキル名（exclude_existing に渡す）
 
     Returns:
         最終的な変換対象スキルリスト
     """
-    candidates = filter_candidates(skills, config)
-    result = exclude_existing(candidates, output_dir)
-    logger.info("パイプライン完了: %d 件 → %d 件", len(skills), len(result))
+    counted = _CountingIterator(skills)
+    candidates = filter_candidates(counted, config)
+    result = exclude_existing(candidates, output_dir, keep=keep, index=index)
+    logger.info("パイプライン完了: %d 件 → %d 件", counted.count, len(result))
     return result
+
+
+def filter_pipeline_indexed(
+    store: CatalogStore,
+    config: dict,
+    output_dir: str | Path,
+    index: SkillIndex | None = None,
+    keep: set[str] | None = None,
+) -> list[dict]:
+    """filter_pipeline のインデックス版。条件の評価をカタログストアのクエリで行う。
+
+    Args:
+        store: 同期済みのカタログストア
+        config: config.yaml の filter セクションの辞書
+        output_dir: 既存スキルが格納されているディレクトリ
+        index: 生成済みスキルの索引（exclude_existing に渡す）
+        keep: 既存でも除外しないスキル名（exclude_existing に渡す）
+
+    Returns:
+        最終的な変換対象スキルリスト
+    """
+    candidates = store.query_candidates(config)
+    result = exclude_existing(candidates, output_dir, keep=keep, index=index)
+    logger.info("パイプライン完了: %d 件 → %d 件", store.count(), len(result))
+    return result
+
+
+def filter_pipeline_incremental(
+    skills: Iterable[dict],
+    manifest: dict[str, str],
+    config: dict,
+    output_dir: str | Path,
+    index: SkillIndex | None = None,
+    keep: set[str] | None = None,
+) -> tuple[CatalogDiff, list[dict]]:
+    """カタログ差分を求め、filter_pipeline の選ぶエントリのうち added / changed だけを返す。
+
+    上限 max_skills_per_run は filter_pipeline と同じくカタログ全体の順位に適用し、
+    その中から added / changed を取り出す（変更のない上位のエントリも枠を使う）。
+    changed のエントリは出力先に既存でも再生成するため除外しない。既存のため
+    除外した added のエントリは diff.existing に入れる。
+
+    Args:
+        skills: skills.json のエントリ（イテレータ可）
+        manifest: slug → 前回変換時の内容ハッシュ
+        config: config.yaml の filter セクションの辞書
+        output_dir: 既存スキルが格納されているディレクトリ
+        index: 生成済みスキルの索引（exclude_existing に渡す）
+        keep: changed 以外に既存でも除外しないスキル名
+
+    Returns:
+        (前回変換時のマニフェストとの差分, 最終的な変換対象スキルリスト)
+    """
+    diff = CatalogDiff()
+    ranked = filter_candidates(iter_diff(skills, manifest, diff), config)
+    pending = {id(s) for s in diff.pending}
+    candidates = [s for s in ranked if id(s) in pending]
+    result = exclude_existing(candidates, output_dir, keep=diff.changed_slugs | (keep or set()), index=index)
+    # 既存で除外したものは diff.existing に残す（次回から変更なしとして扱えるように）
+    converted = {id(s) for s in result}
+    diff.existing = [s.get("slug", "") for s in candidates if id(s) not in converted]
+    logger.info("パイプライン完了（差分）: %d 件 → %d 件", len(diff.pending), len(result))
+    return diff, result
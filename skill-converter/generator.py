@@ -5,15 +5,22 @@
 
 from __future__ import annotations
 
+import functools
 import logging
 import re
+from collections.abc import Iterator
 from pathlib import Path
 
-import yaml
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+# frontmatter の読み書きは skill-creator の検証スクリプトと同じ実装（同梱のコピー）を使う
+from skill_frontmatter import FrontmatterError, dump, split_frontmatter, update
 
 logger = logging.getLogger(__name__)
 
+# 生成ロジック・テンプレートの出力が変わったら上げる（skill_index で古い出力の判定に使う）
+GENERATOR_VERSION = "5"
+
 CATEGORY_EMOJI: dict[str, str] = {
     "claude-code": "\U0001f916",
     "mcp-servers": "\U0001f50c",
@@ -30,6 +37,12 @@ CATEGORY_EMOJI: dict[str, str] = {
     "automation": "\u26a1",
 }
 
+# コンパイル済みテンプレートのキャッシュ（キー: 絶対パス, mtime）
+_template_cache: dict[tuple[str, int], Template] = {}
+
+# Jinja バイトコードの保存先（None ならプロセス内キャッシュのみ）
+_bytecode_cache_dir: Path | None = None
+
 # README から検出するインストールコマンドのパターン
 _INSTALL_PATTERNS: list[tuple[str, int]] = [
     (r"npm\s+install\s+(?:-g\s+)?(\S+)", 1),
@@ -46,89 +59,314 @@ _KNOWN_BINS: set[str] = {
     "cargo", "go", "gh", "git", "curl", "jq",
 }
 
+_INSTALL_RES: list[tuple[re.Pattern[str], int]] = [
+    (re.compile(pattern), group_idx) for pattern, group_idx in _INSTALL_PATTERNS
+]
+
+# 既知バイナリの直接参照（行頭・空白・バッククォートで区切られたもの）
+_KNOWN_BIN_RE = re.compile(
+    r"(?:(?<=\s)|(?<=`)|^)("
+    + "|".join(re.escape(b) for b in sorted(_KNOWN_BINS, key=lambda b: (-len(b), b)))
+    + r")(?=\s|`|$)",
+    re.MULTILINE,
+)
+
+
+def _build_scanner() -> tuple[re.Pattern[str], dict[str, tuple[list[int], bool, bool]]]:
+    """インストールパターンと既知バイナリをまとめて 1 回で走査する正規表現を作る。
+
+    各候補を「先頭の単語（リテラル）+ 残りの条件の先読み」の選択にすることで、
+    re が先頭文字による読み飛ばしを使えるようにしている。消費するのは
+    先頭の単語だけで、実際の照合は extract_bins 側で行う。先頭の単語は
+    互いに接頭辞にならないので、同じ位置で成立する候補は消費した単語で決まる。
+
+    Returns:
+        (正規表現, 先頭の単語 → (インストールパターン番号のリスト,
+        既知バイナリかどうか, 内側から別の候補が始まり得るか))
+    """
+    alternatives: list[str] = []
+    heads: dict[str, list[int]] = {}
+    for i, (pattern, _) in enumerate(_INSTALL_PATTERNS):
+        head = re.match(r"[a-z]+", pattern).group(0)
+        alternatives.append(f"{head}(?={pattern[len(head):]})")
+        heads.setdefault(head, []).append(i)
+    for name in sorted(_KNOWN_BINS):
+        word = re.escape(name)
+        alternatives.append(rf"{word}(?<![^\s`]{word})(?=\s|`|$)")
+        heads.setdefault(name, [])
+
+    dispatch = {
+        head: (
+            indices,
+            head in _KNOWN_BINS,
+            any(other in head[1:] for other in heads),
+        )
+        for head, indices in heads.items()
+    }
+    return re.compile("|".join(alternatives), re.MULTILINE), dispatch
+
+
+_SCAN_RE, _SCAN_DISPATCH = _build_scanner()
+
+
 # セクション見出しのエイリアス（小文字で照合）
 _OVERVIEW_HEADINGS = {"description", "about", "overview"}
 _INSTALL_HEADINGS = {"installation", "install", "setup", "getting started"}
 _USAGE_HEADINGS = {"usage", "quick start", "how to use", "examples"}
 
 
-def _split_sections(readme: str) -> list[tuple[int, str, str]]:
-    """README を見出しで分割する。
+# 抽出するセクション本文の最大文字数
+_SECTION_LIMIT = 500
+
+# 見出し行（level, 見出し文字列）とフェンス付きコードブロックの開始行
+# 見出しの前後の空白は改行以外の空白だけで照合し、改行をまたがない（GENERATOR_VERSION 4 から）。
+# 行末の空白には \r も含めるので、CRLF の README でも閉じの # を取り除ける。
+# 以前の \s+ / [\s#]* は改行もまたいでいたため、# と空白だけの行で結果が変わる:
+#   - "##\n" の次の行は、以前は見出し文字列になったが、今は本文になる
+#   - 見出しの直後の空行や "   #"・"## ##" だけの行は、以前は見出し行に取り込まれ本文から消えていたが、今は本文に残る
+_HEADING_PATTERN = r"(#{1,6})[ \t]+(.+?)(?:[^\S\n]|#)*"
+_FENCE_PATTERN = r"( {0,3})(`{3,}|~{3,})(.*)"
+# 抽出対象になり得る見出しだけに絞った見出し行（最終判定は extract_sections で行う）
+_TARGET_HEADING_PATTERN = (
+    r"(#{1,6})[ \t]+(?=[^\S\n]*(?i:"
+    + "|".join(
+        re.escape(h).replace(r"\ ", " ")
+        for h in sorted(_OVERVIEW_HEADINGS | _INSTALL_HEADINGS | _USAGE_HEADINGS)
+    )
+    + r")(?:[^\S\n]|#)*$)(.+?)(?:[^\S\n]|#)*"
+)
+_NON_SPACE_RE = re.compile(r"\S")
+# 段落の区切り（空白だけの行を挟む改行）
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[^\S\n]*\n")
+
+
+def _block_res(heading_pattern: str) -> tuple[re.Pattern[str], re.Pattern[str]]:
+    """見出し行またはフェンス開始行を探す正規表現の組を作る。
+
+    行頭を ^ でなく直前の改行で探すと re が改行文字で読み飛ばせるので、
+    文書先頭の行だけを 1 つ目の正規表現で別に判定する。
 
     Returns:
-        [(level, heading_text, body), ...] のリスト。
-        見出し前のテキストは level=0, heading_text="" で格納。
+        (文書先頭の行を照合する正規表現, 2 行目以降を探す正規表現)
     """
-    heading_re = re.compile(r"^(#{1,6})\s+(.+?)[\s#]*$", re.MULTILINE)
-    sections: list[tuple[int, str, str]] = []
-    last_end = 0
-    last_level = 0
-    last_heading = ""
+    pattern = f"(?:{heading_pattern}|{_FENCE_PATTERN})$"
+    return re.compile(pattern, re.MULTILINE), re.compile(r"\n" + pattern, re.MULTILINE)
 
-    for m in heading_re.finditer(readme):
-        body = readme[last_end:m.start()].strip()
-        sections.append((last_level, last_heading, body))
-        last_level = len(m.group(1))
-        last_heading = m.group(2).strip()
-        last_end = m.end()
 
-    # 最後のセクション
-    body = readme[last_end:].strip()
-    sections.append((last_level, last_heading, body))
+_ALL_BLOCK_RES = _block_res(_HEADING_PATTERN)
+_TARGET_BLOCK_RES = _block_res(_TARGET_HEADING_PATTERN)
 
-    return sections
 
+@functools.lru_cache(maxsize=32)
+def _closing_fence_re(fence: str) -> re.Pattern[str]:
+    """開始フェンスに対応する終了フェンス（同じ文字で同じ長さ以上）の正規表現。"""
+    return re.compile(
+        rf"\n {{0,3}}{re.escape(fence[0])}{{{len(fence)},}}[^\S\n]*$", re.MULTILINE,
+    )
 
-def extract_sections(readme: str) -> dict[str, str]:
-    """README から overview / install / usage セクションを抽出する。"""
-    sections = _split_sections(readme)
-    result: dict[str, str] = {}
 
-    for _level, heading, body in sections:
-        if not body:
+def _iter_headings(
+    readme: str,
+    pos: int,
+    block_res: tuple[re.Pattern[str], re.Pattern[str]],
+) -> Iterator[re.Match[str]]:
+    """pos 以降の見出し行を先頭から順に返す。
+
+    フェンス付きコードブロック内の ``#`` 行は見出しとみなさない。本文は
+    コピーしないので、呼び出し側は必要な分だけ取り出して途中で打ち切れる。
+
+    Yields:
+        見出し行のマッチ（group(1): ``#`` の並び, group(2): 見出し文字列）
+    """
+    line_re, start_re = block_res
+    while True:
+        m = (pos == 0 and line_re.match(readme)) or start_re.search(readme, pos)
+        if m is None:
+            return
+        pos = m.end()
+        if m.group(1) is not None:
+            yield m
             continue
-        heading_lower = heading.lower().strip()
 
-        # overview: 見出しなし（冒頭）またはDescription/About/Overview
-        if heading_lower == "" and "overview" not in result:
-            result["overview"] = body[:500]
-        elif heading_lower in _OVERVIEW_HEADINGS and "overview" not in result:
-            result["overview"] = body[:500]
+        fence = m.group(4)
+        # バッククォートのフェンスは情報文字列にバッククォートを含められない（インラインコード）
+        if fence[0] == "`" and "`" in m.group(5):
+            continue
+        close = _closing_fence_re(fence).search(readme, pos)
+        if close is None:
+            # 閉じられていないコードブロックは文書末尾まで続く
+            return
+        pos = close.end()
+
+
+def _section_end(readme: str, pos: int) -> int:
+    """pos から始まるセクション本文の終端（次の見出し行の位置）を返す。"""
+    m = next(_iter_headings(readme, pos, _ALL_BLOCK_RES), None)
+    return m.start() if m is not None else len(readme)
+
+
+def _excerpt(text: str, start: int, end: int, limit: int) -> str:
+    """text[start:end].strip()[:limit] と同じ文字列を、先頭 limit 文字だけの
+    コピーで返す。"""
+    m = _NON_SPACE_RE.search(text, start, end)
+    if m is None:
+        return ""
+    first = m.start()
+    if end - first <= limit:
+        return text[first:end].rstrip()
+    excerpt = text[first:first + limit]
+    # 切り詰め位置以降が空白だけなら、末尾の空白は strip で消える
+    if excerpt[-1].isspace() and _NON_SPACE_RE.search(text, first + limit, end) is None:
+        return excerpt.rstrip()
+    return excerpt
+
+
+def _first_paragraph(text: str, limit: int) -> str:
+    """最初の段落を strip して先頭 limit 文字を返す。段落全体はコピーしない。"""
+    m = _NON_SPACE_RE.search(text)
+    if m is None:
+        return ""
+    first = m.start()
+    window_end = first + limit
+
+    brk = _PARAGRAPH_BREAK_RE.search(text, first, window_end)
+    if brk is None:
+        # 区切りが切り詰め位置をまたぐ場合は、その直前の改行から始まる
+        newline = text.rfind("\n", first, window_end)
+        if newline >= 0:
+            brk = _PARAGRAPH_BREAK_RE.match(text, newline)
+    if brk is not None:
+        return _excerpt(text, first, brk.start(), limit)
+
+    # 段落は切り詰め位置より先まで続く。次の非空白文字までに区切りがあれば
+    # そこで段落が終わる（間は空白だけ）
+    following = _NON_SPACE_RE.search(text, window_end)
+    if following is None:
+        return _excerpt(text, first, len(text), limit)
+    brk = _PARAGRAPH_BREAK_RE.search(text, window_end, following.start())
+    end = brk.start() if brk is not None else following.end()
+    return _excerpt(text, first, end, limit)
+
+
+def _body_settled(readme: str, start: int, end: int) -> bool:
+    """本文 [start, end) の抜粋が、readme の続きを読んでも変わらないかどうか。
+
+    次の見出しで終わっているか、_SECTION_LIMIT 文字より先に非空白文字がある場合に True。
+    """
+    if end < len(readme):
+        return True
+    m = _NON_SPACE_RE.search(readme, start, end)
+    return m is not None and _NON_SPACE_RE.search(readme, m.start() + _SECTION_LIMIT, end) is not None
+
+
+def _extract_sections(readme: str) -> tuple[dict[str, str], bool]:
+    """extract_sections の本体。
+
+    Returns:
+        (抽出結果, 3 つとも見出しから見つかり、どれも readme の続きで変わらないか)
+    """
+    result: dict[str, str] = {}
+    settled = True
+
+    # overview: 見出しなし（冒頭）
+    end = _section_end(readme, 0)
+    body = _excerpt(readme, 0, end, _SECTION_LIMIT)
+    if body:
+        result["overview"] = body
+        settled = _body_settled(readme, 0, end)
+
+    for m in _iter_headings(readme, 0, _TARGET_BLOCK_RES):
+        heading_lower = m.group(2).strip().lower().strip()
+        keys: list[str] = []
+
+        # overview: Description/About/Overview
+        if heading_lower in _OVERVIEW_HEADINGS and "overview" not in result:
+            keys.append("overview")
 
         # install
         if heading_lower in _INSTALL_HEADINGS and "install" not in result:
-            result["install"] = body[:500]
+            keys.append("install")
 
         # usage
         if heading_lower in _USAGE_HEADINGS and "usage" not in result:
-            result["usage"] = body[:500]
+            keys.append("usage")
+
+        if not keys:
+            continue
+        end = _section_end(readme, m.end())
+        body = _excerpt(readme, m.end(), end, _SECTION_LIMIT)
+        if not body:
+            continue
+        for key in keys:
+            result[key] = body
+        settled = settled and _body_settled(readme, m.end(), end)
+        if len(result) == 3:
+            return result, settled
 
     # overview が取れなかった場合、最初の段落をフォールバック
     if "overview" not in result:
-        paragraphs = re.split(r"\n\s*\n", readme.strip(), maxsplit=1)
-        if paragraphs:
-            result["overview"] = paragraphs[0].strip()[:500]
+        result["overview"] = _first_paragraph(readme, _SECTION_LIMIT)
+
+    return result, False
+
+
+def extract_sections(readme: str) -> dict[str, str]:
+    """README から overview / install / usage セクションを抽出する。
+
+    対象になり得る見出しだけを順に探し、3 つとも見つかった時点で走査をやめる。
+    本文は先頭 _SECTION_LIMIT 文字だけを取り出す。
+    """
+    return _extract_sections(readme)[0]
 
-    return result
+
+def sections_settled(readme_prefix: str) -> bool:
+    """README の先頭部分だけで extract_sections の結果が確定しているかを返す。
+
+    overview / install / usage がすべて見つかり、どの本文も先頭部分の
+    途中で終わっていれば、続きを取得しても結果は変わらない。
+    """
+    return _extract_sections(readme_prefix)[1]
 
 
 def extract_bins(readme: str) -> list[str]:
-    """README から必要な CLI バイナリを推定する。"""
-    bins: set[str] = set()
+    """README から必要な CLI バイナリを推定する。
 
-    for pattern, group_idx in _INSTALL_PATTERNS:
-        for m in re.finditer(pattern, readme):
+    _SCAN_RE による 1 回の走査で候補位置を見つけ、その位置でだけ該当する
+    パターンを照合する。インストールパターンはパターンごとに直前のマッチの
+    終端を覚えておき、パターン別に re.finditer した場合と同じ（重ならない）
+    マッチだけを採る。
+    """
+    bins: set[str] = set()
+    # インストールパターンごとの、次にマッチを探し始めてよい位置
+    next_start = [0] * len(_INSTALL_RES)
+
+    def collect_at(pos: int, head: str) -> None:
+        indices, is_bin, _ = _SCAN_DISPATCH[head]
+        for i in indices:
+            if pos < next_start[i]:
+                continue
+            pattern, group_idx = _INSTALL_RES[i]
+            m = pattern.match(readme, pos)
+            if m is None:
+                continue
+            next_start[i] = m.end()
             pkg = m.group(group_idx)
             # パッケージ名からバイナリ名を推定（スコープやURLを除去）
             name = pkg.split("/")[-1].split("@")[0].strip()
             if name:
                 bins.add(name)
-
-    # 既知バイナリの直接参照も検出
-    for b in _KNOWN_BINS:
-        # コードブロック等で使われているか確認
-        if re.search(rf"(?:^|\s|`){re.escape(b)}(?:\s|`|$)", readme, re.MULTILINE):
-            bins.add(b)
+        if is_bin and _KNOWN_BIN_RE.match(readme, pos):
+            bins.add(head)
+
+    for hit in _SCAN_RE.finditer(readme):
+        head = hit.group()
+        collect_at(hit.start(), head)
+        if _SCAN_DISPATCH[head][2]:
+            # 消費した単語の内側から始まる候補（cargo の中の go など）も見る
+            for pos in range(hit.start() + 1, hit.end()):
+                inner = _SCAN_RE.match(readme, pos)
+                if inner is not None:
+                    collect_at(pos, inner.group())
 
     return sorted(bins)
 
@@ -158,10 +396,12 @@ def truncate_description(desc: str, max_len: int = 100) -> str:
 
 
 def adapt_existing_skill_md(skill_md: str, entry: dict) -> str:
-    """既存の SKILL.md を OpenClaw 形式にアダプトする。"""
-    frontmatter_re = re.compile(r"^---\s*\n(.*?)\n---\s*\n?", re.DOTALL)
-    match = frontmatter_re.match(skill_md)
+    """既存の SKILL.md を OpenClaw 形式にアダプトする。
 
+    既存の frontmatter は name / description / homepage と
+    metadata.openclaw.auto_generated の行だけを書き換え、他のキーの書式や
+    コメントはそのまま残す（書き換えられない形のときだけ全体を書き直す）。
+    """
     meta = {
         "name": entry.get("slug", ""),
         "description": truncate_description(entry.get("description", "")),
@@ -173,31 +413,61 @@ def adapt_existing_skill_md(skill_md: str, entry: dict) -> str:
         },
     }
 
-    if match:
-        # 既存 frontmatter をパースして上書き
+    try:
+        parts = split_frontmatter(skill_md)
+    except FrontmatterError:
+        parts = None
+    if parts is not None:
+        # 既存 frontmatter の該当キーだけを上書き
+        frontmatter_text, body = parts
         try:
-            existing = yaml.safe_load(match.group(1)) or {}
-        except yaml.YAMLError:
-            existing = {}
-
-        existing["name"] = meta["name"]
-        existing["description"] = meta["description"]
-        existing["homepage"] = meta["homepage"]
-
-        # metadata.openclaw.auto_generated を設定
-        if "metadata" not in existing or not isinstance(existing["metadata"], dict):
-            existing["metadata"] = {}
-        if "openclaw" not in existing["metadata"] or not isinstance(existing["metadata"]["openclaw"], dict):
-            existing["metadata"]["openclaw"] = {}
-        existing["metadata"]["openclaw"]["auto_generated"] = True
-
-        body = skill_md[match.end():]
-        new_fm = yaml.dump(existing, default_flow_style=False, allow_unicode=True, sort_keys=False).strip()
-        return f"---\n{new_fm}\n---\n{body}"
+            new_fm = update(frontmatter_text, meta)
+        except FrontmatterError:
+            # マッピングでない frontmatter は作り直す
+            new_fm = dump(meta)
+        return f"---\n{new_fm}\n---\n{body.lstrip()}"
     else:
         # frontmatter がない場合は先頭に追加
-        new_fm = yaml.dump(meta, default_flow_style=False, allow_unicode=True, sort_keys=False).strip()
-        return f"---\n{new_fm}\n---\n\n{skill_md}"
+        return f"---\n{dump(meta)}\n---\n\n{skill_md}"
+
+
+def set_bytecode_cache_dir(path: str | Path | None) -> None:
+    """Jinja のバイトコードキャッシュの保存先を設定する。
+
+    設定すると新しいプロセスでもテンプレートの再コンパイルを省ける。
+    """
+    global _bytecode_cache_dir
+    _bytecode_cache_dir = Path(path) if path is not None else None
+    if _bytecode_cache_dir is not None:
+        _bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+    _template_cache.clear()
+
+
+def _get_template(template_path: str | Path) -> Template:
+    """コンパイル済みテンプレートを返す。パスと mtime が同じならキャッシュを使う。"""
+    tpl_path = Path(template_path).resolve()
+    key = (str(tpl_path), tpl_path.stat().st_mtime_ns)
+    template = _template_cache.get(key)
+    if template is not None:
+        return template
+
+    bytecode_cache = (
+        FileSystemBytecodeCache(str(_bytecode_cache_dir)) if _bytecode_cache_dir is not None else None
+    )
+    env = Environment(
+        loader=FileSystemLoader(str(tpl_path.parent)),
+        keep_trailing_newline=True,
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+    )
+    template = env.get_template(tpl_path.name)
+
+    # 同じパスの古い版を捨てる
+    for stale in [k for k in _template_cache if k[0] == key[0]]:
+        del _template_cache[stale]
+    _template_cache[key] = template
+    logger.debug("テンプレートをコンパイル: %s", tpl_path)
+    return template
 
 
 def generate_skill_md(
@@ -206,12 +476,7 @@ def generate_skill_md(
     template_path: str | Path,
 ) -> str:
     """エントリと README から SKILL.md を生成する。"""
-    tpl_path = Path(template_path)
-    env = Environment(
-        loader=FileSystemLoader(str(tpl_path.parent)),
-        keep_trailing_newline=True,
-    )
-    template = env.get_template(tpl_path.name)
+    template = _get_template(template_path)
 
     name = validate_name(entry.get("slug", "unnamed"))
     description = truncate_description(entry.get("description", ""))
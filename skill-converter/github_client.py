@@ -0,0 +1,538 @@
+"""プロセス内で GitHub REST API を呼び出す HTTP クライアント。
+
+gh コマンドをリクエストごとに起動する代わりに、keep-alive 接続を
+スレッドごとにプールして使い回す。
+"""
+
+from __future__ import annotations
+
+import base64
+import codecs
+import http.client
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from collections.abc import Callable, Iterator
+from urllib.parse import urljoin, urlsplit
+
+from content_cache import ContentCache
+from metrics import recorder
+from rate_limit import RateBudget
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.github.com"
+
+_USER_AGENT = "openclaw-skill-converter"
+# contents API でファイルの中身をそのまま（base64 でなく）返させるメディアタイプ
+_RAW_MEDIA_TYPE = "application/vnd.github.raw"
+_MAX_REDIRECTS = 5
+# keep-alive 接続がサーバ側で閉じられていた場合に再送する例外
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class GitHubAPIError(Exception):
+    """GitHub API がエラーを返した、または通信に失敗した場合の例外。
+
+    Attributes:
+        status: HTTP ステータスコード（通信失敗時は 0）
+        url: リクエスト先 URL
+    """
+
+    def __init__(self, status: int, url: str, message: str = "") -> None:
+        self.status = status
+        self.url = url
+        super().__init__(f"HTTP {status}: {url} {message}".rstrip())
+
+
+class Response:
+    """HTTP レスポンス（ボディは読み込み済み）。"""
+
+    def __init__(self, status: int, headers: dict[str, str], body: bytes, url: str) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.url = url
+
+    def json(self) -> object:
+        return json.loads(self.body)
+
+    def text(self) -> str:
+        return self.body.decode("utf-8")
+
+
+class StreamResponse:
+    """ボディを逐次読み出す HTTP レスポンス。
+
+    読み切らずに close() した場合は接続を再利用せずに破棄する。同じスレッドから
+    同じホストへ次のリクエストを送る前に読み切るか閉じること。
+    """
+
+    def __init__(
+        self,
+        client: GitHubClient,
+        resp: http.client.HTTPResponse,
+        url: str,
+    ) -> None:
+        self._client = client
+        self._resp = resp
+        self.status = resp.status
+        self.headers = {k.lower(): v for k, v in resp.getheaders()}
+        self.url = url
+
+    def iter_chunks(self, size: int = 64 * 1024) -> Iterator[bytes]:
+        """ボディをチャンク単位で返す。通信エラーは GitHubAPIError に変換する。"""
+        while True:
+            try:
+                chunk = self._resp.read(size)
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                raise GitHubAPIError(0, self.url, str(e)) from e
+            if not chunk:
+                return
+            recorder().count("api_bytes", len(chunk), backend="http")
+            yield chunk
+
+    def close(self) -> None:
+        if not self._resp.isclosed():
+            parts = urlsplit(self.url)
+            self._client._drop_connection(parts.scheme, parts.netloc)
+
+    def __enter__(self) -> StreamResponse:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _range_total(headers: dict[str, str]) -> int | None:
+    """Content-Range ヘッダ（bytes a-b/total）からファイル全体のサイズを取り出す。"""
+    total = headers.get("content-range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def _decode_prefix(data: bytes, complete: bool) -> str:
+    """UTF-8 のバイト列をデコードする。途中までの場合は末尾の不完全な文字を除く。"""
+    if complete:
+        return data.decode("utf-8")
+    return codecs.getincrementaldecoder("utf-8")().decode(data, final=False)
+
+
+def token_from_env() -> str | None:
+    """環境変数（GH_TOKEN / GITHUB_TOKEN）から認証トークンを取得する。
+
+    どちらも未設定の場合は gh CLI のログイン情報（gh auth token）を一度だけ参照する。
+    """
+    for var in ("GH_TOKEN", "GITHUB_TOKEN"):
+        token = os.environ.get(var, "").strip()
+        if token:
+            return token
+
+    if shutil.which("gh"):
+        try:
+            result = subprocess.run(
+                ["gh", "auth", "token"], capture_output=True, text=True, check=True,
+            )
+            token = result.stdout.strip()
+            if token:
+                logger.debug("gh auth token から認証トークンを取得")
+                return token
+        except (subprocess.CalledProcessError, OSError):
+            pass
+
+    logger.warning("GitHub トークンが見つかりません。未認証でアクセスします")
+    return None
+
+
+def _default_graphql_url(base_url: str) -> str:
+    """REST のベース URL から GraphQL エンドポイントを導出する。
+
+    GitHub Enterprise の "https://host/api/v3" は "https://host/api/graphql" に対応する。
+    """
+    if base_url.endswith("/api/v3"):
+        return base_url[: -len("/v3")] + "/graphql"
+    return f"{base_url}/graphql"
+
+
+class GitHubClient:
+    """keep-alive 接続をプールする GitHub REST API クライアント。
+
+    接続はスレッドごと・ホストごとに 1 本保持するため、fetch_catalog の
+    スレッドプールから安全に共有できる。budget を渡すと、応答の
+    X-RateLimit-* ヘッダで残り呼び出し回数を更新する。
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_API_URL,
+        token: str | None = None,
+        timeout: float = 30.0,
+        graphql_url: str | None = None,
+        cache: ContentCache | None = None,
+        budget: RateBudget | None = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.graphql_url = graphql_url or _default_graphql_url(self.base_url)
+        self.token = token
+        self.timeout = timeout
+        self.cache = cache
+        self.budget = budget
+        self._api_netloc = urlsplit(self.base_url).netloc
+        self._local = threading.local()
+        self._all_connections: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 接続管理
+    # ------------------------------------------------------------------
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = self._local.pool = {}
+        key = (scheme, netloc)
+        conn = pool.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=self.timeout)
+            pool[key] = conn
+            with self._lock:
+                self._all_connections.append(conn)
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        pool = getattr(self._local, "pool", {})
+        conn = pool.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self) -> None:
+        """プール中の全接続を閉じる。"""
+        with self._lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # リクエスト
+    # ------------------------------------------------------------------
+
+    def _resolve(self, url: str) -> str:
+        if url.startswith(("http://", "https://")):
+            return url
+        return f"{self.base_url}/{url.lstrip('/')}"
+
+    def _build_headers(self, netloc: str, headers: dict[str, str] | None) -> dict[str, str]:
+        merged = {
+            "User-Agent": _USER_AGENT,
+            "Accept": "application/vnd.github+json",
+        }
+        # 認証ヘッダは API ホストにのみ送る
+        if self.token and netloc == self._api_netloc:
+            merged["Authorization"] = f"Bearer {self.token}"
+        if headers:
+            merged.update(headers)
+        return merged
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None,
+        body: bytes | None,
+    ) -> http.client.HTTPResponse:
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        req_headers = self._build_headers(parts.netloc, headers)
+
+        for attempt in (1, 2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request(method, path, body=body, headers=req_headers)
+                return conn.getresponse()
+            except _STALE_CONNECTION_ERRORS as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt == 2:
+                    raise GitHubAPIError(0, url, str(e)) from e
+                logger.debug("接続を再確立して再送: %s", url)
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                raise GitHubAPIError(0, url, str(e)) from e
+        raise AssertionError("unreachable")
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        body: bytes | None = None,
+    ) -> Response:
+        """リクエストを送りレスポンスを返す。GET のリダイレクトは追従する。
+
+        Args:
+            method: HTTP メソッド
+            url: 絶対 URL、または base_url からの相対パス
+            headers: 追加ヘッダ
+            body: リクエストボディ
+
+        Returns:
+            Response。ステータスコードによる例外は送出しない。
+        """
+        url = self._resolve(url)
+        for _ in range(_MAX_REDIRECTS + 1):
+            logger.debug("%s %s", method, url)
+            resp = self._send(method, url, headers, body)
+            try:
+                data = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                parts = urlsplit(url)
+                self._drop_connection(parts.scheme, parts.netloc)
+                raise GitHubAPIError(0, url, str(e)) from e
+            resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            metrics = recorder()
+            metrics.count("api_requests", backend="http", status=str(resp.status))
+            metrics.count("api_bytes", len(data), backend="http")
+            if self.budget is not None:
+                self.budget.observe(resp_headers)
+
+            location = resp_headers.get("location")
+            if method == "GET" and resp.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return Response(resp.status, resp_headers, data, url)
+
+        raise GitHubAPIError(0, url, "リダイレクト回数の上限を超えました")
+
+    def open_stream(self, url: str, headers: dict[str, str] | None = None) -> StreamResponse:
+        """GET してボディを読まずにレスポンスを返す。リダイレクトは追従する。
+
+        Args:
+            url: 絶対 URL、または base_url からの相対パス
+            headers: 追加ヘッダ（Range など）
+
+        Returns:
+            StreamResponse。ステータスコードによる例外は送出しない。
+        """
+        url = self._resolve(url)
+        for _ in range(_MAX_REDIRECTS + 1):
+            logger.debug("GET (stream) %s", url)
+            resp = self._send("GET", url, headers, None)
+            recorder().count("api_requests", backend="http", status=str(resp.status))
+            if self.budget is not None:
+                self.budget.observe({k.lower(): v for k, v in resp.getheaders()})
+            location = resp.getheader("Location")
+            if resp.status in (301, 302, 303, 307, 308) and location:
+                try:
+                    resp.read()
+                except (OSError, http.client.HTTPException) as e:
+                    parts = urlsplit(url)
+                    self._drop_connection(parts.scheme, parts.netloc)
+                    raise GitHubAPIError(0, url, str(e)) from e
+                url = urljoin(url, location)
+                continue
+            return StreamResponse(self, resp, url)
+
+        raise GitHubAPIError(0, url, "リダイレクト回数の上限を超えました")
+
+    def get_json(self, path: str, headers: dict[str, str] | None = None) -> object:
+        """GET してレスポンスを JSON として返す。4xx/5xx は GitHubAPIError。"""
+        resp = self.request("GET", path, headers=headers)
+        if resp.status >= 400:
+            raise GitHubAPIError(resp.status, resp.url, resp.body[:200].decode("utf-8", "replace"))
+        return resp.json()
+
+    def get_bytes(self, url: str, headers: dict[str, str] | None = None) -> bytes:
+        """GET してレスポンスボディをそのまま返す。4xx/5xx は GitHubAPIError。"""
+        resp = self.request("GET", url, headers=headers)
+        if resp.status >= 400:
+            raise GitHubAPIError(resp.status, resp.url)
+        return resp.body
+
+    def graphql(self, query: str, variables: dict | None = None) -> dict:
+        """GraphQL クエリを実行し、レスポンス全体（data / errors）を返す。"""
+        payload = json.dumps({"query": query, "variables": variables or {}}).encode("utf-8")
+        resp = self.request(
+            "POST", self.graphql_url,
+            headers={"Content-Type": "application/json"},
+            body=payload,
+        )
+        if resp.status >= 400:
+            raise GitHubAPIError(resp.status, resp.url, resp.body[:200].decode("utf-8", "replace"))
+        result = resp.json()
+        if not isinstance(result, dict):
+            raise GitHubAPIError(resp.status, resp.url, "GraphQL レスポンスが不正です")
+        return result
+
+    # ------------------------------------------------------------------
+    # contents API
+    # ------------------------------------------------------------------
+
+    def _get_decoded(self, path: str, cache_key: str) -> str | None:
+        """contents API を GET して base64 をデコードする。
+
+        cache が設定されていれば、TTL 内の負のエントリはリクエストせずに None を返し、
+        正のエントリは If-None-Match で再検証して 304 ならキャッシュの本文を返す。
+        """
+        entry = self.cache.get(cache_key) if self.cache else None
+        if entry is not None and self.cache.is_fresh_negative(entry):
+            self.cache.hits += 1
+            return None
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        resp = self.request("GET", path, headers=headers)
+
+        if resp.status == 304 and entry is not None:
+            self.cache.hits += 1
+            self.cache.revalidated += 1
+            self.cache.touch(cache_key)
+            return entry.body
+        if self.cache:
+            self.cache.misses += 1
+        if resp.status == 404:
+            if self.cache:
+                self.cache.put_missing(cache_key, entry)
+            return None
+        if resp.status >= 400:
+            raise GitHubAPIError(resp.status, resp.url, resp.body[:200].decode("utf-8", "replace"))
+
+        data = resp.json()
+        content_b64 = data.get("content", "") if isinstance(data, dict) else ""
+        decoded = base64.b64decode(content_b64).decode("utf-8") if content_b64 else None
+        if self.cache:
+            if decoded:
+                self.cache.put(cache_key, decoded, resp.headers.get("etag"))
+            else:
+                self.cache.put_missing(cache_key, entry)
+        return decoded
+
+    def get_contents(self, owner: str, repo: str, path: str) -> str | None:
+        """リポジトリ内ファイルの内容をデコードして返す。存在しなければ None。"""
+        return self._get_decoded(f"repos/{owner}/{repo}/contents/{path}", f"{owner}/{repo}/{path}")
+
+    def get_readme(self, owner: str, repo: str) -> str | None:
+        """リポジトリの README の内容をデコードして返す。存在しなければ None。"""
+        return self._get_decoded(f"repos/{owner}/{repo}/readme", f"{owner}/{repo}/:readme")
+
+    def _read_raw_range(
+        self,
+        path: str,
+        start: int,
+        length: int,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        """raw コンテンツの start から length バイトを Range 付きで取得する。
+
+        サーバが Range を無視して 200 を返した場合は先頭から start + length
+        バイトまでを読み、残りは読まずに接続を閉じる。
+
+        Returns:
+            (ステータス, ヘッダ, ボディ)。200 の場合ボディはファイル先頭からの内容。
+        """
+        req_headers = {
+            "Accept": _RAW_MEDIA_TYPE,
+            "Range": f"bytes={start}-{start + length - 1}",
+            **(headers or {}),
+        }
+        with self.open_stream(path, req_headers) as stream:
+            limit = length if stream.status == 206 else start + length
+            buf = bytearray()
+            for chunk in stream.iter_chunks():
+                buf += chunk
+                if stream.status in (200, 206) and len(buf) >= limit:
+                    break
+            body = bytes(buf[:limit]) if stream.status in (200, 206) else bytes(buf)
+            return stream.status, stream.headers, body
+
+    def get_readme_prefix(
+        self,
+        owner: str,
+        repo: str,
+        initial_bytes: int,
+        max_bytes: int,
+        is_enough: Callable[[str], bool],
+    ) -> str | None:
+        """リポジトリの README の先頭部分だけを Range で取得して返す。存在しなければ None。
+
+        initial_bytes から始め、is_enough(取得済みのテキスト) が False の間は
+        取得量を倍にしながら max_bytes まで読み足す。ファイル末尾まで読んだ
+        場合もそこで止める。続きは If-Range で要求し、途中で README が更新されて
+        200 が返った場合はその内容で読み直す。
+
+        cache が設定されていれば、_get_decoded と同様に If-None-Match による再検証と
+        負のキャッシュを行う（キーは取得量の設定ごとに分ける）。
+        """
+        path = f"repos/{owner}/{repo}/readme"
+        cache_key = f"{owner}/{repo}/:readme-prefix:{initial_bytes}:{max_bytes}"
+        entry = self.cache.get(cache_key) if self.cache else None
+        if entry is not None and self.cache.is_fresh_negative(entry):
+            self.cache.hits += 1
+            return None
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        status, resp_headers, data = self._read_raw_range(path, 0, initial_bytes, headers)
+
+        if status == 304 and entry is not None:
+            self.cache.hits += 1
+            self.cache.revalidated += 1
+            self.cache.touch(cache_key)
+            return entry.body
+        if self.cache:
+            self.cache.misses += 1
+        if status == 404:
+            if self.cache:
+                self.cache.put_missing(cache_key, entry)
+            return None
+        if status == 416:
+            # 空のファイルには範囲を満たせない
+            data = b""
+        elif status >= 400:
+            raise GitHubAPIError(status, self._resolve(path), data[:200].decode("utf-8", "replace"))
+
+        etag = resp_headers.get("etag")
+        total = _range_total(resp_headers) if status == 206 else None
+        if status == 200 and len(data) < initial_bytes:
+            total = len(data)
+
+        while True:
+            complete = status == 416 or (total is not None and len(data) >= total)
+            text = _decode_prefix(data, complete)
+            if complete or len(data) >= max_bytes or is_enough(text):
+                break
+            length = min(len(data), max_bytes - len(data))
+            requested_end = len(data) + length
+            range_headers = {"If-Range": etag} if etag else None
+            status, resp_headers, body = self._read_raw_range(path, len(data), length, range_headers)
+            if status == 206:
+                data += body
+                total = _range_total(resp_headers)
+            elif status == 200:
+                # README が更新された（または Range 非対応）ので先頭から読み直した内容を使う
+                data = body
+                etag = resp_headers.get("etag")
+                total = len(data) if len(data) < requested_end else None
+            elif status == 416:
+                total = len(data)
+            else:
+                raise GitHubAPIError(status, self._resolve(path), body[:200].decode("utf-8", "replace"))
+
+        logger.debug(
+            "README 先頭取得: %s/%s %d バイト (全体 %s)",
+            owner, repo, len(data), total if total is not None else "不明",
+        )
+        if self.cache:
+            if text:
+                self.cache.put(cache_key, text, etag)
+            else:
+                self.cache.put_missing(cache_key, entry)
+        return text or None
@@ -0,0 +1,139 @@
+"""巨大な JSON 配列を要素単位で逐次パースするモジュール。
+
+skills.json のようなトップレベル配列を、全体を文字列に読み込まずに
+バイト列のチャンクから 1 要素ずつ取り出す。
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import IO
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+# 要素の直後に現れてよい文字（これ以外なら数値などが途中で切れている可能性がある）
+_VALUE_TERMINATORS = _WHITESPACE + ",]"
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[object]:
+    """バイト列チャンクの並びからトップレベル JSON 配列の要素を順に返す。
+
+    保持するのは未パースの末尾と処理中の 1 要素だけなので、配列の長さに
+    関わらずメモリ使用量はほぼ一定になる。
+
+    Args:
+        chunks: UTF-8 でエンコードされた JSON 配列のチャンク列
+
+    Yields:
+        配列の各要素
+
+    Raises:
+        json.JSONDecodeError: JSON として不正、または配列でない場合
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    source = iter(chunks)
+    buf = ""
+    pos = 0
+    eof = False
+    state = "start"  # start → value → separator → (value → separator)* → end
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        # パース済みの部分を捨ててからチャンクを追加する
+        if pos:
+            buf = buf[pos:]
+            pos = 0
+        for chunk in source:
+            text = utf8.decode(chunk)
+            if text:
+                buf += text
+                return True
+        buf += utf8.decode(b"", final=True)
+        eof = True
+        return True
+
+    while True:
+        # 空白を読み飛ばす
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not fill():
+                break
+        if pos >= len(buf):
+            raise json.JSONDecodeError("配列の途中でデータが終了しました", buf, pos)
+
+        ch = buf[pos]
+        if state == "start":
+            if ch != "[":
+                raise json.JSONDecodeError("トップレベルが配列ではありません", buf, pos)
+            pos += 1
+            state = "first"
+            continue
+        if state in ("first", "separator") and ch == "]":
+            return
+        if state == "separator":
+            if ch != ",":
+                raise json.JSONDecodeError("',' または ']' が必要です", buf, pos)
+            pos += 1
+            state = "value"
+            continue
+
+        # 要素をデコード。途中で切れている、または数値などの直後が区切り文字で
+        # なく続きがあり得る場合はデータを追加して再試行する
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if fill():
+                continue
+            raise
+        if (end >= len(buf) or buf[end] not in _VALUE_TERMINATORS) and fill():
+            continue
+        pos = end
+        state = "separator"
+        yield value
+
+
+def iter_file_chunks(fp: IO[bytes], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """バイナリファイルをチャンク単位で読み出す。"""
+    while True:
+        chunk = fp.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_json_file(path: str | Path) -> Iterator[object]:
+    """JSON 配列ファイルの要素を逐次返す。"""
+    with open(path, "rb") as fp:
+        yield from iter_json_array(iter_file_chunks(fp))
+
+
+class CompactArrayWriter:
+    """要素を 1 行 1 要素のコンパクトな JSON 配列としてファイルに書き出す。
+
+    出力は通常の JSON 配列なので json.load でも iter_json_file でも読める。
+    """
+
+    def __init__(self, fp: IO[str]) -> None:
+        self._fp = fp
+        self._count = 0
+        fp.write("[")
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def write(self, value: object) -> None:
+        self._fp.write(",\n" if self._count else "\n")
+        self._fp.write(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+        self._count += 1
+
+    def close(self) -> None:
+        self._fp.write("\n]\n")
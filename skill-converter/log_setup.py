@@ -0,0 +1,181 @@
+"""ログ出力の設定。
+
+ルートロガーには QueueHandler だけを付け、ファイルと標準エラーへの書き出しは
+QueueListener のスレッドで行う。取得・生成・書き出しの段でエントリごとに
+ログを出しても、ディスクや端末の I/O を待たない。
+
+format が json なら 1 行 1 JSON で出力し、extra で渡したエントリごとの
+フィールド（slug / stage / duration）もそのまま含める。
+
+    logger.info("[%s] 書き出し完了", slug, extra={"slug": slug, "stage": "write", "duration": 0.002})
+
+件数の多い実行では、slug 付きの DEBUG 行を 1 秒あたりの行数で間引ける
+（間引いた行はキューにも入れない）。
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+ENTRY_FIELDS = ("slug", "stage", "duration")
+
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
+_sampler: EntrySampler | None = None
+_atexit_registered = False
+
+
+class JsonFormatter(logging.Formatter):
+    """1 レコードを 1 行の JSON にする。エントリごとのフィールドがあれば含める。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, object] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ENTRY_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = round(value, 6) if isinstance(value, float) else value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class EntrySampler(logging.Filter):
+    """slug 付きの DEBUG 行を 1 秒あたり rate 行までに制限するフィルタ。
+
+    それ以外のレコード（INFO 以上、slug のない行）はすべて通す。間引いた行数は
+    次の 1 秒の窓に入ったときに DEBUG でまとめて出し、合計を dropped に持つ。
+
+    Args:
+        rate: 1 秒あたりに通す行数
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+        self._window_start = 0.0
+        self._passed = 0
+        self._dropped_in_window = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or getattr(record, "slug", None) is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            reported = 0
+            if now - self._window_start >= 1.0:
+                reported = self._dropped_in_window
+                self._window_start = now
+                self._passed = 0
+                self._dropped_in_window = 0
+            allowed = self._passed < self.rate
+            if allowed:
+                self._passed += 1
+            else:
+                self._dropped_in_window += 1
+                self.dropped += 1
+        if reported:
+            # slug のない行なのでこのフィルタは通る
+            logger.debug("エントリごとの DEBUG 行を %d 行間引きました", reported)
+        return allowed
+
+
+def setup_logging(
+    log_dir: str | Path,
+    verbose: bool = False,
+    log_format: str = "text",
+    entry_debug_per_second: float = 0,
+) -> Path:
+    """ルートロガーを QueueHandler 経由でファイルと標準エラーに出力するよう設定する。
+
+    何度呼んでもハンドラは重複しない（前回の設定を止めてから設定し直す）。
+    キューに残ったログはプロセス終了時に書き出す。
+
+    Args:
+        log_dir: ログファイル（convert-YYYYMMDD.log）の保存先
+        verbose: True なら DEBUG レベルまで出力する
+        log_format: text（1 行テキスト）/ json（1 行 1 JSON）
+        entry_debug_per_second: slug 付きの DEBUG 行の 1 秒あたりの上限（0 なら間引かない）
+
+    Returns:
+        ログファイルのパス
+
+    Raises:
+        ValueError: log_format が未知の場合
+    """
+    global _listener, _queue_handler, _sampler, _atexit_registered
+    if log_format == "text":
+        formatter = logging.Formatter(TEXT_FORMAT)
+    elif log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        raise ValueError(f"未知の logging.format: {log_format}")
+
+    shutdown_logging()
+
+    log_path = Path(log_dir)
+    log_path.mkdir(parents=True, exist_ok=True)
+    today = datetime.now().strftime("%Y%m%d")
+    log_file = log_path / f"convert-{today}.log"
+    level = logging.DEBUG if verbose else logging.INFO
+
+    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    stream_handler = logging.StreamHandler(sys.stderr)
+    for handler in (file_handler, stream_handler):
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    _sampler = None
+    if verbose and entry_debug_per_second > 0:
+        _sampler = EntrySampler(entry_debug_per_second)
+        _queue_handler.addFilter(_sampler)
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    if not _atexit_registered:
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+
+    logger.info("ログ出力先: %s", log_file)
+    return log_file
+
+
+def shutdown_logging() -> None:
+    """キューに残ったログを書き出し、setup_logging で付けたハンドラを外して閉じる。"""
+    global _listener, _queue_handler, _sampler
+    if _queue_handler is None:
+        return
+    if _sampler is not None and _sampler.dropped:
+        logger.info("エントリごとの DEBUG 行を合計 %d 行間引きました", _sampler.dropped)
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+    _sampler = None
@@ -0,0 +1,219 @@
+"""変換 1 回分の計測値を集めて書き出すモジュール。
+
+段ごとの処理時間と件数、API 呼び出しの回数と転送量、レート制限の待ち時間、
+キャッシュのヒット・ミス、時間のかかったエントリを集計し、実行の最後に
+JSON と（任意で）Prometheus の textfile 形式で書き出す。
+
+計測が無効なとき recorder() は何もしない _NullRecorder を返すので、
+呼び出し側は有効かどうかを気にせず記録してよい。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = "skill_converter_"
+
+_Labels = tuple[tuple[str, str], ...]
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    """一時ファイルに書いてから置き換える（textfile collector が途中の内容を読まないように）。"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRecorder:
+    """計測値の集計先。複数スレッドから記録できる。
+
+    値はすべて名前とラベルの組ごとの数値として持ち、段の時間・件数も
+    stage_seconds / stage_items という名前で記録する。
+
+    Args:
+        slowest: 記録する遅いエントリの件数
+    """
+
+    enabled = True
+
+    def __init__(self, slowest: int = 10) -> None:
+        self.slowest = max(0, slowest)
+        self.started = time.time()
+        self._values: dict[str, dict[_Labels, float]] = {}
+        self._entries: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        """カウンタに value を加える。"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """値を上書きする（キューの最大深さなど）。"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def observe(self, stage: str, seconds: float, items: int = 1) -> None:
+        """段の処理時間と件数を加える。並行する段では各スレッドの時間の合計になる。"""
+        self.count("stage_seconds", seconds, stage=stage)
+        self.count("stage_items", items, stage=stage)
+
+    def entry(self, slug: str, stage: str, seconds: float) -> None:
+        """エントリ 1 件の段ごとの時間を記録する（遅いエントリの集計用）。"""
+        with self._lock:
+            times = self._entries.setdefault(slug, {})
+            times[stage] = times.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def timed(self, phase: str) -> Iterator[None]:
+        """with 文の経過時間を phase_seconds{phase=...} として記録する。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.set("phase_seconds", time.perf_counter() - start, phase=phase)
+
+    # ------------------------------------------------------------------
+    # 集計・書き出し
+    # ------------------------------------------------------------------
+
+    def _get(self, name: str, **labels: str) -> float:
+        return self._values.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def snapshot(self) -> dict:
+        """現在の計測値を JSON にできる辞書で返す。"""
+        with self._lock:
+            finished = time.time()
+            stages = {}
+            for labels in self._values.get("stage_seconds", {}):
+                stage = dict(labels)["stage"]
+                seconds = self._get("stage_seconds", stage=stage)
+                items = int(self._get("stage_items", stage=stage))
+                stages[stage] = {
+                    "seconds": round(seconds, 6),
+                    "items": items,
+                    "ms_per_item": round(seconds * 1000 / items, 3) if items else None,
+                }
+
+            caches: dict[str, dict[str, float]] = {}
+            for labels, value in self._values.get("cache_requests", {}).items():
+                label = dict(labels)
+                caches.setdefault(label["cache"], {})[label["result"]] = value
+            for counts in caches.values():
+                lookups = counts.get("hit", 0) + counts.get("miss", 0)
+                counts["hit_ratio"] = round(counts.get("hit", 0) / lookups, 4) if lookups else None
+
+            slowest = heapq.nlargest(
+                self.slowest, self._entries.items(), key=lambda item: sum(item[1].values()),
+            )
+            return {
+                "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+                "finished_at": datetime.fromtimestamp(finished, timezone.utc).isoformat(timespec="seconds"),
+                "duration_seconds": round(finished - self.started, 3),
+                "stages": stages,
+                "caches": caches,
+                "slowest_entries": [
+                    {
+                        "slug": slug,
+                        "seconds": round(sum(times.values()), 6),
+                        **{stage: round(seconds, 6) for stage, seconds in times.items()},
+                    }
+                    for slug, times in slowest
+                ],
+                "values": {
+                    name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                    for name, series in sorted(self._values.items())
+                },
+            }
+
+    def prometheus_text(self) -> str:
+        """Prometheus の textfile 形式で返す。値は実行ごとの値なのですべて gauge とする。"""
+        lines: list[str] = []
+        with self._lock:
+            finished = time.time()
+            for name, series in sorted(self._values.items()):
+                metric = PROMETHEUS_PREFIX + name
+                lines.append(f"# TYPE {metric} gauge")
+                for labels, value in sorted(series.items()):
+                    label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                    text = _format_value(value)
+                    lines.append(f"{metric}{{{label_text}}} {text}" if label_text else f"{metric} {text}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}run_duration_seconds gauge")
+        lines.append(f"{PROMETHEUS_PREFIX}run_duration_seconds {finished - self.started:.3f}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}last_run_timestamp_seconds gauge")
+        lines.append(f"{PROMETHEUS_PREFIX}last_run_timestamp_seconds {finished:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str | Path | None, prometheus_path: str | Path | None = None) -> None:
+        """計測値を書き出す。パスが None の形式は書き出さない。"""
+        if json_path:
+            _write_atomic(Path(json_path), json.dumps(self.snapshot(), ensure_ascii=False, indent=2) + "\n")
+            logger.info("計測値を書き出し: %s", json_path)
+        if prometheus_path:
+            _write_atomic(Path(prometheus_path), self.prometheus_text())
+            logger.info("計測値を書き出し (Prometheus): %s", prometheus_path)
+
+
+class _NullRecorder:
+    """計測が無効なときの記録先。何もしない。"""
+
+    enabled = False
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        pass
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    def observe(self, stage: str, seconds: float, items: int = 1) -> None:
+        pass
+
+    def entry(self, slug: str, stage: str, seconds: float) -> None:
+        pass
+
+    def timed(self, phase: str) -> contextlib.nullcontext:
+        return contextlib.nullcontext()
+
+
+_recorder: MetricsRecorder | _NullRecorder = _NullRecorder()
+
+
+def recorder() -> MetricsRecorder | _NullRecorder:
+    """現在の記録先を返す。計測が無効なら何もしない記録先。"""
+    return _recorder
+
+
+def enable(slowest: int = 10) -> MetricsRecorder:
+    """計測を有効にし、新しい記録先を返す。"""
+    global _recorder
+    _recorder = MetricsRecorder(slowest=slowest)
+    return _recorder
+
+
+def disable() -> None:
+    """計測を無効にする。"""
+    global _recorder
+    _recorder = _NullRecorder()
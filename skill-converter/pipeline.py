@@ -0,0 +1,347 @@
+"""取得 → 生成 → 書き出しを段ごとに並行して流すパイプライン。
+
+各段は上限付きのキューでつながり、下流が詰まると上流が待つ
+（バックプレッシャー）。同時にメモリに載る README の数はキューの上限と
+各段の並列数で抑えられるので、候補が多くても使用量は一定に保たれる。
+
+- 取得段: fetch_workers 本のスレッドが fetch_batch 件ずつ取得する
+- 生成段: RenderPool が逐次ならスレッド 1 本、jobs > 1 ならプロセスプールで生成する
+- 書き出し段: 呼び出し元のスレッドで 1 件ずつ処理する（索引・マニフェストの更新を含む）
+
+取得・生成は終わった順に下流へ流れるが、書き出し段は並べ替えバッファで
+候補の順序に戻してから書き出す（ログ・ジャーナルの順序は逐次実行と同じになる）。
+バッファが際限なく伸びないよう、取得段は書き出し済みの位置から window 件先までしか
+取得を始めない。段ごとの処理時間とエントリごとの時間は metrics の記録先に送る。
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+
+from metrics import recorder
+from render_pool import RenderOutcome, RenderPool, chunk_size_for
+
+logger = logging.getLogger(__name__)
+
+# 段の終了を下流に伝える番兵
+_DONE = object()
+
+
+class _Aborted(Exception):
+    """他の段が異常終了したため処理を打ち切る。"""
+
+
+class StageQueue:
+    """段と段をつなぐ上限付きキュー。観測した最大の深さを記録する。"""
+
+    def __init__(self, name: str, maxsize: int, abort: threading.Event, key: str = "") -> None:
+        self.name = name
+        self.key = key
+        self.maxsize = maxsize
+        self.max_depth = 0
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._abort = abort
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, item: object) -> None:
+        """空きができるまで待って入れる。待っている間に打ち切られたら _Aborted。"""
+        while True:
+            try:
+                self._queue.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                if self._abort.is_set():
+                    raise _Aborted from None
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def get(self) -> object:
+        """要素が来るまで待って取り出す。待っている間に打ち切られたら _Aborted。"""
+        while True:
+            try:
+                return self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._abort.is_set():
+                    raise _Aborted from None
+
+    def get_nowait(self) -> object | None:
+        """すぐに取り出せる要素があれば返す。なければ None。"""
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class Pipeline:
+    """取得・生成・書き出しの 3 段パイプライン。
+
+    Args:
+        fetch: URL のリストを受け取り、同じ順序の取得結果（または例外）を返す関数
+        write: (エントリ, 取得結果, 生成結果) を受け取って書き出す関数
+        render_pool: 生成段の実行器（with 文で開いたもの）
+        fetch_workers: 取得段のスレッド数
+        fetch_batch: 取得段が一度に fetch へ渡す件数
+        queue_size: 段間キューの上限。並べ替えバッファの上限（window）は
+            queue_size + fetch_workers * fetch_batch
+        monitor_interval: キューの深さをログに出す間隔（秒）。0 以下なら出さない
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[list[str]], list[tuple[str | None, str | None] | Exception]],
+        write: Callable[[dict, tuple[str | None, str | None] | Exception, RenderOutcome], None],
+        render_pool: RenderPool,
+        fetch_workers: int = 1,
+        fetch_batch: int = 1,
+        queue_size: int = 32,
+        monitor_interval: float = 5.0,
+    ) -> None:
+        self._fetch = fetch
+        self._write = write
+        self._render_pool = render_pool
+        self.fetch_workers = max(1, fetch_workers)
+        self.fetch_batch = max(1, fetch_batch)
+        self.queue_size = max(1, queue_size)
+        self.monitor_interval = monitor_interval
+        # 書き出しを待っている（取得を始めてまだ書き出していない）候補数の上限
+        self.window = self.queue_size + self.fetch_workers * self.fetch_batch
+
+        self._abort = threading.Event()
+        self._errors: list[BaseException] = []
+        self.render_queue = StageQueue("生成待ち", self.queue_size, self._abort, key="render")
+        self.write_queue = StageQueue("書き出し待ち", self.queue_size, self._abort, key="write")
+        self.fetched = 0
+        self.rendered = 0
+        self.written = 0
+        self.max_reorder = 0
+        self._count_lock = threading.Lock()
+        # 書き出し段が次に書き出す候補の位置。取得段はこれを見て window を守る
+        self._next_write = 0
+        self._window_cond = threading.Condition()
+        self._metrics = recorder()
+
+    # ------------------------------------------------------------------
+    # 段ごとの処理
+    # ------------------------------------------------------------------
+
+    def _wait_window(self, end: int) -> None:
+        """位置 end - 1 までの候補が window に収まるまで待つ。待っている間に打ち切られたら _Aborted。"""
+        with self._window_cond:
+            while end > self._next_write + self.window:
+                if self._abort.is_set():
+                    raise _Aborted
+                self._window_cond.wait(timeout=0.5)
+
+    def _fetch_worker(self, units: queue.Queue) -> None:
+        while not self._abort.is_set():
+            try:
+                first, unit = units.get_nowait()
+            except queue.Empty:
+                return
+            self._wait_window(first + len(unit))
+            urls = [entry.get("source_url", "") for entry in unit]
+            start = time.perf_counter()
+            try:
+                results = self._fetch(urls)
+            except Exception as e:
+                results = [e] * len(unit)
+            elapsed = time.perf_counter() - start
+            self._metrics.observe("fetch", elapsed, len(unit))
+            for entry in unit:
+                slug = entry.get("slug", "")
+                self._metrics.entry(slug, "fetch", elapsed / len(unit))
+                logger.debug(
+                    "[%s] 取得 %.3f 秒", slug, elapsed / len(unit),
+                    extra={"slug": slug, "stage": "fetch", "duration": elapsed / len(unit)},
+                )
+            for pos, (entry, result) in enumerate(zip(unit, results), first):
+                self.render_queue.put((pos, entry, result))
+            with self._count_lock:
+                self.fetched += len(unit)
+
+    def _render_serial(self) -> None:
+        while True:
+            item = self.render_queue.get()
+            if item is _DONE:
+                return
+            pos, entry, sources = item
+            self._rendered(pos, entry, sources, self._render_pool.render_local(entry, sources))
+
+    def _render_dispatch(self, in_flight: StageQueue, chunk_size: int) -> None:
+        """生成待ちキューからチャンクを作ってワーカーへ送る。
+
+        チャンクがそろうまでは待たず、その時点で取り出せる分だけを送る。
+        """
+        done = False
+        while not done:
+            item = self.render_queue.get()
+            if item is _DONE:
+                break
+            chunk = [item]
+            while len(chunk) < chunk_size:
+                item = self.render_queue.get_nowait()
+                if item is None:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                chunk.append(item)
+            future = self._render_pool.submit([(entry, sources) for _pos, entry, sources in chunk])
+            in_flight.put((chunk, future))
+
+    def _render_collect(self, in_flight: StageQueue) -> None:
+        """送ったチャンクの結果を送った順に受け取り、書き出し待ちキューへ渡す。"""
+        while True:
+            item = in_flight.get()
+            if item is _DONE:
+                return
+            chunk, future = item
+            for (pos, entry, sources), outcome in zip(chunk, future.result()):
+                self._rendered(pos, entry, sources, outcome)
+
+    def _rendered(self, pos: int, entry: dict, sources: object, outcome: RenderOutcome) -> None:
+        """生成結果を記録して書き出し待ちキューへ渡す。"""
+        self._metrics.observe("render", outcome.seconds)
+        self._metrics.entry(entry.get("slug", ""), "render", outcome.seconds)
+        self.write_queue.put((pos, entry, sources, outcome))
+        self.rendered += 1
+
+    # ------------------------------------------------------------------
+    # 実行
+    # ------------------------------------------------------------------
+
+    def _start(self, name: str, target: Callable[..., None], *args: object,
+               on_exit: Callable[[], None] | None = None) -> threading.Thread:
+        """段のスレッドを起動する。異常終了したら全体を打ち切る。"""
+
+        def body() -> None:
+            try:
+                target(*args)
+            except _Aborted:
+                pass
+            except BaseException as e:
+                logger.error("パイプラインの %s 段が異常終了: %s", name, e, exc_info=True)
+                self._errors.append(e)
+                self._abort.set()
+            finally:
+                if on_exit is not None:
+                    try:
+                        on_exit()
+                    except _Aborted:
+                        pass
+
+        thread = threading.Thread(target=body, name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _monitor(self, total: int, stop: threading.Event) -> None:
+        while not stop.wait(self.monitor_interval):
+            logger.info(
+                "ステージ進捗: 取得 %d / 生成 %d / 書き出し %d (全 %d 件), キュー %s %d/%d, %s %d/%d",
+                self.fetched, self.rendered, self.written, total,
+                self.render_queue.name, self.render_queue.depth(), self.render_queue.maxsize,
+                self.write_queue.name, self.write_queue.depth(), self.write_queue.maxsize,
+            )
+
+    def run(self, candidates: list[dict]) -> None:
+        """候補をすべて流し、書き出しが終わるまで待つ。
+
+        Raises:
+            段のスレッドで発生した最初の例外
+        """
+        units: queue.Queue = queue.Queue()
+        for i in range(0, len(candidates), self.fetch_batch):
+            units.put((i, candidates[i:i + self.fetch_batch]))
+
+        # 取得段: 最後に終わったスレッドが生成段へ終了を伝える
+        remaining = [self.fetch_workers]
+        remaining_lock = threading.Lock()
+
+        def fetch_exit() -> None:
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.render_queue.put(_DONE)
+
+        threads = [
+            self._start(f"取得{i}", self._fetch_worker, units, on_exit=fetch_exit)
+            for i in range(self.fetch_workers)
+        ]
+
+        if self._render_pool.parallel:
+            in_flight = StageQueue("生成中", self._render_pool.jobs * 2, self._abort)
+            chunk_size = chunk_size_for(len(candidates), self._render_pool.jobs)
+            threads.append(self._start(
+                "生成(送信)", self._render_dispatch, in_flight, chunk_size,
+                on_exit=lambda: in_flight.put(_DONE),
+            ))
+            threads.append(self._start(
+                "生成(受信)", self._render_collect, in_flight,
+                on_exit=lambda: self.write_queue.put(_DONE),
+            ))
+        else:
+            threads.append(self._start(
+                "生成", self._render_serial,
+                on_exit=lambda: self.write_queue.put(_DONE),
+            ))
+
+        stop_monitor = threading.Event()
+        if self.monitor_interval > 0:
+            threading.Thread(
+                target=self._monitor, args=(len(candidates), stop_monitor),
+                name="pipeline-monitor", daemon=True,
+            ).start()
+
+        # 書き出し段（このスレッド）。先に届いた候補は順番が来るまで reorder に置く
+        reorder: dict[int, tuple[dict, object, RenderOutcome]] = {}
+        try:
+            while True:
+                item = self.write_queue.get()
+                if item is _DONE:
+                    break
+                pos, entry, sources, outcome = item
+                reorder[pos] = (entry, sources, outcome)
+                if len(reorder) > self.max_reorder:
+                    self.max_reorder = len(reorder)
+                while self._next_write in reorder:
+                    entry, sources, outcome = reorder.pop(self._next_write)
+                    start = time.perf_counter()
+                    self._write(entry, sources, outcome)
+                    elapsed = time.perf_counter() - start
+                    self._metrics.observe("write", elapsed)
+                    self._metrics.entry(entry.get("slug", ""), "write", elapsed)
+                    self.written += 1
+                    with self._window_cond:
+                        self._next_write += 1
+                        self._window_cond.notify_all()
+        except _Aborted:
+            # 他の段の異常終了。例外は下で送出する
+            pass
+        except BaseException:
+            self._abort.set()
+            raise
+        finally:
+            stop_monitor.set()
+            for thread in threads:
+                thread.join()
+
+        logger.info(
+            "ステージ完了: 取得 %d / 生成 %d / 書き出し %d, キュー最大深さ %s %d/%d, %s %d/%d, 並べ替え待ち最大 %d/%d",
+            self.fetched, self.rendered, self.written,
+            self.render_queue.name, self.render_queue.max_depth, self.render_queue.maxsize,
+            self.write_queue.name, self.write_queue.max_depth, self.write_queue.maxsize,
+            self.max_reorder, self.window,
+        )
+        for stage_queue in (self.render_queue, self.write_queue):
+            self._metrics.set("queue_max_depth", stage_queue.max_depth, queue=stage_queue.key)
+            self._metrics.set("queue_size", stage_queue.maxsize, queue=stage_queue.key)
+        if self._errors:
+            raise self._errors[0]
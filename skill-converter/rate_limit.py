@@ -0,0 +1,252 @@
+"""GitHub API 呼び出しのレート制御モジュール。"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット。
+
+    rate 個/秒でトークンが補充され、最大 capacity 個まで貯まる。
+    acquire() はトークンが得られるまでブロックする。
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate は正の値である必要があります: {rate}")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """トークンを消費する。足りなければ補充されるまで待機する。
+
+        Returns:
+            待機した秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            logger.debug("レート制限待機: %.2f 秒", wait)
+            time.sleep(wait)
+            waited += wait
+
+
+class DeferredEntry(Exception):
+    """API の残り呼び出し回数が足りないため、取得を次回の実行に回したことを表す。
+
+    取得結果の代わりに値として返し、書き出し段でエラーとは別に数える。
+    """
+
+    def __init__(self, url: str, reason: str = "レート制限の残りが不足") -> None:
+        super().__init__(f"{reason}: {url}")
+        self.url = url
+
+
+class _Window:
+    """1 リソース分（core / graphql）のレート制限の状態。"""
+
+    def __init__(self, limit: int, remaining: int, reset: float) -> None:
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.initial_remaining = remaining
+        self.initial_reset = reset
+
+
+# reserve は報告された limit のこの割合までに抑える（未認証の 60 回などで全件を延期しないように）
+RESERVE_LIMIT_FRACTION = 0.1
+
+
+class RateBudget:
+    """GitHub の X-RateLimit-* ヘッダから残り呼び出し回数を追跡する。
+
+    リソース（X-RateLimit-Resource: core / graphql など）ごとに limit / remaining /
+    reset を持つ。ヘッダが得られないバックエンド（gh コマンド）では spend() で
+    手元で減らす。取得段は admit() で呼び出し回数を予約してから取得し、
+    終わったら release() で戻す。残りから予約分と reserve を引いた分が足りなければ
+    admit() は False を返す（呼び出し側はそのエントリを次回に回す）。
+    reset の時刻を過ぎた窓は limit まで回復したものとして扱う。
+    reserve が limit の RESERVE_LIMIT_FRACTION を超える場合は、そこまでに抑えて警告する。
+
+    Args:
+        reserve: 他の用途のために残しておく呼び出し回数
+        max_wait_seconds: 残りが足りないとき、この秒数以内に reset するなら待つ
+    """
+
+    def __init__(self, reserve: int = 0, max_wait_seconds: float = 0.0) -> None:
+        self.reserve = max(0, reserve)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self._windows: dict[str, _Window] = {}
+        self._reserved: dict[str, int] = {}
+        # reserve を抑えたと警告済みのリソース
+        self._capped: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _window(self, resource: str) -> _Window | None:
+        window = self._windows.get(resource)
+        if window is not None and time.time() >= window.reset:
+            # 窓が切り替わった
+            window.remaining = window.limit
+            window.reset = time.time() + 3600
+        return window
+
+    def known(self, resource: str) -> bool:
+        """このリソースの残り回数が分かっているか。"""
+        with self._lock:
+            return resource in self._windows
+
+    def set(self, resource: str, limit: int, remaining: int, reset: float) -> None:
+        """リソースの状態を設定する（/rate_limit の応答など）。"""
+        with self._lock:
+            window = self._windows.get(resource)
+            if window is None:
+                self._windows[resource] = _Window(limit, remaining, reset)
+            else:
+                window.limit, window.remaining, window.reset = limit, remaining, reset
+
+    def observe(self, headers: dict[str, str]) -> None:
+        """レスポンスヘッダ（キーは小文字）から残り回数を更新する。"""
+        remaining = headers.get("x-ratelimit-remaining")
+        if remaining is None:
+            return
+        try:
+            remaining_calls = int(remaining)
+            reset = float(headers.get("x-ratelimit-reset", 0))
+            limit = int(headers.get("x-ratelimit-limit", 0))
+        except ValueError:
+            return
+        resource = headers.get("x-ratelimit-resource", "core")
+        with self._lock:
+            window = self._windows.get(resource)
+            if window is None:
+                self._windows[resource] = _Window(limit or remaining_calls, remaining_calls, reset)
+                return
+            if reset > window.reset:
+                # 新しい窓の値
+                window.remaining = remaining_calls
+            elif reset == window.reset:
+                # 並行するリクエストの応答は順不同に届くので、小さい方を信じる
+                window.remaining = min(window.remaining, remaining_calls)
+            else:
+                return
+            window.reset = reset
+            if limit:
+                window.limit = limit
+
+    def spend(self, resource: str, calls: int = 1) -> None:
+        """ヘッダが得られないバックエンドで、呼び出した回数だけ残りを減らす。"""
+        with self._lock:
+            window = self._window(resource)
+            if window is not None:
+                window.remaining = max(0, window.remaining - calls)
+
+    def reserve_for(self, resource: str) -> int:
+        """このリソースで実際に残しておく回数（limit に応じて抑えた reserve）。"""
+        with self._lock:
+            window = self._window(resource)
+            return self.reserve if window is None else self._reserve_for(resource, window)
+
+    def _reserve_for(self, resource: str, window: _Window) -> int:
+        cap = int(window.limit * RESERVE_LIMIT_FRACTION)
+        if window.limit <= 0 or self.reserve <= cap:
+            return self.reserve
+        if resource not in self._capped:
+            self._capped.add(resource)
+            logger.warning(
+                "rate_budget.reserve (%d) が %s の上限 %d 回に対して大きすぎるため %d 回に抑えます",
+                self.reserve, resource, window.limit, cap,
+            )
+        return cap
+
+    def available(self, resource: str) -> int | None:
+        """予約分と reserve を除いた、今使える回数。分からなければ None。"""
+        with self._lock:
+            return self._available(resource)
+
+    def _available(self, resource: str) -> int | None:
+        window = self._window(resource)
+        if window is None:
+            return None
+        return window.remaining - self._reserved.get(resource, 0) - self._reserve_for(resource, window)
+
+    def admit(self, resource: str, calls: int) -> bool:
+        """calls 回分を予約する。足りなければ（reset を待てないなら）False。"""
+        while True:
+            with self._lock:
+                available = self._available(resource)
+                if available is None or available >= calls:
+                    self._reserved[resource] = self._reserved.get(resource, 0) + calls
+                    return True
+                wait = self._windows[resource].reset - time.time()
+            if wait > self.max_wait_seconds:
+                return False
+            logger.info("レート制限の残りが不足、reset まで待機: %.0f 秒", wait)
+            time.sleep(max(wait, 0) + 1)
+
+    def release(self, resource: str, calls: int) -> None:
+        """admit() で予約した分を戻す（実際に使った分はヘッダか spend() で反映済み）。"""
+        with self._lock:
+            self._reserved[resource] = max(0, self._reserved.get(resource, 0) - calls)
+
+    def deplete(self, resource: str) -> None:
+        """レート制限で失敗したので、reset まで残りを 0 とみなす。"""
+        with self._lock:
+            window = self._window(resource)
+            if window is None:
+                self._windows[resource] = _Window(0, 0, time.time() + 3600)
+            else:
+                window.remaining = 0
+
+    def seconds_until_reset(self, resource: str) -> float | None:
+        """次の reset までの秒数。分からなければ None。"""
+        with self._lock:
+            window = self._window(resource)
+            return None if window is None else max(0.0, window.reset - time.time())
+
+    def exhausted(self, resource: str) -> bool:
+        """残りが 0 か（レート制限で失敗した応答の判定に使う）。"""
+        with self._lock:
+            window = self._window(resource)
+            return window is not None and window.remaining <= 0
+
+    def restart_usage(self) -> None:
+        """usage() の起点を今の残り回数にする（実行ごとに使った回数を出すため）。"""
+        with self._lock:
+            for resource in list(self._windows):
+                window = self._window(resource)
+                window.initial_remaining = window.remaining
+                window.initial_reset = window.reset
+
+    def usage(self) -> dict[str, dict[str, float]]:
+        """リソースごとの開始時・現在の残り回数と、その間に使った回数（窓をまたいだ分は含まない）。"""
+        with self._lock:
+            report = {}
+            for resource, window in sorted(self._windows.items()):
+                same_window = window.reset == window.initial_reset
+                report[resource] = {
+                    "limit": window.limit,
+                    "start_remaining": window.initial_remaining,
+                    "remaining": window.remaining,
+                    "used": window.initial_remaining - window.remaining if same_window else None,
+                    "reset": window.reset,
+                }
+            return report
@@ -0,0 +1,210 @@
+"""SKILL.md の生成（レンダリング）段をプロセスプールに分散するモジュール。
+
+README のキャッシュが効いた後の変換はセクション抽出・YAML 処理・Jinja の
+レンダリングが中心で CPU 律速になる。jobs > 1 の場合は候補をチャンクに
+まとめてワーカープロセスへ送る。ワーカー内のログは結果と一緒に親へ戻し、
+親が結果を取り出すときに出力する。
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import generator
+from generator import adapt_existing_skill_md, generate_skill_md, validate_name
+
+logger = logging.getLogger(__name__)
+
+# 1 チャンクに入れる候補数の上限（IPC の回数と負荷の偏りのバランス）
+_MAX_CHUNK_SIZE = 64
+# ワーカー 1 つあたりに割り当てるチャンク数の目安
+_CHUNKS_PER_JOB = 4
+
+
+def render_skill(entry: dict, sources: tuple[str | None, str | None], template_path: str | Path) -> str:
+    """1 候補分の SKILL.md を生成する。
+
+    Args:
+        entry: カタログエントリ
+        sources: (既存の SKILL.md, README) のタプル
+        template_path: Jinja テンプレートのパス
+
+    Returns:
+        SKILL.md の内容
+    """
+    validate_name(entry.get("slug", ""))
+    existing_skill_md, readme = sources
+    if existing_skill_md:
+        return adapt_existing_skill_md(existing_skill_md, entry)
+    return generate_skill_md(entry, readme, template_path)
+
+
+class RenderError(Exception):
+    """生成に失敗した場合の例外。"""
+
+
+class _RenderTraceback(Exception):
+    """生成時のトレースバック（RenderError の原因として表示する）。"""
+
+    def __init__(self, text: str) -> None:
+        super().__init__(text)
+        self.text = text
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class RenderOutcome:
+    """1 候補分の生成結果。result() で内容を取り出す。seconds は生成にかかった時間。"""
+
+    def __init__(
+        self,
+        content: str | None = None,
+        error: str | None = None,
+        traceback_text: str | None = None,
+        records: list[logging.LogRecord] | None = None,
+        seconds: float = 0.0,
+    ) -> None:
+        self.content = content
+        self.error = error
+        self.traceback_text = traceback_text
+        self.records = records or []
+        self.seconds = seconds
+
+    def result(self) -> str:
+        """ワーカーで出たログを出力してから内容を返す。失敗していれば RenderError。"""
+        for record in self.records:
+            logging.getLogger(record.name).handle(record)
+        if self.error is not None:
+            raise RenderError(self.error) from _RenderTraceback(self.traceback_text or "")
+        return self.content or ""
+
+
+class _RecordBuffer(logging.Handler):
+    """ワーカー内のログレコードを親へ送れる形にして溜めるハンドラ。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # 引数や例外情報は pickle できるとは限らないので文字列にしておく
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+_buffer: _RecordBuffer | None = None
+
+
+def _init_worker(bytecode_cache_dir: str | None, log_level: int) -> None:
+    """ワーカープロセスの初期化。ログは親へ返すためにバッファへ溜める。"""
+    global _buffer
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _buffer = _RecordBuffer()
+    root.addHandler(_buffer)
+    root.setLevel(log_level)
+    generator.set_bytecode_cache_dir(bytecode_cache_dir)
+
+
+def _render_outcome(
+    entry: dict,
+    sources: tuple[str | None, str | None],
+    template_path: str,
+) -> RenderOutcome:
+    """1 候補を生成し、例外も含めて RenderOutcome に包む。"""
+    start = time.perf_counter()
+    try:
+        outcome = RenderOutcome(content=render_skill(entry, sources, template_path))
+    except Exception as e:
+        outcome = RenderOutcome(
+            error=f"{type(e).__name__}: {e}",
+            traceback_text=traceback.format_exc().rstrip(),
+        )
+    outcome.seconds = time.perf_counter() - start
+    return outcome
+
+
+def _render_chunk(
+    chunk: list[tuple[dict, tuple[str | None, str | None]] | None],
+    template_path: str,
+) -> list[RenderOutcome]:
+    """ワーカーで 1 チャンク分を生成する。None の位置は空の結果を返す。"""
+    outcomes: list[RenderOutcome] = []
+    for item in chunk:
+        if _buffer is not None:
+            _buffer.records = []
+        outcome = RenderOutcome() if item is None else _render_outcome(item[0], item[1], template_path)
+        outcome.records = _buffer.records if _buffer is not None else []
+        outcomes.append(outcome)
+    return outcomes
+
+
+def chunk_size_for(count: int, jobs: int) -> int:
+    """候補数とワーカー数からチャンクの大きさを決める。"""
+    return max(1, min(_MAX_CHUNK_SIZE, count // (jobs * _CHUNKS_PER_JOB)))
+
+
+class RenderPool:
+    """生成段の実行器。jobs > 1 ならワーカープロセスのプールを持つ。
+
+    with 文で使う。jobs <= 1 のときは render_local で呼び出し元のスレッドで生成する。
+    """
+
+    def __init__(
+        self,
+        template_path: str | Path,
+        jobs: int = 1,
+        bytecode_cache_dir: str | Path | None = None,
+    ) -> None:
+        self.template_path = str(template_path)
+        self.jobs = max(1, jobs)
+        self._bytecode_cache_dir = str(bytecode_cache_dir) if bytecode_cache_dir is not None else None
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def parallel(self) -> bool:
+        return self.jobs > 1
+
+    def __enter__(self) -> RenderPool:
+        if self.parallel:
+            # 取得段のスレッドが動いている最中にワーカーが起動されるので、
+            # ロックを握ったまま fork しないよう spawn で起動する
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self._bytecode_cache_dir, logging.getLogger().getEffectiveLevel()),
+            )
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def render_local(self, entry: dict, sources: tuple[str | None, str | None] | Exception) -> RenderOutcome:
+        """このプロセス内で 1 候補を生成する。sources が例外なら空の結果を返す。"""
+        if isinstance(sources, Exception):
+            return RenderOutcome()
+        return _render_outcome(entry, sources, self.template_path)
+
+    def submit(
+        self,
+        chunk: list[tuple[dict, tuple[str | None, str | None] | Exception]],
+    ) -> Future[list[RenderOutcome]]:
+        """チャンクをワーカーへ送る。取得に失敗した候補は送らず空の結果にする。"""
+        if self._executor is None:
+            raise RuntimeError("RenderPool は with 文の中で、jobs > 1 のときだけ submit できます")
+        payload = [None if isinstance(sources, Exception) else (entry, sources) for entry, sources in chunk]
+        return self._executor.submit(_render_chunk, payload, self.template_path)
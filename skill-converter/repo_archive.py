@@ -0,0 +1,230 @@
+"""リポジトリの tarball から必要なファイルだけを取り出すモジュール。
+
+fetch.mode が tarball のとき、候補ごとに tarball を 1 回だけダウンロードし、
+展開せずにストリームのまま先頭から読んで、最上位ディレクトリ直下の
+SKILL.md や README などの必要なファイルだけをメモリに取り出す。取得する
+ファイルが増えても API の呼び出し回数はリポジトリあたり 1 回のまま。
+
+tarball の取得元は差し替えられる（GitHub / ローカルディレクトリ）。
+ローカルディレクトリには owner__repo.tar.gz を置く（テストやオフラインでの確認用）。
+"""
+
+from __future__ import annotations
+
+import abc
+import io
+import logging
+import subprocess
+import tarfile
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+from github_client import GitHubAPIError, GitHubClient
+from metrics import recorder
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkReader(io.RawIOBase):
+    """チャンクのイテレータを読み出し可能なファイルとして見せる。"""
+
+    def __init__(self, chunks: Iterator[bytes], on_close: Callable[[], None] | None = None) -> None:
+        super().__init__()
+        self._chunks = chunks
+        self._buffer = b""
+        self._on_close = on_close
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: bytearray) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        super().close()
+
+
+class TarballSource(abc.ABC):
+    """tarball の取得元。open() をサブクラスで実装する。"""
+
+    name = "tarball"
+
+    @abc.abstractmethod
+    def open(self, owner: str, repo: str) -> BinaryIO | None:
+        """owner/repo の tar.gz を読み出すストリームを返す。リポジトリがなければ None。"""
+
+    def read_files(
+        self,
+        owner: str,
+        repo: str,
+        names: Iterable[str],
+        stop_at: Iterable[str] = (),
+        max_bytes: int = 1024 * 1024,
+        match: Callable[[str], bool] | None = None,
+    ) -> dict[str, bytes] | None:
+        """tarball から最上位ディレクトリ直下の names のファイルを取り出す。
+
+        Args:
+            owner: リポジトリのオーナー
+            repo: リポジトリ名
+            names: 取り出すファイル名（リポジトリのルートからの相対パス）
+            stop_at: このいずれかが見つかった時点で残りを読まずに打ち切る
+            max_bytes: これより大きいファイルは取り出さない
+            match: names のほかに取り出すファイルを選ぶ関数（相対パスを受け取る）
+
+        Returns:
+            ファイル名 → 内容。リポジトリがなければ None。
+
+        Raises:
+            tarfile.TarError: tarball が壊れている場合
+        """
+        stream = self.open(owner, repo)
+        if stream is None:
+            return None
+        try:
+            return read_root_files(stream, names, stop_at, max_bytes, match)
+        finally:
+            stream.close()
+
+
+class LocalTarballSource(TarballSource):
+    """ローカルディレクトリの owner__repo.tar.gz を取得元とする。
+
+    Args:
+        directory: tarball を置いたディレクトリ
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    def open(self, owner: str, repo: str) -> BinaryIO | None:
+        path = self.directory / f"{owner}__{repo}.tar.gz"
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+
+class GitHubTarballSource(TarballSource):
+    """GitHub の tarball API（repos/{owner}/{repo}/tarball）を取得元とする。
+
+    http バックエンドでは codeload へのリダイレクトを追ってボディを逐次読み、
+    gh バックエンドでは gh api の標準出力を逐次読む。
+
+    Args:
+        client: http バックエンドのクライアント。None なら gh コマンドを使う
+    """
+
+    name = "github"
+
+    def __init__(self, client: GitHubClient | None) -> None:
+        self.client = client
+
+    def open(self, owner: str, repo: str) -> BinaryIO | None:
+        if self.client is not None:
+            return self._open_http(owner, repo)
+        return self._open_gh(owner, repo)
+
+    def _open_http(self, owner: str, repo: str) -> BinaryIO | None:
+        stream = self.client.open_stream(f"repos/{owner}/{repo}/tarball")
+        if stream.status == 404:
+            stream.close()
+            return None
+        if stream.status >= 400:
+            stream.close()
+            raise GitHubAPIError(stream.status, stream.url)
+        return io.BufferedReader(_ChunkReader(stream.iter_chunks(_CHUNK_SIZE), stream.close), _CHUNK_SIZE)
+
+    def _open_gh(self, owner: str, repo: str) -> BinaryIO | None:
+        cmd = ["gh", "api", f"repos/{owner}/{repo}/tarball"]
+        logger.debug("実行: %s", " ".join(cmd))
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        first = proc.stdout.read(_CHUNK_SIZE)
+        if not first:
+            # 何も出力されなければ失敗（404 を含む）
+            stderr = proc.stderr.read().decode("utf-8", "replace")
+            returncode = proc.wait()
+            recorder().count("api_requests", backend="gh", status=str(returncode))
+            if "404" in stderr:
+                return None
+            raise subprocess.CalledProcessError(returncode, cmd, b"", stderr)
+        recorder().count("api_requests", backend="gh", status="0")
+
+        def chunks() -> Iterator[bytes]:
+            yield first
+            while chunk := proc.stdout.read(_CHUNK_SIZE):
+                recorder().count("api_bytes", len(chunk), backend="gh")
+                yield chunk
+
+        def close() -> None:
+            # 途中で打ち切った場合はプロセスを止める
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+
+        recorder().count("api_bytes", len(first), backend="gh")
+        return io.BufferedReader(_ChunkReader(chunks(), close), _CHUNK_SIZE)
+
+
+def read_root_files(
+    stream: BinaryIO,
+    names: Iterable[str],
+    stop_at: Iterable[str] = (),
+    max_bytes: int = 1024 * 1024,
+    match: Callable[[str], bool] | None = None,
+) -> dict[str, bytes]:
+    """tar.gz のストリームを先頭から読み、リポジトリのルート直下の names のファイルを返す。
+
+    GitHub の tarball はすべてのファイルが owner-repo-sha/ の下にあるので、
+    先頭のエントリがディレクトリならその名前を取り除いてから比べる。
+    ディスクには展開しない。
+
+    Args:
+        stream: tar.gz のバイトストリーム
+        names: 取り出すファイル名
+        stop_at: このいずれかが見つかった時点で読むのをやめる
+        max_bytes: これより大きいファイルは取り出さない
+        match: names のほかに取り出すファイルを選ぶ関数（リポジトリのルートからの相対パスを
+            受け取る）。指定すると stop_at が見つかるまで最後まで読む
+
+    Returns:
+        ファイル名（相対パス） → 内容（見つからなかったものは含まない）
+    """
+    wanted = set(names)
+    stop = set(stop_at)
+    found: dict[str, bytes] = {}
+    prefix: str | None = None
+    with tarfile.open(fileobj=stream, mode="r|gz") as tar:
+        for member in tar:
+            if prefix is None:
+                prefix = member.name.rstrip("/") + "/" if member.isdir() and "/" not in member.name.rstrip("/") else ""
+            if not member.isfile() or not member.name.startswith(prefix):
+                continue
+            path = member.name[len(prefix):]
+            if (path not in wanted and (match is None or not match(path))) or path in found:
+                continue
+            if member.size > max_bytes:
+                logger.debug("tarball 内のファイルが大きすぎるため無視: %s (%d バイト)", member.name, member.size)
+                continue
+            data = tar.extractfile(member)
+            found[path] = data.read() if data is not None else b""
+            if path in stop or (match is None and len(found) == len(wanted)):
+                break
+    return found
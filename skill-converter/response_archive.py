@@ -0,0 +1,179 @@
+"""GitHub から取得した応答を記録・再生するアーカイブ。
+
+record モードではカタログ（skills.json）・SKILL.md・README の取得結果を
+1 つの SQLite ファイルに zlib 圧縮して保存する。replay モードでは同じ
+ファイルだけを読み、ネットワークにもレート制限にも触れずに変換を再現する。
+オフラインでの性能計測や回帰確認に使う。
+
+キーは種類（catalog / skill_md / readme）と owner/repo（カタログは repo/path）の組。
+本文が NULL の行は「存在しなかった（取得できなかった）」ことを表す。
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CATALOG = "catalog"
+ARCHIVE_SKILL_MD = "skill_md"
+ARCHIVE_README = "readme"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    body BLOB,
+    size INTEGER NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ArchiveMiss(LookupError):
+    """replay モードで、要求された応答がアーカイブに記録されていない場合の例外。"""
+
+    def __init__(self, kind: str, key: str) -> None:
+        super().__init__(f"アーカイブに記録がありません: {kind} {key}")
+        self.kind = kind
+        self.key = key
+
+
+class ResponseArchive:
+    """取得結果の記録（record）または再生（replay）を行う SQLite アーカイブ。
+
+    取得段の複数スレッドから共有されるため、接続はロックで保護する。
+
+    Args:
+        path: アーカイブファイルのパス
+        mode: "record" または "replay"
+    """
+
+    def __init__(self, path: str | Path, mode: str) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"未知のアーカイブモード: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+
+        self._lock = threading.Lock()
+        if self.replaying:
+            if not self.path.exists():
+                raise FileNotFoundError(f"応答アーカイブが見つかりません: {self.path}")
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        if not self.replaying:
+            logger.info("応答アーカイブ記録: %d 件 → %s", self.recorded, self.path)
+
+    def reset_stats(self) -> None:
+        """再生した件数・未記録だった件数を 0 に戻す（実行ごとに数え直すため）。"""
+        self.replayed = 0
+        self.missed = 0
+
+    # ------------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------------
+
+    def _store(self, kind: str, key: str, body: bytes | None, size: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (kind, key, body, size, recorded_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (kind, key, body, size, time.time()),
+            )
+            self._conn.commit()
+            self.recorded += 1
+
+    def put(self, kind: str, key: str, text: str | None) -> None:
+        """テキストの取得結果を記録する。None は「存在しなかった」として記録する。"""
+        if text is None:
+            self._store(kind, key, None, 0)
+            return
+        data = text.encode("utf-8")
+        self._store(kind, key, zlib.compress(data), len(data))
+
+    def record_stream(self, kind: str, key: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """チャンクをそのまま返しながら圧縮し、最後まで読み切れたら記録する。"""
+        compressor = zlib.compressobj()
+        parts: list[bytes] = []
+        size = 0
+        for chunk in chunks:
+            parts.append(compressor.compress(chunk))
+            size += len(chunk)
+            yield chunk
+        parts.append(compressor.flush())
+        self._store(kind, key, b"".join(parts), size)
+
+    def put_file(self, kind: str, key: str, path: str | Path) -> None:
+        """ファイルの内容を記録する（キャッシュから読んだカタログ用）。"""
+        with open(path, "rb") as f:
+            for _ in self.record_stream(kind, key, iter(lambda: f.read(_CHUNK_SIZE), b"")):
+                pass
+
+    # ------------------------------------------------------------------
+    # 再生
+    # ------------------------------------------------------------------
+
+    def _load(self, kind: str, key: str) -> tuple[bytes | None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM responses WHERE kind = ? AND key = ?", (kind, key),
+            ).fetchone()
+            if row is None:
+                self.missed += 1
+                raise ArchiveMiss(kind, key)
+            self.replayed += 1
+        return row
+
+    def get(self, kind: str, key: str) -> str | None:
+        """記録されたテキストを返す。「存在しなかった」記録なら None。
+
+        Raises:
+            ArchiveMiss: 記録がない場合
+        """
+        (body,) = self._load(kind, key)
+        if body is None:
+            return None
+        return zlib.decompress(body).decode("utf-8")
+
+    def iter_bytes(self, kind: str, key: str) -> Iterator[bytes]:
+        """記録されたバイト列を展開しながらチャンク単位で返す。
+
+        Raises:
+            ArchiveMiss: 記録がない、または「存在しなかった」記録の場合
+        """
+        (body,) = self._load(kind, key)
+        if body is None:
+            raise ArchiveMiss(kind, key)
+        decompressor = zlib.decompressobj()
+        for i in range(0, len(body), _CHUNK_SIZE):
+            chunk = decompressor.decompress(body[i:i + _CHUNK_SIZE])
+            if chunk:
+                yield chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
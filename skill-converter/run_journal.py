@@ -0,0 +1,264 @@
+"""変換の途中経過を記録し、中断した実行を再開するためのジャーナル。
+
+実行の開始時に変換候補を、取得段が取得した SKILL.md / README を、書き出しが
+終わったエントリの slug を、1 行 1 レコードの JSON として追記していく。
+例外や Ctrl-C、レート制限で実行が途中で終わっても、次の実行で --resume を
+付ければカタログの取得とフィルタをやり直さず、完了済みのエントリを飛ばし、
+取得済みの内容は API を呼ばずに使い回す。
+
+実行が最後まで終わったら、ジャーナルを完了レコード 1 行に縮める（compact）。
+再開時にも、完了済みエントリの取得内容を落として書き直してから追記を続ける。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from metrics import recorder
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+JOURNAL_FILENAME = "run_journal.jsonl"
+
+FetchResult = tuple[str | None, str | None] | Exception
+
+
+def config_fingerprint(config: dict, generator_version: str) -> str:
+    """再開してよい実行かを判定するための、変換結果に関わる設定のハッシュ。"""
+    relevant = {
+        "catalog": config.get("catalog", {}),
+        "filter": config.get("filter", {}),
+        "output_dir": config.get("output", {}).get("dir"),
+        "template": config.get("output", {}).get("template"),
+        "generator_version": generator_version,
+    }
+    canonical = json.dumps(relevant, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class ResumeState:
+    """ジャーナルから復元した、中断した実行の状態。
+
+    Attributes:
+        candidates: 中断した実行の変換候補（全件）
+        removed: カタログから削除された slug（incremental のとき）
+        incremental: 中断した実行が incremental だったか
+        done: 書き出しまで終わった slug
+        fetched: 取得元 URL → (既存 SKILL.md, README)
+    """
+
+    def __init__(self, start: dict) -> None:
+        self.candidates: list[dict] = start.get("candidates", [])
+        self.removed: list[str] = start.get("removed", [])
+        self.incremental: bool = start.get("incremental", False)
+        self.started_at: str = start.get("started_at", "")
+        self.done: set[str] = set()
+        self.fetched: dict[str, tuple[str | None, str | None]] = {}
+
+    @property
+    def pending(self) -> list[dict]:
+        """まだ完了していない候補（元の順序）。"""
+        return [e for e in self.candidates if e.get("slug", "") not in self.done]
+
+
+class RunJournal:
+    """追記専用の実行ジャーナル。取得段の複数スレッドから記録できる。
+
+    Args:
+        path: ジャーナルファイルのパス
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._file = None
+        self._lock = threading.Lock()
+        self._fetched: dict[str, tuple[str | None, str | None]] = {}
+        self.reused = 0
+
+    # ------------------------------------------------------------------
+    # 読み込み・開始
+    # ------------------------------------------------------------------
+
+    def load(self, fingerprint: str) -> ResumeState | None:
+        """中断した実行の状態を読み込む。再開できるものがなければ None。
+
+        最後の行が書きかけ（途中で落ちた）なら、その行は無視する。
+        """
+        if not self.path.exists():
+            logger.info("再開できるジャーナルがありません: %s", self.path)
+            return None
+
+        state: ResumeState | None = None
+        with open(self.path, encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("ジャーナルの %d 行目を読めないため以降を無視", lineno)
+                    break
+                kind = record.get("type")
+                if kind == "start":
+                    if record.get("version") != JOURNAL_VERSION:
+                        logger.info("ジャーナルのバージョンが異なるため再開しません")
+                        return None
+                    if record.get("fingerprint") != fingerprint:
+                        logger.warning("設定が中断した実行と異なるため再開しません")
+                        return None
+                    state = ResumeState(record)
+                elif kind == "complete":
+                    logger.info("前回の実行は完了しているため再開しません (%s)", record.get("finished_at", ""))
+                    return None
+                elif state is None:
+                    continue
+                elif kind == "fetch":
+                    state.fetched[record["url"]] = (record.get("skill_md"), record.get("readme"))
+                elif kind == "done":
+                    state.done.add(record["slug"])
+
+        if state is None:
+            logger.info("ジャーナルに開始レコードがないため再開しません")
+            return None
+        return state
+
+    def begin(
+        self,
+        fingerprint: str,
+        candidates: list[dict],
+        removed: list[str] | None = None,
+        incremental: bool = False,
+    ) -> None:
+        """新しい実行としてジャーナルを作り直す（前回の内容は捨てる）。"""
+        start = {
+            "type": "start",
+            "version": JOURNAL_VERSION,
+            "fingerprint": fingerprint,
+            "started_at": _now(),
+            "incremental": incremental,
+            "removed": removed or [],
+            "candidates": candidates,
+        }
+        self._rewrite([start])
+        self._open()
+
+    def resume(self, fingerprint: str, state: ResumeState) -> None:
+        """中断した実行の続きとしてジャーナルを開く。
+
+        完了済みエントリの取得内容を落として書き直し（compact）、以降は追記する。
+        """
+        pending_urls = {e.get("source_url", "") for e in state.pending}
+        self._fetched = {url: sources for url, sources in state.fetched.items() if url in pending_urls}
+        start = {
+            "type": "start",
+            "version": JOURNAL_VERSION,
+            "fingerprint": fingerprint,
+            "started_at": state.started_at,
+            "incremental": state.incremental,
+            "removed": state.removed,
+            "candidates": state.candidates,
+        }
+        records = [start]
+        records.extend({"type": "done", "slug": slug} for slug in sorted(state.done))
+        records.extend(
+            {"type": "fetch", "url": url, "skill_md": skill_md, "readme": readme}
+            for url, (skill_md, readme) in self._fetched.items()
+        )
+        self._rewrite(records)
+        self._open()
+        logger.info(
+            "中断した実行を再開: 完了済み %d 件をスキップ、取得済み %d 件を再利用、残り %d 件",
+            len(state.done), len(self._fetched), len(state.pending),
+        )
+
+    # ------------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------------
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            # プロセスが落ちても OS には渡っているように、レコードごとに flush する
+            self._file.flush()
+
+    def record_fetch(self, url: str, sources: tuple[str | None, str | None]) -> None:
+        """取得結果を記録する。"""
+        skill_md, readme = sources
+        self._append({"type": "fetch", "url": url, "skill_md": skill_md, "readme": readme})
+
+    def record_done(self, slug: str) -> None:
+        """エントリの書き出しが終わったことを記録する。"""
+        self._append({"type": "done", "slug": slug})
+
+    def wrap_fetch(
+        self, fetch: Callable[[list[str]], list[FetchResult]],
+    ) -> Callable[[list[str]], list[FetchResult]]:
+        """取得関数を、ジャーナルにある内容は使い回し、新しく取得したものは記録するものに包む。
+
+        取得に失敗したもの（例外）は記録しない（再開時に取得し直す）。
+        """
+        metrics_recorder = recorder()
+
+        def journaled_fetch(urls: list[str]) -> list[FetchResult]:
+            results: list[FetchResult | None] = []
+            with self._lock:
+                for url in urls:
+                    results.append(self._fetched.pop(url, None))
+            missing = [i for i, result in enumerate(results) if result is None]
+            reused = len(urls) - len(missing)
+            if reused:
+                self.reused += reused
+                metrics_recorder.count("cache_requests", reused, cache="journal", result="hit")
+            if missing:
+                metrics_recorder.count("cache_requests", len(missing), cache="journal", result="miss")
+                fetched = fetch([urls[i] for i in missing])
+                for i, result in zip(missing, fetched):
+                    results[i] = result
+                    if not isinstance(result, Exception):
+                        self.record_fetch(urls[i], result)
+            return results
+
+        return journaled_fetch
+
+    # ------------------------------------------------------------------
+    # 終了
+    # ------------------------------------------------------------------
+
+    def close(self) -> None:
+        """追記を終える。ジャーナルは残る（次の --resume で再開できる）。"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def complete(self, summary: dict | None = None) -> None:
+        """実行が最後まで終わったので、ジャーナルを完了レコード 1 行に縮める。"""
+        self.close()
+        self._fetched.clear()
+        self._rewrite([{"type": "complete", "version": JOURNAL_VERSION, "finished_at": _now(), **(summary or {})}])
+        logger.debug("ジャーナルを完了状態に縮小: %s", self.path)
+
+    def _rewrite(self, records: list[dict]) -> None:
+        """レコードを一時ファイルに書いてから置き換える。"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
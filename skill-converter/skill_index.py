@@ -0,0 +1,166 @@
+"""変換で生成したスキルの索引を管理するモジュール。
+
+生成した slug ごとに取得元 URL・カタログエントリのハッシュ・出力内容の
+ハッシュ・ジェネレータのバージョンを記録する。exclude_existing は出力先の
+ディレクトリを走査する代わりにこの索引を引き、再生成が必要な古い出力も
+索引から求められる。
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+from catalog_diff import entry_hash
+from generator import GENERATOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+INDEX_FILENAME = "skill_index.json"
+
+
+def content_hash(content: str) -> str:
+    """出力内容のハッシュを返す。"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class SkillIndex:
+    """slug → 生成情報 の索引。
+
+    record() はメモリ上の索引だけを更新し、flush() でまとめて一時ファイル経由で
+    原子的に保存する（書き出しのたびに索引全体を書き直さない）。
+    """
+
+    def __init__(self, path: str | Path, output_dir: str | Path) -> None:
+        self.path = Path(path)
+        self.output_dir = Path(output_dir)
+        self.entries: dict[str, dict] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("スキル索引を読み込めないため空で開始: %s", e)
+            return
+        if data.get("version") != INDEX_VERSION:
+            logger.info("スキル索引のバージョンが異なるため空で開始")
+            return
+        if data.get("output_dir") != str(self.output_dir):
+            logger.info("出力先が変わったためスキル索引を空で開始: %s", data.get("output_dir"))
+            return
+        self.entries = data.get("skills", {})
+        logger.info("スキル索引: %d 件", len(self.entries))
+
+    def save(self) -> None:
+        """索引を一時ファイルに書いてから置き換える。"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"version": INDEX_VERSION, "output_dir": str(self.output_dir), "skills": self.entries},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def flush(self) -> None:
+        """record() で変わった分があれば保存する。"""
+        if self._dirty:
+            self.save()
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self.entries
+
+    def output_hash(self, slug: str) -> str | None:
+        """前回書き出した内容のハッシュ。索引になければ None。"""
+        return self.entries.get(slug, {}).get("output_hash")
+
+    def record(self, slug: str, entry: dict, content: str, generator_version: str) -> None:
+        """生成結果を記録する（保存は flush()）。記録済みの内容と同じなら何もしない。"""
+        info = {
+            "source_url": entry.get("source_url", ""),
+            "catalog_hash": entry_hash(entry),
+            "output_hash": content_hash(content),
+            "generator_version": generator_version,
+        }
+        previous = self.entries.get(slug)
+        if previous is not None and all(previous.get(k) == v for k, v in info.items()):
+            return
+        info["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.entries[slug] = info
+        self._dirty = True
+
+    def find_stale(self, generator_version: str, include_modified: bool = True) -> list[str]:
+        """再生成が必要な slug を返す。
+
+        ジェネレータのバージョンが古いもの、出力ファイルが消えたものを対象にする。
+        include_modified なら、手で書き換えられたものも含める。そうでなければ、
+        バージョンが古くても手で書き換えられたものは上書きしないよう除き、ログに残す。
+        """
+        stale: list[str] = []
+        for slug, info in self.entries.items():
+            outdated = info.get("generator_version") != generator_version
+            skill_file = self.output_dir / slug / "SKILL.md"
+            if not include_modified and not outdated:
+                # 中身は読まず、消えたものだけを見る
+                if not skill_file.is_file():
+                    stale.append(slug)
+                continue
+            try:
+                current = content_hash(skill_file.read_text(encoding="utf-8"))
+            except OSError:
+                stale.append(slug)
+                continue
+            if current == info.get("output_hash"):
+                if outdated:
+                    stale.append(slug)
+            elif include_modified:
+                stale.append(slug)
+            else:
+                logger.info("手で書き換えられているため再生成しない: %s", slug)
+        return stale
+
+
+def main() -> None:
+    """索引の内容と再生成が必要な slug を表示する。"""
+    parser = argparse.ArgumentParser(description="生成済みスキルの索引を確認する")
+    parser.add_argument(
+        "--config",
+        default=str(Path(__file__).parent / "config.yaml"),
+        help="config.yaml のパス",
+    )
+    parser.add_argument("--stale", action="store_true", help="再生成が必要な slug だけを表示")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with open(args.config, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    index = SkillIndex(
+        Path(config["catalog"]["cache_dir"]) / INDEX_FILENAME,
+        config["output"]["dir"],
+    )
+    slugs = index.find_stale(GENERATOR_VERSION) if args.stale else sorted(index.entries)
+    for slug in slugs:
+        info = index.entries[slug]
+        print(f"{slug}\t{info.get('generator_version')}\t{info.get('source_url')}")
+
+
+if __name__ == "__main__":
+    main()
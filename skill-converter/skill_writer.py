@@ -0,0 +1,121 @@
+"""生成した SKILL.md を出力先に書き出すモジュール。
+
+内容が既存のファイルと同じなら書き込まない（mtime を変えず、git の差分も
+出さない）。書き込みは同じディレクトリの一時ファイルに書いてから rename で
+置き換えるので、途中で落ちても書きかけのファイルは残らない。fsync は
+ファイルごとではなく、実行の最後に sync() でまとめて行う。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+
+from skill_index import content_hash
+
+logger = logging.getLogger(__name__)
+
+SKILL_FILENAME = "SKILL.md"
+
+# fsync の方式（batch: sync() でまとめて / each: rename の前に毎回 / off: しない）
+FSYNC_MODES = ("batch", "each", "off")
+
+
+def _fsync_path(path: Path, directory: bool = False) -> None:
+    flags = os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directory else 0)
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SkillWriter:
+    """SKILL.md を内容が変わったときだけ原子的に書き出す。
+
+    Args:
+        output_dir: 出力先ディレクトリ（スキルごとのサブディレクトリを作る）
+        fsync: fsync の方式（FSYNC_MODES のいずれか）
+    """
+
+    def __init__(self, output_dir: str | Path, fsync: str = "batch") -> None:
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"未知の fsync 方式: {fsync}")
+        self.output_dir = Path(output_dir)
+        self.fsync = fsync
+        self.written = 0
+        self.unchanged = 0
+        self._pending_files: list[Path] = []
+        self._pending_dirs: set[Path] = set()
+
+    def write(self, name: str, content: str, previous_hash: str | None = None) -> tuple[Path, bool]:
+        """SKILL.md を書き出す。内容が既存のファイルと同じなら何もしない。
+
+        Args:
+            name: スキル名（サブディレクトリ名）
+            content: SKILL.md の内容
+            previous_hash: 前回書き出した内容のハッシュ（索引の値）。新しい内容の
+                ハッシュと異なれば既存ファイルを読まずに書き込む
+
+        Returns:
+            (ファイルのパス, 書き込んだかどうか)
+        """
+        skill_dir = self.output_dir / name
+        skill_file = skill_dir / SKILL_FILENAME
+        data = content.encode("utf-8")
+
+        if previous_hash is None or previous_hash == content_hash(content):
+            # 索引上は同じ内容（または索引にない）ので、実物と比べる（手で書き換えられている場合がある）
+            try:
+                if skill_file.read_bytes() == data:
+                    self.unchanged += 1
+                    return skill_file, False
+            except OSError:
+                pass
+
+        created = not skill_dir.is_dir()
+        if created:
+            skill_dir.mkdir(parents=True, exist_ok=True)
+        tmp = skill_dir / f".{SKILL_FILENAME}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+                if self.fsync == "each":
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp, skill_file)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        if self.fsync == "each":
+            _fsync_path(skill_dir, directory=True)
+            if created:
+                _fsync_path(self.output_dir, directory=True)
+        elif self.fsync == "batch":
+            self._pending_files.append(skill_file)
+            self._pending_dirs.add(skill_dir)
+            if created:
+                self._pending_dirs.add(self.output_dir)
+        self.written += 1
+        return skill_file, True
+
+    def sync(self) -> None:
+        """書き出したファイルと、それを含むディレクトリをまとめて fsync する。"""
+        if not self._pending_files and not self._pending_dirs:
+            return
+        for path in self._pending_files:
+            try:
+                _fsync_path(path)
+            except OSError as e:
+                logger.warning("fsync に失敗: %s: %s", path, e)
+        for path in self._pending_dirs:
+            try:
+                _fsync_path(path, directory=True)
+            except OSError as e:
+                # ディレクトリの fsync に対応しないプラットフォームもある
+                logger.debug("ディレクトリの fsync に失敗: %s: %s", path, e)
+        logger.info("fsync: %d ファイル / %d ディレクトリ", len(self._pending_files), len(self._pending_dirs))
+        self._pending_files.clear()
+        self._pending_dirs.clear()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed catalog store.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main
+
+from catalog_store import CatalogStore
+from filter import filter_candidates
+
+
+FILTER = {
+    "categories": ["tools", "agent"],
+    "min_quality_score": 3.0,
+    "source_types": ["github"],
+    "security_risk_exclude": ["dangerous", "suspicious"],
+    "max_skills_per_run": 10,
+}
+
+
+def entry(slug, **fields):
+    data = {
+        "slug": slug,
+        "category": "tools",
+        "quality_score": 4.0,
+        "source_type": "github",
+        "security_risk": "safe",
+        "source_url": f"https://github.com/own/{slug}",
+    }
+    data.update(fields)
+    return data
+
+
+class TestQueryCandidates(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_catalog_store_"))
+        self.store = CatalogStore(self.temp_dir / "catalog.sqlite3")
+
+    def tearDown(self):
+        import shutil
+
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def query(self, skills):
+        catalog = self.temp_dir / "skills.json"
+        catalog.write_text(json.dumps(skills))
+        self.store.sync(catalog)
+        return self.store.query_candidates(FILTER)
+
+    def test_null_security_risk_is_kept(self):
+        skills = [
+            entry("explicit-null", security_risk=None),
+            entry("missing"),
+            entry("dangerous", security_risk="dangerous"),
+            entry("safe"),
+        ]
+        del skills[1]["security_risk"]
+        result = self.query(skills)
+        self.assertEqual([s["slug"] for s in result], ["explicit-null", "missing", "safe"])
+        self.assertEqual(result, filter_candidates(skills, FILTER))
+
+    def test_matches_filter_candidates(self):
+        skills = [
+            entry("low", quality_score=2.0),
+            entry("other-category", category="web"),
+            entry("gitlab", source_type="gitlab"),
+            entry("first", quality_score=3.5, source_url="https://github.com/own/shared"),
+            entry("duplicate", quality_score=5.0, source_url="https://github.com/own/shared"),
+            entry("agent", category="agent", quality_score=4.5),
+            entry("tie-a"),
+            entry("tie-b"),
+        ]
+        self.assertEqual(self.query(skills), filter_candidates(skills, FILTER))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for fetching SKILL.md and README files, against a local GitHub stand-in.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main, mock
+
+import fetch_catalog
+from test_support import StubGitHub, write_tarball
+
+REPOS = {
+    "own/plain": {"README.md": "# Plain\n"},
+    "own/skill": {"SKILL.md": "---\nname: skill\n---\n", "README.md": "# Skill\n"},
+    "own/upper": {"README.MD": "# Upper-case extension\n"},
+    "own/docs": {"docs/README.md": "# Docs readme\n", "src/main.py": "print()\n"},
+    "own/dotgithub": {".github/README.md": "# Profile readme\n", "README.md": "# Root readme\n"},
+    "own/none": {"main.py": "print()\n"},
+}
+URLS = [f"https://github.com/{name}" for name in [*REPOS, "own/gone"]]
+
+
+class TestGraphQLSources(TestCase):
+    EXPECTED = {
+        "https://github.com/own/plain": (None, "# Plain\n"),
+        "https://github.com/own/skill": ("---\nname: skill\n---\n", None),
+        "https://github.com/own/upper": (None, "# Upper-case extension\n"),
+        "https://github.com/own/docs": (None, "# Docs readme\n"),
+        "https://github.com/own/dotgithub": (None, "# Profile readme\n"),
+        "https://github.com/own/none": (None, None),
+        "https://github.com/own/gone": (None, None),
+    }
+
+    def setUp(self):
+        self.stub = StubGitHub(REPOS)
+        patcher = mock.patch.dict(os.environ, {"GH_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        fetch_catalog.close()
+        self.stub.close()
+
+    def fetch(self, mode):
+        fetch_catalog.configure({
+            "backend": "http",
+            "api_url": self.stub.url,
+            "mode": mode,
+            "graphql_batch_size": 3,
+            "requests_per_second": 1000,
+            "burst": 1000,
+        })
+        self.stub.requests.clear()
+        return fetch_catalog.fetch_sources_many(URLS)
+
+    def test_matches_rest(self):
+        rest = self.fetch("rest")
+        graphql = self.fetch("graphql")
+        self.assertEqual(graphql, rest)
+        self.assertEqual(dict(zip(URLS, graphql)), self.EXPECTED)
+
+    def test_batches_and_aliases(self):
+        self.fetch("graphql")
+        self.assertEqual(self.stub.paths("POST"), ["/graphql"] * 3)
+        self.assertEqual(
+            [query.count(": repository(") for query in self.stub.queries],
+            [3, 3, 1],
+        )
+        for query in self.stub.queries:
+            self.assertIn("r0: repository(", query)
+        self.assertIn('r2: repository(owner: "own", name: "upper")', self.stub.queries[0])
+
+    def test_readme_fallback_only_when_needed(self):
+        self.fetch("graphql")
+        # README names the batch cannot resolve go to REST; repos with no README cost nothing
+        self.assertEqual(sorted(self.stub.paths("GET")), [
+            "/repos/own/docs/readme",
+            "/repos/own/dotgithub/readme",
+            "/repos/own/upper/readme",
+        ])
+
+
+class TestTarballSources(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_fetch_catalog_"))
+        for name, files in REPOS.items():
+            owner, repo = name.split("/")
+            write_tarball(self.temp_dir / f"{owner}__{repo}.tar.gz", f"{owner}-{repo}-abc1234", files)
+
+    def tearDown(self):
+        fetch_catalog.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_finds_the_readme_rest_would_return(self):
+        fetch_catalog.configure({
+            "backend": "gh",
+            "mode": "tarball",
+            "tarball": {"source": "local", "dir": str(self.temp_dir)},
+            "requests_per_second": 1000,
+            "burst": 1000,
+        })
+        expected = TestGraphQLSources.EXPECTED
+        self.assertEqual(dict(zip(URLS, fetch_catalog.fetch_sources_many(URLS))), expected)
+
+
+class TestRateBudgetPlan(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"GH_TOKEN": "test-token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        fetch_catalog.close()
+        self.stub.close()
+
+    def plan(self, rate_limit, count):
+        self.stub = StubGitHub(REPOS, rate_limit=rate_limit)
+        fetch_catalog.configure({
+            "backend": "http",
+            "api_url": self.stub.url,
+            "mode": "rest",
+            "rate_budget": {"enabled": True, "reserve": 100},
+        })
+        candidates = [{"slug": f"s{i}", "quality_score": i} for i in range(count)]
+        return fetch_catalog.plan_fetches(candidates)
+
+    def test_unauthenticated_limit_still_fetches(self):
+        with self.assertLogs("rate_limit", level="WARNING"):
+            scheduled, deferred = self.plan(60, 10)
+        self.assertEqual((len(scheduled), deferred), (10, []))
+
+    def test_defers_what_the_limit_cannot_cover(self):
+        # (60 - 6) // 2 calls per repository
+        with self.assertLogs("rate_limit", level="WARNING"):
+            scheduled, deferred = self.plan(60, 40)
+        self.assertEqual((len(scheduled), len(deferred)), (27, 13))
+        self.assertEqual(scheduled[0]["slug"], "s39")
+
+
+if __name__ == "__main__":
+    main()
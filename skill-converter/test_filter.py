@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for selecting conversion candidates from the catalog.
+"""
+
+import random
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main
+
+from catalog_diff import entry_hash
+from filter import filter_candidates, filter_pipeline, filter_pipeline_incremental
+
+CONFIG = {
+    "categories": ["tools"],
+    "min_quality_score": 3.0,
+    "source_types": ["github"],
+    "security_risk_exclude": ["dangerous"],
+    "max_skills_per_run": 4,
+}
+
+
+def make_entry(i, score, **fields):
+    entry = {
+        "slug": f"skill-{i}",
+        "category": "tools",
+        "quality_score": score,
+        "source_type": "github",
+        "source_url": f"https://github.com/own/repo{i}",
+    }
+    entry.update(fields)
+    return entry
+
+
+def sort_then_slice(skills, config):
+    """filter_candidates before the bounded heap: filter, dedupe, stable sort, slice."""
+    deduped, seen = [], set()
+    for s in skills:
+        if (
+            s.get("category") in config["categories"]
+            and s.get("quality_score", 0.0) >= config["min_quality_score"]
+            and s.get("source_type") in config["source_types"]
+            and s.get("security_risk", "unknown") not in config["security_risk_exclude"]
+            and s.get("source_url", "") not in seen
+        ):
+            seen.add(s.get("source_url", ""))
+            deduped.append(s)
+    deduped.sort(key=lambda s: s.get("quality_score", 0.0), reverse=True)
+    return deduped[:config["max_skills_per_run"]]
+
+
+class TestTopK(TestCase):
+    def random_catalog(self, rng, size):
+        return [
+            make_entry(
+                i,
+                rng.choice([2.0, 3.0, 3.0, 4.5, 5.0, 5.0, 5.0]),  # many ties
+                category=rng.choice(["tools", "tools", "other"]),
+                source_url=f"https://github.com/own/repo{rng.randrange(size)}",
+                **({"security_risk": "dangerous"} if rng.random() < 0.1 else {}),
+            )
+            for i in range(size)
+        ]
+
+    def test_matches_sort_then_slice(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            catalog = self.random_catalog(rng, rng.randint(0, 40))
+            config = dict(CONFIG, max_skills_per_run=rng.choice([0, 1, 2, 5, 10, 50]))
+            expected = [s["slug"] for s in sort_then_slice(catalog, config)]
+            # filter_candidates also takes an iterator
+            self.assertEqual([s["slug"] for s in filter_candidates(iter(catalog), config)], expected)
+
+    def test_ties_keep_catalog_order(self):
+        catalog = [make_entry(i, 5.0) for i in range(6)]
+        config = dict(CONFIG, max_skills_per_run=3)
+        self.assertEqual([s["slug"] for s in filter_candidates(catalog, config)], ["skill-0", "skill-1", "skill-2"])
+
+    def test_zero_cap(self):
+        config = dict(CONFIG, max_skills_per_run=0)
+        self.assertEqual(filter_candidates([make_entry(0, 9.0)], config), [])
+
+
+class TestIncrementalSelection(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_filter_"))
+        self.output_dir = self.temp_dir / "out"
+        self.output_dir.mkdir()
+        self.catalog = [
+            make_entry(0, 9.0),
+            make_entry(1, 8.0),
+            make_entry(2, 7.0),
+            make_entry(3, 7.0),
+            make_entry(4, 6.0),
+            make_entry(5, 5.0),
+            make_entry(6, 5.0, category="other"),
+            make_entry(7, 4.0),
+            make_entry(8, 4.0, source_url="https://github.com/own/repo0"),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def convert_before(self, *indices):
+        """Pretend an earlier run converted these entries and return its manifest."""
+        for i in indices:
+            (self.output_dir / f"skill-{i}").mkdir()
+        return {f"skill-{i}": entry_hash(self.catalog[i]) for i in indices}
+
+    def select(self, manifest, changed=()):
+        full = filter_pipeline(self.catalog, CONFIG, self.output_dir, keep={f"skill-{i}" for i in changed})
+        diff, incremental = filter_pipeline_incremental(self.catalog, manifest, CONFIG, self.output_dir)
+        return [s["slug"] for s in full], [s["slug"] for s in incremental], diff
+
+    def test_unchanged_top_entries_use_the_cap(self):
+        full, incremental, diff = self.select(self.convert_before(0, 1))
+        self.assertEqual(incremental, full)
+        self.assertEqual(incremental, ["skill-2", "skill-3"])
+        self.assertEqual(len(diff.pending), 7)
+
+    def test_changed_entry_is_regenerated(self):
+        manifest = self.convert_before(0, 1, 2)
+        self.catalog[1] = dict(self.catalog[1], description="updated")
+        full, incremental, diff = self.select(manifest, changed=[1])
+        self.assertEqual(incremental, full)
+        self.assertEqual(incremental, ["skill-1", "skill-3"])
+        self.assertEqual(diff.existing, [])
+
+    def test_existing_output_outside_manifest(self):
+        manifest = self.convert_before(0)
+        (self.output_dir / "skill-3").mkdir()
+        full, incremental, diff = self.select(manifest)
+        self.assertEqual(incremental, full)
+        self.assertEqual(incremental, ["skill-1", "skill-2"])
+        self.assertEqual(diff.existing, ["skill-3"])
+
+    def test_nothing_changed(self):
+        manifest = self.convert_before(*range(len(self.catalog)))
+        full, incremental, diff = self.select(manifest)
+        self.assertEqual((full, incremental), ([], []))
+        self.assertEqual(diff.pending, [])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Tests for SKILL.md generation.
+"""
+
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main, mock, skipUnless
+
+import jinja2
+import yaml
+
+import generator
+
+from generator import _INSTALL_PATTERNS, _KNOWN_BINS, adapt_existing_skill_md, extract_bins, extract_sections
+
+CONVERTER_DIR = Path(__file__).resolve().parent
+SHARED_FRONTMATTER = CONVERTER_DIR.parent / "skills" / "skill-creator" / "scripts" / "skill_frontmatter.py"
+
+ENTRY = {"slug": "demo", "description": "Demo skill", "source_url": "https://github.com/own/demo"}
+
+
+class TestFrontmatter(TestCase):
+    def test_imports_outside_the_checkout(self):
+        # deployed as ~/KEWORK/OpenClaw/skill-converter, next to (not inside) the OpenClaw repo
+        temp_dir = Path(tempfile.mkdtemp(prefix="test_generator_"))
+        try:
+            deployed = temp_dir / "skill-converter"
+            shutil.copytree(CONVERTER_DIR, deployed, ignore=shutil.ignore_patterns("__pycache__", "test_*"))
+            result = subprocess.run(
+                [sys.executable, "-c", "import generator"],
+                cwd=deployed, capture_output=True, text=True,
+            )
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    @skipUnless(SHARED_FRONTMATTER.exists(), "skill-creator scripts are not in this checkout")
+    def test_copy_matches_skill_creator(self):
+        self.assertEqual(
+            (CONVERTER_DIR / "skill_frontmatter.py").read_text(encoding="utf-8"),
+            SHARED_FRONTMATTER.read_text(encoding="utf-8"),
+        )
+
+    def test_adapt_keeps_other_keys(self):
+        skill_md = "---\nname: old\n# keep\nlicense: MIT\n---\n# Body\n"
+        adapted = adapt_existing_skill_md(skill_md, ENTRY)
+        frontmatter = yaml.safe_load(adapted.split("---\n")[1])
+        self.assertEqual(frontmatter["name"], "demo")
+        self.assertEqual(frontmatter["license"], "MIT")
+        self.assertTrue(frontmatter["metadata"]["openclaw"]["auto_generated"])
+        self.assertIn("# keep", adapted)
+        self.assertTrue(adapted.endswith("# Body\n"))
+
+    def test_adapt_adds_missing_frontmatter(self):
+        adapted = adapt_existing_skill_md("# Body\n", ENTRY)
+        self.assertTrue(adapted.startswith("---\n"))
+        self.assertTrue(adapted.endswith("\n# Body\n"))
+
+
+def baseline_extract_sections(readme):
+    """extract_sections before the early-exit scanner, kept as the reference."""
+    heading_re = re.compile(r"^(#{1,6})\s+(.+?)[\s#]*$", re.MULTILINE)
+    sections = []
+    last_end, last_heading = 0, ""
+    for m in heading_re.finditer(readme):
+        sections.append((last_heading, readme[last_end:m.start()].strip()))
+        last_heading, last_end = m.group(2).strip(), m.end()
+    sections.append((last_heading, readme[last_end:].strip()))
+
+    result = {}
+    for heading, body in sections:
+        if not body:
+            continue
+        heading = heading.lower().strip()
+        if heading in ("", "description", "about", "overview") and "overview" not in result:
+            result["overview"] = body[:500]
+        if heading in ("installation", "install", "setup", "getting started") and "install" not in result:
+            result["install"] = body[:500]
+        if heading in ("usage", "quick start", "how to use", "examples") and "usage" not in result:
+            result["usage"] = body[:500]
+    if "overview" not in result:
+        result["overview"] = re.split(r"\n\s*\n", readme.strip(), maxsplit=1)[0].strip()[:500]
+    return result
+
+
+# Lines the two extractors must treat alike. Fenced code blocks and lines made only of
+# "#" and whitespace are left out: those changed on purpose (see _HEADING_PATTERN).
+LINES = [
+    "", "   ", "Some text.", "More text, with # inside", "x" * 600, "    indented code",
+    "# Title", "## Usage", "## Usage ##", "### Install #  ", "## Quick Start", "# ABOUT",
+    "## Getting Started ###", "##\tSetup", "## Examples", "## Other", "####### Usage",
+    "#Usage", "## Usage notes", "## Overview ## #",
+]
+
+
+class TestExtractSections(TestCase):
+    def assert_same(self, readme):
+        self.assertEqual(extract_sections(readme), baseline_extract_sections(readme), repr(readme))
+
+    def test_closing_hashes_and_crlf(self):
+        self.assertEqual(extract_sections("x\r\n## Usage ##\r\nfoo"), {"overview": "x", "usage": "foo"})
+        for readme in [
+            "x\r\n## Usage ##\r\nfoo",
+            "x\r\n## Usage ##  \r\nfoo\r\n## Install\r\nbar\r\n",
+            "# Title #\r\n\r\nIntro\r\n\r\n## About ##\r\nabout\r\n",
+            "## Setup ##\t\nsetup\n## Usage\t##\nuse\n",
+        ]:
+            self.assert_same(readme)
+
+    def test_crlf_fence_is_closed(self):
+        readme = "x\r\n## Usage\r\n```\r\n# not a heading\r\n```\r\n## Install ##\r\nbar\r\n"
+        self.assertEqual(extract_sections(readme)["install"], "bar")
+
+    def test_matches_baseline_on_generated_readmes(self):
+        rng = random.Random(0)
+        for _ in range(3000):
+            newline = rng.choice(["\n", "\r\n"])
+            lines = rng.choices(LINES, k=rng.randint(0, 12))
+            self.assert_same(newline.join(lines) + rng.choice(["", newline]))
+
+
+def baseline_extract_bins(readme):
+    """extract_bins before the single-pass scanner: one re.finditer per pattern."""
+    bins = set()
+    for pattern, group_idx in _INSTALL_PATTERNS:
+        for m in re.finditer(pattern, readme):
+            name = m.group(group_idx).split("/")[-1].split("@")[0].strip()
+            if name:
+                bins.add(name)
+    for b in _KNOWN_BINS:
+        if re.search(rf"(?:^|\s|`){re.escape(b)}(?:\s|`|$)", readme, re.MULTILINE):
+            bins.add(b)
+    return sorted(bins)
+
+
+# Fragments that exercise overlapping install commands, prefixes of known binaries and
+# the separators the known-binary check depends on.
+BIN_FRAGMENTS = [
+    "npm install", "npm install -g", "npm  install\n", "npx", "pip install", "pip3 install",
+    "brew install", "cargo install", "go install", "@scope/tool@1.2", "github.com/own/cli@latest",
+    "pkg", "node", "npm", "python3", "docker", "gh", "ghx", "git", "gitlab", "curl", "jq", "xgo",
+    "install", "-g", "/", "@",
+]
+
+
+class TestExtractBins(TestCase):
+    def test_examples(self):
+        readme = "```\nnpm install -g @scope/tool@1.2\ngo install github.com/own/cli@latest\n```\nNeeds `jq` and git.\n"
+        self.assertEqual(extract_bins(readme), ["cli", "go", "jq", "npm", "tool"])
+        self.assertEqual(extract_bins(readme), baseline_extract_bins(readme))
+
+    def test_matches_baseline_on_generated_readmes(self):
+        rng = random.Random(0)
+        for _ in range(3000):
+            parts = rng.choices(BIN_FRAGMENTS, k=rng.randint(0, 10))
+            readme = "".join(part + rng.choice(["", " ", " ", "\n", "\t", "`", "\r\n"]) for part in parts)
+            self.assertEqual(extract_bins(readme), baseline_extract_bins(readme), repr(readme))
+
+
+class TestTemplateCache(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_generator_"))
+        self.template = self.temp_dir / "SKILL.md.j2"
+        self.template.write_text("v1 {{ name }}\n", encoding="utf-8")
+        self.addCleanup(generator.set_bytecode_cache_dir, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_compiles_once(self):
+        generator.set_bytecode_cache_dir(None)
+        first = generator._get_template(self.template)
+        with mock.patch.object(jinja2.Environment, "compile", side_effect=AssertionError("recompiled")):
+            self.assertIs(generator._get_template(str(self.template)), first)
+
+    def test_edited_template_is_reloaded(self):
+        generator.set_bytecode_cache_dir(None)
+        self.assertEqual(generator._get_template(self.template).render(name="x"), "v1 x\n")
+        self.template.write_text("v2 {{ name }}\n", encoding="utf-8")
+        stat = self.template.stat()
+        os.utime(self.template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual(generator._get_template(self.template).render(name="x"), "v2 x\n")
+        self.assertEqual(len(generator._template_cache), 1)
+
+    def test_bytecode_cache_skips_compilation(self):
+        cache_dir = self.temp_dir / "jinja"
+        generator.set_bytecode_cache_dir(cache_dir)
+        generator._get_template(self.template)
+        self.assertEqual(len(list(cache_dir.iterdir())), 1)
+
+        # a new process starts with an empty in-process cache
+        generator.set_bytecode_cache_dir(cache_dir)
+        with mock.patch.object(jinja2.Environment, "compile", side_effect=AssertionError("recompiled")):
+            self.assertEqual(generator._get_template(self.template).render(name="x"), "v1 x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the keep-alive GitHub REST/GraphQL client, against a local GitHub stand-in.
+"""
+
+import threading
+from unittest import TestCase, main
+
+from generator import extract_sections, sections_settled
+from github_client import GitHubAPIError, GitHubClient
+from rate_limit import RateBudget
+from test_support import StubGitHub
+
+REPOS = {
+    "own/repo": {"SKILL.md": "---\nname: repo\n---\n", "README.md": "# Repo\n\nText with ü\n"},
+}
+
+
+class TestGitHubClient(TestCase):
+    def setUp(self):
+        self.stub = StubGitHub(REPOS)
+        self.client = GitHubClient(base_url=self.stub.url, token="test-token", timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.close()
+
+    def test_contents_and_readme(self):
+        self.assertEqual(self.client.get_contents("own", "repo", "SKILL.md"), "---\nname: repo\n---\n")
+        self.assertEqual(self.client.get_readme("own", "repo"), "# Repo\n\nText with ü\n")
+
+    def test_not_found_is_none(self):
+        self.assertIsNone(self.client.get_contents("own", "repo", "missing.md"))
+        self.assertIsNone(self.client.get_readme("own", "gone"))
+        with self.assertRaises(GitHubAPIError) as ctx:
+            self.client.get_json("repos/own/gone")
+        self.assertEqual(ctx.exception.status, 404)
+
+    def test_keep_alive_reuses_one_connection_per_thread(self):
+        for _ in range(5):
+            self.client.get_readme("own", "repo")
+        self.assertEqual(self.stub.connections, 1)
+
+        def fetch():
+            for _ in range(3):
+                self.client.get_contents("own", "repo", "SKILL.md")
+
+        threads = [threading.Thread(target=fetch) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.stub.connections, 4)
+        self.assertEqual(len(self.stub.requests), 14)
+
+    def test_reconnects_after_close(self):
+        self.client.get_readme("own", "repo")
+        self.client.close()
+        self.assertEqual(self.client.get_readme("own", "repo"), "# Repo\n\nText with ü\n")
+        self.assertEqual(self.stub.connections, 2)
+
+    def test_graphql(self):
+        result = self.client.graphql(
+            'query {\n'
+            '  r0: repository(owner: "own", name: "repo") {\n'
+            '    skill: object(expression: "HEAD:SKILL.md") { ... on Blob { text } }\n'
+            '  }\n'
+            '  r1: repository(owner: "own", name: "gone") {\n'
+            '    skill: object(expression: "HEAD:SKILL.md") { ... on Blob { text } }\n'
+            '  }\n'
+            '}'
+        )
+        self.assertEqual(result["data"]["r0"]["skill"]["text"], "---\nname: repo\n---\n")
+        self.assertIsNone(result["data"]["r1"])
+        self.assertEqual(result["errors"][0]["path"], ["r1"])
+        self.assertEqual(self.stub.paths("POST"), ["/graphql"])
+
+    def test_budget_follows_response_headers(self):
+        self.client.budget = RateBudget()
+        self.client.get_readme("own", "repo")
+        self.client.get_readme("own", "repo")
+        usage = self.client.budget.usage()["core"]
+        self.assertEqual((usage["limit"], usage["remaining"]), (5000, 4998))
+        self.assertGreater(self.client.budget.seconds_until_reset("core"), 0)
+
+
+SETTLED = "Intro.\n\n## Install\n\nnpm i tool\n\n## Usage\n\ntool run\n\n## More\n\n" + "filler\n" * 2000
+UNSETTLED = "Tool without headings. " * 200
+
+
+class TestReadmePrefix(TestCase):
+    def setUp(self):
+        self.stub = StubGitHub({
+            "own/small": {"README.md": "# Small\n\nAll of it.\n"},
+            "own/settled": {"README.md": SETTLED},
+            "own/unsettled": {"README.md": UNSETTLED},
+            "own/multibyte": {"README.md": "ü" * 300},
+        })
+        self.client = GitHubClient(base_url=self.stub.url, token="test-token", timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.close()
+
+    def prefix(self, repo, initial_bytes=64, max_bytes=1024):
+        self.stub.requests.clear()
+        return self.client.get_readme_prefix("own", repo, initial_bytes, max_bytes, sections_settled)
+
+    def test_small_readme_in_one_request(self):
+        self.assertEqual(self.prefix("small"), "# Small\n\nAll of it.\n")
+        self.assertEqual(self.stub.paths(), ["/repos/own/small/readme"])
+
+    def test_stops_once_sections_are_settled(self):
+        text = self.prefix("settled")
+        self.assertTrue(SETTLED.startswith(text))
+        self.assertLess(len(text), 256)
+        self.assertEqual(extract_sections(text), extract_sections(SETTLED))
+
+    def test_doubles_up_to_max_bytes(self):
+        text = self.prefix("unsettled")
+        self.assertEqual(text, UNSETTLED[:1024])
+        # 64 + 64 + 128 + 256 + 512 bytes
+        self.assertEqual(len(self.stub.paths()), 5)
+
+    def test_multibyte_characters_across_ranges(self):
+        self.assertEqual(self.prefix("multibyte", initial_bytes=63), "ü" * 300)
+
+    def test_missing_readme(self):
+        self.assertIsNone(self.prefix("gone"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the staged fetch / render / write pipeline.
+"""
+
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import TestCase, main
+
+import convert
+from pipeline import Pipeline
+from render_pool import RenderPool
+from test_support import TEMPLATE, make_config, make_fixture, snapshot
+
+
+class TestWriteOrder(TestCase):
+    def test_writes_in_candidate_order(self):
+        candidates = [
+            {"slug": f"skill-{i}", "description": "d", "category": "tools",
+             "source_url": f"https://github.com/own/repo{i}"}
+            for i in range(40)
+        ]
+        rng = random.Random(0)
+        delays = {c["source_url"]: rng.random() * 0.01 for c in candidates}
+
+        def fetch(urls):
+            time.sleep(sum(delays[url] for url in urls))
+            return [(None, "# Tool\n\nSomething.\n") for _ in urls]
+
+        written = []
+        with RenderPool(TEMPLATE) as render_pool:
+            pipeline = Pipeline(
+                fetch=fetch,
+                write=lambda entry, sources, outcome: written.append(entry["slug"]),
+                render_pool=render_pool,
+                fetch_workers=4,
+                queue_size=2,
+                monitor_interval=0,
+            )
+            pipeline.run(candidates)
+
+        self.assertEqual(written, [c["slug"] for c in candidates])
+        self.assertLessEqual(pipeline.max_reorder, pipeline.window)
+
+    def test_reversed_completion(self):
+        # four workers; within each group of four, the last candidate finishes first
+        workers = 4
+        candidates = [
+            {"slug": f"skill-{i}", "description": "d", "category": "tools",
+             "source_url": f"https://github.com/own/repo{i}"}
+            for i in range(16)
+        ]
+        done = {c["source_url"]: threading.Event() for c in candidates}
+        completed = []
+
+        def fetch(urls):
+            (url,) = urls
+            pos = int(url.rsplit("repo", 1)[1])
+            if pos % workers != workers - 1:
+                done[candidates[pos + 1]["source_url"]].wait(timeout=5)
+            completed.append(pos)
+            done[url].set()
+            return [(None, "# Tool\n\nSomething.\n")]
+
+        written = []
+        with RenderPool(TEMPLATE) as render_pool:
+            pipeline = Pipeline(
+                fetch=fetch,
+                write=lambda entry, sources, outcome: written.append(entry["slug"]),
+                render_pool=render_pool,
+                fetch_workers=workers,
+                queue_size=1,
+                monitor_interval=0,
+            )
+            pipeline.run(candidates)
+
+        self.assertEqual(completed, [g + i for g in range(0, 16, workers) for i in reversed(range(workers))])
+        self.assertEqual(written, [c["slug"] for c in candidates])
+        # each group waits in the reorder buffer until its first candidate arrives
+        self.assertEqual(pipeline.max_reorder, workers)
+
+
+class TestParallelMatchesSerial(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_pipeline_"))
+        self.entries = make_fixture(self.temp_dir)
+
+    def tearDown(self):
+        import shutil
+
+        shutil.rmtree(self.temp_dir)
+
+    def test_parallel_output_matches_serial(self):
+        serial = make_config(self.temp_dir, "serial")
+        parallel = make_config(self.temp_dir, "parallel", workers=4, queue_size=2)
+
+        serial_summary = convert.run(serial, entries=self.entries)
+        parallel_summary = convert.run(parallel, jobs=2, entries=self.entries)
+
+        self.assertEqual(serial_summary, parallel_summary)
+        self.assertEqual(serial_summary["success"], len(self.entries))
+        expected = snapshot(serial["output"]["dir"])
+        self.assertEqual(snapshot(parallel["output"]["dir"]), expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for request pacing and tracking the remaining API calls.
+"""
+
+import threading
+import time
+from unittest import TestCase, main, mock
+
+from rate_limit import RateBudget, TokenBucket
+
+
+class FakeClock:
+    """time.monotonic / time.sleep stand-in: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for name in ("monotonic", "sleep"):
+            patcher = mock.patch(f"rate_limit.time.{name}", getattr(self.clock, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=2.0, capacity=3)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(self.clock.now, 101.0)
+
+    def test_idle_time_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.clock.now += 60
+        self.assertEqual([bucket.acquire() for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_rate_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestTokenBucketThreads(TestCase):
+    def test_shared_bucket_paces_all_threads(self):
+        bucket = TokenBucket(rate=50.0, capacity=1)
+        started = time.monotonic()
+        threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 tokens: the first is in the bucket, the other 19 arrive at 50 per second
+        self.assertGreaterEqual(time.monotonic() - started, 19 / 50 - 0.01)
+
+
+class TestRateBudget(TestCase):
+    def test_reserve_applies_to_authenticated_limit(self):
+        budget = RateBudget(reserve=100)
+        budget.set("core", 5000, 5000, time.time() + 3600)
+        self.assertEqual(budget.reserve_for("core"), 100)
+        self.assertEqual(budget.available("core"), 4900)
+
+    def test_reserve_is_capped_for_small_limit(self):
+        budget = RateBudget(reserve=100)
+        budget.set("core", 60, 60, time.time() + 3600)
+        with self.assertLogs("rate_limit", level="WARNING") as logs:
+            self.assertEqual(budget.available("core"), 54)
+        self.assertEqual(len(logs.output), 1)
+        self.assertTrue(budget.admit("core", 54))
+        self.assertFalse(budget.admit("core", 1))
+
+    def test_unknown_limit_keeps_reserve(self):
+        budget = RateBudget(reserve=100)
+        self.assertEqual(budget.reserve_for("core"), 100)
+        self.assertIsNone(budget.available("core"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for reading files out of repository tarballs.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main
+
+from repo_archive import LocalTarballSource, TarballSource, read_root_files
+from test_support import write_tarball
+
+PREFIX = "own-repo-abc1234"
+
+
+class TestReadRootFiles(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_repo_archive_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, files, names, **kwargs):
+        path = self.temp_dir / "own__repo.tar.gz"
+        write_tarball(path, PREFIX, files)
+        with open(path, "rb") as stream:
+            return read_root_files(stream, names, **kwargs)
+
+    def test_root_files_only(self):
+        found = self.read(
+            {"src/README.md": "nested", "README.md": "root", "docs/SKILL.md": "nested"},
+            ["README.md", "SKILL.md"],
+        )
+        self.assertEqual(found, {"README.md": b"root"})
+
+    def test_size_limit(self):
+        found = self.read({"SKILL.md": "x" * 11, "README.md": "x" * 10}, ["SKILL.md", "README.md"], max_bytes=10)
+        self.assertEqual(found, {"README.md": b"x" * 10})
+
+    def test_missing_readme(self):
+        self.assertEqual(self.read({"main.py": "print()\n"}, ["README.md"]), {})
+
+    def test_stop_at(self):
+        found = self.read(
+            {"SKILL.md": "skill", "README.md": "readme"},
+            ["SKILL.md", "README.md"], stop_at=["SKILL.md"],
+        )
+        self.assertEqual(found, {"SKILL.md": b"skill"})
+
+    def test_match_selects_nested_paths(self):
+        found = self.read(
+            {"docs/README.md": "docs", "docs/guide.md": "guide", "README.rst": "root"},
+            [], match=lambda path: Path(path).stem == "README",
+        )
+        self.assertEqual(found, {"docs/README.md": b"docs", "README.rst": b"root"})
+
+
+class TestTarballSource(TestCase):
+    def test_open_is_abstract(self):
+        with self.assertRaises(TypeError):
+            TarballSource()
+
+    def test_missing_local_tarball(self):
+        temp_dir = tempfile.mkdtemp(prefix="test_repo_archive_")
+        try:
+            self.assertIsNone(LocalTarballSource(temp_dir).read_files("own", "repo", ["README.md"]))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for recording and replaying GitHub responses.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main
+
+import convert
+from response_archive import ARCHIVE_README, ARCHIVE_SKILL_MD, ArchiveMiss, ResponseArchive
+from test_support import make_config, make_fixture, snapshot
+
+
+class TestResponseArchive(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_archive_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_put_and_get(self):
+        path = self.temp_dir / "responses.sqlite3"
+        archive = ResponseArchive(path, "record")
+        archive.put(ARCHIVE_README, "own/repo", "# Readme\n")
+        archive.put(ARCHIVE_SKILL_MD, "own/repo", None)
+        archive.close()
+
+        archive = ResponseArchive(path, "replay")
+        self.assertEqual(archive.get(ARCHIVE_README, "own/repo"), "# Readme\n")
+        self.assertIsNone(archive.get(ARCHIVE_SKILL_MD, "own/repo"))
+        with self.assertRaises(ArchiveMiss):
+            archive.get(ARCHIVE_README, "own/other")
+        self.assertEqual((archive.replayed, archive.missed), (2, 1))
+        archive.close()
+
+    def test_replay_requires_archive(self):
+        with self.assertRaises(FileNotFoundError):
+            ResponseArchive(self.temp_dir / "missing.sqlite3", "replay")
+
+    def test_replay_reproduces_recorded_run(self):
+        entries = make_fixture(self.temp_dir)
+        path = str(self.temp_dir / "responses.sqlite3")
+        recorded = make_config(self.temp_dir, "record", archive={"mode": "record", "path": path})
+        convert.run(recorded, entries=entries)
+
+        # replay must not read the repositories
+        shutil.rmtree(self.temp_dir / "tars")
+        replayed = make_config(self.temp_dir, "replay", workers=4, archive={"mode": "replay", "path": path})
+        summary = convert.run(replayed, entries=entries)
+
+        self.assertEqual(summary["errors"], 0)
+        expected = snapshot(recorded["output"]["dir"])
+        self.assertEqual(len(expected), len(entries))
+        self.assertEqual(snapshot(replayed["output"]["dir"]), expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the checkpoint journal and resuming interrupted runs.
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main, mock
+
+import convert
+from repo_archive import LocalTarballSource
+from run_journal import JOURNAL_FILENAME
+from test_support import make_config, make_fixture, snapshot
+
+
+class Crash(BaseException):
+    """Stands in for the process dying in the middle of a run."""
+
+
+class TestResume(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_run_journal_"))
+        self.entries = make_fixture(self.temp_dir)
+        self.opened = []
+        self.crash_at = None
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def counting_open(self, original):
+        def open_tarball(source, owner, repo):
+            if len(self.opened) == self.crash_at:
+                raise Crash
+            self.opened.append(repo)
+            return original(source, owner, repo)
+
+        return open_tarball
+
+    def run_convert(self, config, **kwargs):
+        patched = self.counting_open(LocalTarballSource.open)
+        with mock.patch.object(LocalTarballSource, "open", patched):
+            return convert.run(config, entries=self.entries, **kwargs)
+
+    def test_resume_converges_with_uninterrupted_run(self):
+        reference = make_config(self.temp_dir, "reference")
+        self.run_convert(reference)
+        self.opened.clear()
+
+        config = make_config(self.temp_dir, "interrupted")
+        self.crash_at = 5
+        with self.assertRaises(Crash), self.assertLogs("pipeline", level="ERROR"):
+            self.run_convert(config)
+        journal = Path(config["catalog"]["cache_dir"]) / JOURNAL_FILENAME
+        self.assertTrue(journal.exists())
+
+        self.opened.clear()
+        self.crash_at = None
+        summary = self.run_convert(config, resume=True)
+
+        # the five repositories fetched before the crash come from the journal
+        self.assertEqual(len(self.opened), len(self.entries) - 5)
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(snapshot(config["output"]["dir"]), snapshot(reference["output"]["dir"]))
+        # a finished run leaves only its completion record
+        records = [json.loads(line) for line in journal.read_text().splitlines()]
+        self.assertEqual(len(records), 1)
+
+    def test_resume_without_journal_runs_everything(self):
+        config = make_config(self.temp_dir)
+        summary = self.run_convert(config, resume=True)
+        self.assertEqual(summary["success"], len(self.entries))
+
+
+if __name__ == "__main__":
+    main()
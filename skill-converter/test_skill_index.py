@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the generated-skill index and finding outputs to regenerate.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main, mock
+
+import convert
+from skill_index import INDEX_FILENAME, SkillIndex
+from test_support import make_config, make_fixture
+
+ENTRY = {"slug": "demo", "source_url": "https://github.com/own/demo"}
+
+
+class TestFindStale(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_skill_index_"))
+        self.output_dir = self.temp_dir / "out"
+        self.index = SkillIndex(self.temp_dir / "index.json", self.output_dir)
+        for slug in ("kept", "edited", "missing"):
+            path = self.output_dir / slug / "SKILL.md"
+            path.parent.mkdir(parents=True)
+            path.write_text(f"# {slug}\n", encoding="utf-8")
+            self.index.record(slug, dict(ENTRY, slug=slug), f"# {slug}\n", "1")
+        (self.output_dir / "edited" / "SKILL.md").write_text("# Edited by hand\n", encoding="utf-8")
+        (self.output_dir / "missing" / "SKILL.md").unlink()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_same_version(self):
+        self.assertEqual(self.index.find_stale("1", include_modified=False), ["missing"])
+        self.assertEqual(self.index.find_stale("1"), ["edited", "missing"])
+
+    def test_new_version_keeps_hand_edits(self):
+        with self.assertLogs("skill_index", level="INFO") as logs:
+            stale = self.index.find_stale("2", include_modified=False)
+        self.assertEqual(stale, ["kept", "missing"])
+        self.assertIn("edited", "\n".join(logs.output))
+        self.assertEqual(self.index.find_stale("2"), ["kept", "edited", "missing"])
+
+
+class TestVersionBump(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_skill_index_"))
+        self.entries = make_fixture(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_bump_does_not_overwrite_hand_edited_skill(self):
+        config = make_config(self.temp_dir)
+        config["catalog"]["incremental"] = True
+        convert.run(config, entries=self.entries)
+        out = Path(config["output"]["dir"])
+        edited = next(out.rglob("SKILL.md"))
+        edited.write_text("# Edited by hand\n", encoding="utf-8")
+
+        with mock.patch.object(convert, "GENERATOR_VERSION", "next"):
+            summary = convert.run(config, entries=self.entries)
+
+        self.assertEqual(edited.read_text(encoding="utf-8"), "# Edited by hand\n")
+        index = SkillIndex(Path(config["catalog"]["cache_dir"]) / INDEX_FILENAME, out)
+        versions = {slug: info["generator_version"] for slug, info in index.entries.items()}
+        self.assertEqual(versions.pop(edited.parent.name), convert.GENERATOR_VERSION)
+        self.assertEqual(set(versions.values()), {"next"})
+        self.assertEqual(summary["candidates"], len(versions))
+
+
+if __name__ == "__main__":
+    main()
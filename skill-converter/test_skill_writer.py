@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for write-if-changed SKILL.md output.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main
+
+import convert
+from skill_index import content_hash
+from skill_writer import SkillWriter
+from test_support import make_config, make_fixture
+
+
+class TestSkillWriter(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_skill_writer_"))
+        self.writer = SkillWriter(self.temp_dir, fsync="off")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_identical_content_is_not_rewritten(self):
+        path, changed = self.writer.write("demo", "# Demo\n")
+        self.assertTrue(changed)
+        before = path.stat()
+
+        path, changed = self.writer.write("demo", "# Demo\n", content_hash("# Demo\n"))
+        self.assertFalse(changed)
+        after = path.stat()
+        self.assertEqual((after.st_ino, after.st_mtime_ns), (before.st_ino, before.st_mtime_ns))
+        self.assertEqual((self.writer.written, self.writer.unchanged), (1, 1))
+
+    def test_changed_content_is_replaced(self):
+        self.writer.write("demo", "# Demo\n")
+        path, changed = self.writer.write("demo", "# Demo v2\n", content_hash("# Demo\n"))
+        self.assertTrue(changed)
+        self.assertEqual(path.read_text(), "# Demo v2\n")
+        self.assertEqual([p.name for p in path.parent.iterdir()], ["SKILL.md"])
+
+    def test_hand_edited_file_is_restored(self):
+        path, _ = self.writer.write("demo", "# Demo\n")
+        path.write_text("# Edited\n")
+        _, changed = self.writer.write("demo", "# Demo\n", content_hash("# Demo\n"))
+        self.assertTrue(changed)
+        self.assertEqual(path.read_text(), "# Demo\n")
+
+    def test_unknown_fsync_mode(self):
+        with self.assertRaises(ValueError):
+            SkillWriter(self.temp_dir, fsync="sometimes")
+
+
+class TestRerun(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_skill_writer_"))
+        self.entries = make_fixture(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_rerun_skips_unchanged_files(self):
+        config = make_config(self.temp_dir)
+        config["catalog"]["incremental"] = True
+        first = convert.run(config, entries=self.entries)
+        out = Path(config["output"]["dir"])
+        before = {p: p.stat().st_mtime_ns for p in out.rglob("SKILL.md")}
+
+        # a catalog change that does not affect the output: every entry is rendered again
+        for entry in self.entries:
+            entry["updated_at"] = "2026-01-01"
+        second = convert.run(config, entries=self.entries)
+
+        self.assertEqual(first["success"], len(self.entries))
+        self.assertEqual(second["candidates"], len(self.entries))
+        self.assertEqual((second["success"], second["skipped"]), (0, len(self.entries)))
+        self.assertEqual({p: p.stat().st_mtime_ns for p in out.rglob("SKILL.md")}, before)
+
+
+if __name__ == "__main__":
+    main()
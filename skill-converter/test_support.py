@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for the converter tests: a catalog whose repositories are
+served by LocalTarballSource from a temporary directory, and a local
+stand-in for the GitHub REST and GraphQL APIs.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import re
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+TEMPLATE = Path(__file__).parent / "templates" / "skill.md.j2"
+
+README = """# Repo {i}
+
+Tool number {i} for testing.
+
+## Installation
+
+```bash
+npm install -g tool{i}
+```
+
+## Usage
+
+Run `tool{i} --help` to get started.
+"""
+
+SKILL_MD = """---
+name: repo{i}
+description: Existing skill {i}
+---
+# Repo {i}
+
+Use `tool{i}` to do things.
+"""
+
+
+def _add(tar, path, text):
+    data = text.encode("utf-8") if isinstance(text, str) else text
+    info = tarfile.TarInfo(path)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_tarball(path, prefix, files):
+    """Write a GitHub-style tarball: every file under a single prefix/ directory."""
+    with tarfile.open(path, "w:gz") as tar:
+        top = tarfile.TarInfo(prefix)
+        top.type = tarfile.DIRTYPE
+        tar.addfile(top)
+        for name, text in files.items():
+            _add(tar, f"{prefix}/{name}", text)
+
+
+def make_fixture(root, count=12):
+    """Create tarballs under root/tars and return the catalog entries.
+
+    Every third repository ships a SKILL.md, the others only a README.
+    The last repository has no tarball, so nothing is found for it.
+    """
+    tars = Path(root) / "tars"
+    tars.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for i in range(count):
+        entries.append({
+            "slug": f"Skill_{i}",
+            "description": f"Skill number {i}",
+            "source_url": f"https://github.com/own{i}/repo{i}",
+            "category": "tools",
+            "quality_score": 3.0 + (i % 5) * 0.5,
+            "source_type": "github",
+            "security_risk": "safe",
+        })
+        if i == count - 1:
+            continue
+        files = {"SKILL.md": SKILL_MD.format(i=i)} if i % 3 == 0 else {}
+        files["README.md"] = README.format(i=i)
+        write_tarball(tars / f"own{i}__repo{i}.tar.gz", f"own{i}-repo{i}-abc1234", files)
+    return entries
+
+
+def make_config(root, name="run", workers=1, queue_size=32, **fetch):
+    """Return a config that fetches from root/tars and writes to root/<name>/out."""
+    root = Path(root)
+    base = root / name
+    fetch_cfg = {
+        "backend": "gh",
+        "mode": "tarball",
+        "tarball": {"source": "local", "dir": str(root / "tars")},
+        "workers": workers,
+        "requests_per_second": 1000,
+        "burst": 1000,
+    }
+    fetch_cfg.update(fetch)
+    return {
+        "catalog": {"repo": "cat/log", "path": "skills.json", "cache_dir": str(base / "cache")},
+        "filter": {
+            "categories": ["tools"],
+            "min_quality_score": 3.0,
+            "source_types": ["github"],
+            "security_risk_exclude": ["dangerous"],
+            "max_skills_per_run": 50,
+        },
+        "fetch": fetch_cfg,
+        "pipeline": {"queue_size": queue_size, "monitor_interval_seconds": 0},
+        "output": {"dir": str(base / "out"), "log_dir": str(base / "logs"), "template": str(TEMPLATE)},
+    }
+
+
+def snapshot(directory):
+    """Return {relative path: bytes} for every file under directory."""
+    directory = Path(directory)
+    return {
+        str(path.relative_to(directory)): path.read_bytes()
+        for path in sorted(directory.rglob("*"))
+        if path.is_file()
+    }
+
+
+def _github_readme(files):
+    """The README GitHub serves from /readme: .github, then the root, then docs."""
+    for directory in (".github/", "", "docs/"):
+        names = sorted(
+            path for path in files
+            if path.startswith(directory) and "/" not in path[len(directory):]
+            and re.fullmatch(r"readme(\..*)?", path[len(directory):], re.IGNORECASE)
+        )
+        if names:
+            return names[0]
+    return None
+
+
+class StubGitHub:
+    """A local stand-in for the parts of the GitHub API the converter uses.
+
+    repos maps "owner/repo" to {path: text}. Serves the contents and readme
+    endpoints (JSON, or raw with Range when asked for the raw media type),
+    /rate_limit and a GraphQL endpoint that understands the aliased
+    repository/object queries. Every request is recorded in requests as
+    (method, path), GraphQL queries in queries, and the number of accepted
+    TCP connections in connections.
+    """
+
+    def __init__(self, repos, rate_limit=5000):
+        self.repos = repos
+        self.rate_limit = rate_limit
+        self.requests = []
+        self.queries = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def paths(self, method="GET"):
+        return [path for m, path in self.requests if m == method]
+
+    def _graphql(self, query):
+        data = {}
+        errors = []
+        pattern = r'(r\d+): repository\(owner: "([^"]+)", name: "([^"]+)"\) \{(.*?)\n  \}'
+        for alias, owner, repo, inner in re.findall(pattern, query, re.S):
+            files = self.repos.get(f"{owner}/{repo}")
+            if files is None:
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias]})
+                continue
+            node = {}
+            for name, path in re.findall(r'(\w+): object\(expression: "HEAD:([^"]*)"\)', inner):
+                prefix = f"{path}/" if path else ""
+                if path in files:
+                    node[name] = {"text": files[path], "isBinary": False, "isTruncated": False}
+                elif any(f.startswith(prefix) for f in files):
+                    entries = {}
+                    for f in files:
+                        if f.startswith(prefix):
+                            head, _, rest = f[len(prefix):].partition("/")
+                            entries[head] = "tree" if rest else "blob"
+                    node[name] = {"entries": [{"name": n, "type": t} for n, t in sorted(entries.items())]}
+                else:
+                    node[name] = None
+            data[alias] = node
+        result = {"data": data}
+        if errors:
+            result["errors"] = errors
+        return result
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body=b"", headers=None):
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode("utf-8")
+                with stub._lock:
+                    remaining = max(0, stub.rate_limit - len(stub.requests))
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-RateLimit-Limit", str(stub.rate_limit))
+                self.send_header("X-RateLimit-Remaining", str(remaining))
+                self.send_header("X-RateLimit-Reset", "9999999999")
+                self.send_header("X-RateLimit-Resource", "graphql" if self.path == "/graphql" else "core")
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_file(self, text):
+                data = text.encode("utf-8")
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send(304, headers={"ETag": etag})
+                if "raw" not in self.headers.get("Accept", ""):
+                    body = {"content": base64.b64encode(data).decode("ascii"), "encoding": "base64"}
+                    return self.send(200, body, {"ETag": etag})
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if_range = self.headers.get("If-Range")
+                if match is None or (if_range and if_range != etag):
+                    return self.send(200, data, {"ETag": etag})
+                start = int(match.group(1))
+                if start >= len(data):
+                    return self.send(416)
+                end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+                content_range = f"bytes {start}-{end}/{len(data)}"
+                return self.send(206, data[start:end + 1], {"ETag": etag, "Content-Range": content_range})
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(("GET", self.path))
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts == ["rate_limit"]:
+                    core = {"limit": stub.rate_limit, "remaining": stub.rate_limit, "reset": 9999999999}
+                    return self.send(200, {"resources": {"core": core, "graphql": core}})
+                if len(parts) >= 4 and parts[0] == "repos":
+                    files = stub.repos.get(f"{parts[1]}/{parts[2]}")
+                    if files is not None:
+                        if parts[3] == "readme":
+                            path = _github_readme(files)
+                        else:
+                            path = "/".join(parts[4:]) if parts[3] == "contents" else None
+                        if path in files:
+                            return self.send_file(files[path])
+                self.send(404, {"message": "Not Found"})
+
+            def do_POST(self):
+                with stub._lock:
+                    stub.requests.append(("POST", self.path))
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.queries.append(body["query"])
+                self.send(200, stub._graphql(body["query"]))
+
+        return Handler
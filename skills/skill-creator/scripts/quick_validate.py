@@ -8,6 +8,7 @@ import sys
 from pathlib import Path
 
 import yaml
+from skill_frontmatter import FrontmatterError, load, read_frontmatter
 
 MAX_SKILL_NAME_LENGTH = 64
 
@@ -20,18 +21,16 @@ def validate_skill(skill_path):
     if not skill_md.exists():
         return False, "SKILL.md not found"
 
-    content = skill_md.read_text()
-    if not content.startswith("---"):
-        return False, "No YAML frontmatter found"
-
-    match = re.match(r"^---\n(.*?)\n---", content, re.DOTALL)
-    if not match:
+    # Only the frontmatter is read; the body can be arbitrarily large
+    try:
+        frontmatter_text = read_frontmatter(skill_md)
+    except (FrontmatterError, UnicodeDecodeError):
         return False, "Invalid frontmatter format"
-
-    frontmatter_text = match.group(1)
+    if frontmatter_text is None:
+        return False, "No YAML frontmatter found"
 
     try:
-        frontmatter = yaml.safe_load(frontmatter_text)
+        frontmatter = load(frontmatter_text)
         if not isinstance(frontmatter, dict):
             return False, "Frontmatter must be a YAML dictionary"
     except yaml.YAMLError as e:
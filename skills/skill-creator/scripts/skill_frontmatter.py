@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Shared SKILL.md frontmatter helpers
+
+Reads only the frontmatter block (up to the closing ---), parses and dumps it with
+libyaml's CSafeLoader / CSafeDumper when PyYAML was built with them, and can update
+a few keys in place without re-serializing the rest of the frontmatter.
+
+The same file is shipped twice: skills/skill-creator/scripts/skill_frontmatter.py for
+quick_validate.py, and skill-converter/skill_frontmatter.py for the catalog converter,
+which is deployed outside this checkout. Keep the two identical
+(skill-converter/test_generator.py checks this).
+"""
+
+import re
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as FastDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as FastDumper
+    from yaml import SafeLoader
+
+# Frontmatter larger than this is treated as unterminated
+MAX_FRONTMATTER_BYTES = 64 * 1024
+
+_DELIMITER_RE = re.compile(r"^---[ \t\r]*$", re.MULTILINE)
+_OPAQUE_VALUE_STARTS = ("-", "{", "[", "?", "&", "*", "!", "|", ">")
+
+
+class FrontmatterError(ValueError):
+    """The frontmatter is not terminated or is not a mapping."""
+
+
+def _is_delimiter(line):
+    return line.rstrip(" \t\r\n") == "---"
+
+
+def _strip_newline(text):
+    return text.removesuffix("\n").removesuffix("\r")
+
+
+def split_frontmatter(text):
+    """
+    Split a SKILL.md document into (frontmatter text, body).
+
+    Returns None when the document does not start with a --- line. Only the text up to
+    the closing --- is scanned. The frontmatter text excludes both delimiter lines and
+    the body starts right after the closing delimiter line.
+
+    Raises:
+        FrontmatterError: if the closing --- is missing
+    """
+    first_end = text.find("\n")
+    if first_end < 0 or not _is_delimiter(text[:first_end]):
+        return None
+    start = first_end + 1
+    match = _DELIMITER_RE.search(text, start)
+    if match is None:
+        raise FrontmatterError("Closing --- of the frontmatter not found")
+    body_start = match.end() + 1 if text.startswith("\n", match.end()) else match.end()
+    return _strip_newline(text[start:match.start()]), text[body_start:]
+
+
+def read_frontmatter(path, max_bytes=MAX_FRONTMATTER_BYTES):
+    """
+    Read only the frontmatter of a SKILL.md file.
+
+    Returns None when the file does not start with a --- line.
+
+    Raises:
+        FrontmatterError: if the closing --- is not found within max_bytes
+    """
+    lines = []
+    size = 0
+    with open(path, "rb") as f:
+        first = f.readline(max_bytes)
+        if not _is_delimiter(first.decode("utf-8", "replace")):
+            return None
+        size += len(first)
+        while size < max_bytes:
+            line = f.readline(max_bytes - size)
+            if not line:
+                break
+            size += len(line)
+            text = line.decode("utf-8")
+            if _is_delimiter(text):
+                return _strip_newline("".join(lines))
+            lines.append(text)
+    if size >= max_bytes:
+        raise FrontmatterError(f"Frontmatter is not terminated within {max_bytes} bytes")
+    raise FrontmatterError("Closing --- of the frontmatter not found")
+
+
+def load(frontmatter_text):
+    """Parse frontmatter text with the fastest available safe loader."""
+    return yaml.load(frontmatter_text, Loader=SafeLoader)
+
+
+def _dump_yaml(data):
+    text = yaml.dump(data, Dumper=FastDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    if "\\U" in text and FastDumper is not yaml.SafeDumper:
+        # libyaml escapes characters outside the BMP (emoji); the pure-Python dumper keeps them as is
+        text = yaml.dump(data, Dumper=yaml.SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    return text
+
+
+def dump(data):
+    """Serialize a frontmatter mapping (block style, key order preserved, no trailing newline)."""
+    return _dump_yaml(data).strip()
+
+
+def merge(data, updates):
+    """
+    Apply nested updates to a frontmatter mapping in place and return it.
+
+    A dict value in updates is merged into the existing mapping (replacing a non-mapping
+    value); any other value replaces the existing one.
+    """
+    for key, value in updates.items():
+        if isinstance(value, dict):
+            if not isinstance(data.get(key), dict):
+                data[key] = {}
+            merge(data[key], value)
+        else:
+            data[key] = value
+    return data
+
+
+def _indent_of(line):
+    return len(line) - len(line.lstrip(" "))
+
+
+def _is_filler(line):
+    stripped = line.strip()
+    return not stripped or stripped.startswith("#")
+
+
+def _find_key(lines, indent, key):
+    """Return the (start, end) line span of key and its value in a block mapping, or None."""
+    key_re = re.compile(r" {%d}(?:%s|\"%s\"|'%s')[ \t]*:(?:[ \t]|$)" % ((indent,) + (re.escape(key),) * 3))
+    for i, line in enumerate(lines):
+        if _indent_of(line) != indent or not key_re.match(line):
+            continue
+        end = i + 1
+        while end < len(lines):
+            line = lines[end]
+            if _is_filler(line) or _indent_of(line) > indent or line[indent:indent + 1] == "-":
+                end += 1
+            else:
+                break
+        while end > i + 1 and _is_filler(lines[end - 1]):
+            end -= 1
+        return i, end
+    return None
+
+
+def _child_indent(lines, start, end):
+    """Indentation of the block mapping under lines[start], or None if the value is not one."""
+    after_colon = lines[start].split(":", 1)[1].strip()
+    if after_colon and not after_colon.startswith("#"):
+        return None
+    for line in lines[start + 1:end]:
+        if _is_filler(line):
+            continue
+        if line.lstrip(" ").startswith(_OPAQUE_VALUE_STARTS):
+            return None
+        return _indent_of(line)
+    return None
+
+
+def _dump_item(key, value, indent):
+    text = _dump_yaml({key: value})
+    return [" " * indent + line for line in text.rstrip("\n").split("\n")]
+
+
+def _patch_mapping(lines, indent, updates, merged):
+    out = list(lines)
+    for key, value in updates.items():
+        span = _find_key(out, indent, key)
+        if span is None:
+            insert_at = len(out)
+            while insert_at > 0 and _is_filler(out[insert_at - 1]):
+                insert_at -= 1
+            out[insert_at:insert_at] = _dump_item(key, merged[key], indent)
+            continue
+        start, end = span
+        if isinstance(value, dict):
+            child_indent = _child_indent(out, start, end)
+            if child_indent is not None:
+                out[start + 1:end] = _patch_mapping(out[start + 1:end], child_indent, value, merged[key])
+                continue
+        # Scalars, and values that cannot be edited line by line, are re-serialized on their own
+        out[start:end] = _dump_item(key, merged[key], indent)
+    return out
+
+
+def update(frontmatter_text, updates, in_place=True):
+    """
+    Return frontmatter text with updates applied (see merge()).
+
+    With in_place, only the lines of the updated keys are rewritten and everything else
+    (comments, quoting, flow-style values of other keys) is kept as is. If the patched
+    text does not parse to the same data as a full re-serialization would produce, the
+    whole frontmatter is re-serialized instead. Invalid YAML is replaced by the updates.
+
+    Raises:
+        FrontmatterError: if the frontmatter is valid YAML but not a mapping
+    """
+    try:
+        data = load(frontmatter_text)
+    except yaml.YAMLError:
+        data = None
+        in_place = False
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise FrontmatterError(f"Frontmatter must be a YAML dictionary, got {type(data).__name__}")
+    merged = merge(data, updates)
+
+    if in_place:
+        lines = frontmatter_text.split("\n")
+        patched = "\n".join(_patch_mapping(lines, 0, updates, merged))
+        try:
+            if load(patched) == merged:
+                return patched
+        except yaml.YAMLError:
+            pass
+    return dump(merged)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared frontmatter helpers.
+"""
+
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main
+
+from skill_frontmatter import FrontmatterError, load, read_frontmatter, split_frontmatter, update
+
+
+FLOW_METADATA = """name: github
+description: "Interact with GitHub using the `gh` CLI."
+# keep this comment
+metadata:
+  {
+    "openclaw": { "emoji": "🐙", "requires": { "bins": ["gh"] } },
+  }"""
+
+
+class TestSplitAndRead(TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="test_frontmatter_"))
+
+    def tearDown(self):
+        import shutil
+
+        shutil.rmtree(self.temp_dir)
+
+    def test_split(self):
+        self.assertEqual(split_frontmatter("---\nname: x\n---\n# Body\n"), ("name: x", "# Body\n"))
+        self.assertEqual(split_frontmatter("---\n---\nbody"), ("", "body"))
+        self.assertIsNone(split_frontmatter("# No frontmatter\n"))
+        with self.assertRaises(FrontmatterError):
+            split_frontmatter("---\nname: x\n")
+
+    def test_read_stops_at_closing_delimiter(self):
+        skill_md = self.temp_dir / "SKILL.md"
+        skill_md.write_text("---\nname: x\ndescription: y\n---\n" + "body line\n" * 100000)
+        self.assertEqual(read_frontmatter(skill_md, max_bytes=1024), "name: x\ndescription: y")
+
+    def test_read_unterminated(self):
+        skill_md = self.temp_dir / "SKILL.md"
+        skill_md.write_text("---\nname: x\n" + "body line\n" * 1000)
+        with self.assertRaises(FrontmatterError):
+            read_frontmatter(skill_md, max_bytes=1024)
+        skill_md.write_text("# Title\n")
+        self.assertIsNone(read_frontmatter(skill_md))
+
+
+class TestUpdate(TestCase):
+    def test_replaces_only_updated_keys(self):
+        text = "name: old\n# comment\nlicense: 'MIT'\ndescription: old\n"
+        updated = update(text, {"name": "new", "description": "a: b"})
+        self.assertEqual(updated, "name: new\n# comment\nlicense: 'MIT'\ndescription: 'a: b'\n")
+
+    def test_nested_block_mapping(self):
+        text = "name: x\nmetadata:\n  openclaw:\n    emoji: '🐙'\n  other: 1\n"
+        updated = update(text, {"metadata": {"openclaw": {"auto_generated": True}}})
+        self.assertIn("    emoji: '🐙'\n    auto_generated: true\n  other: 1", updated)
+        self.assertEqual(
+            load(updated),
+            {"name": "x", "metadata": {"openclaw": {"emoji": "🐙", "auto_generated": True}, "other": 1}},
+        )
+
+    def test_flow_mapping_value_is_reserialized_alone(self):
+        updated = update(FLOW_METADATA, {"name": "gh", "metadata": {"openclaw": {"auto_generated": True}}})
+        self.assertTrue(updated.startswith("name: gh\ndescription: \"Interact"))
+        self.assertIn("# keep this comment", updated)
+        self.assertEqual(
+            load(updated)["metadata"],
+            {"openclaw": {"emoji": "🐙", "requires": {"bins": ["gh"]}, "auto_generated": True}},
+        )
+
+    def test_adds_missing_keys(self):
+        updated = update("name: x", {"homepage": "https://example.com"})
+        self.assertEqual(load(updated), {"name": "x", "homepage": "https://example.com"})
+
+    def test_matches_full_reserialization(self):
+        text = "name: x\nlist:\n- a\n- b\ntext: |\n  line\nnum: 1"
+        updates = {"list": ["c"], "text": "other", "metadata": {"k": "v"}}
+        self.assertEqual(load(update(text, updates)), load(update(text, updates, in_place=False)))
+
+    def test_invalid_yaml_is_replaced(self):
+        self.assertEqual(load(update("name: [", {"name": "x"})), {"name": "x"})
+
+    def test_non_mapping_raises(self):
+        with self.assertRaises(FrontmatterError):
+            update("- a\n- b", {"name": "x"})
+
+
+if __name__ == "__main__":
+    main()